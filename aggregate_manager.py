@@ -0,0 +1,54 @@
+import config
+from report_engine import ReportSummary
+
+
+class AggregateManager:
+    """
+    Running totals per user, kept in user["aggregates"] as a ReportSummary.
+
+    The summary is loaded (or rebuilt once) when the user logs in, then
+    updated in O(1) by every add/edit/delete, so the dashboard, budget
+    status and notifications never rescan the transactions. It is written
+    out with the user's data through the to_json hook.
+    """
+
+    KEY = "aggregates"
+
+    def attach(self, user):
+        self.get(user)
+
+    def get(self, user):
+        summary = user.get(self.KEY)
+        if isinstance(summary, ReportSummary):
+            return summary
+
+        transactions = user.get("transactions", [])
+        currency = user.get("currency", config.CURRENCY)
+        summary = None
+        if isinstance(user.get(self.KEY), dict):
+            saved = user[self.KEY]
+            # Only trust saved totals that still match the transaction list
+            if saved.get("count") == len(transactions) and saved.get("currency") == currency:
+                summary = ReportSummary.from_json(saved)
+        if summary is None:
+            summary = ReportSummary.from_transactions(transactions, currency)
+        user[self.KEY] = summary
+        return summary
+
+    def on_add(self, user, transaction):
+        self._update(user, transaction, 1)
+
+    def on_remove(self, user, transaction):
+        self._update(user, transaction, -1)
+
+    def on_edit(self, user, old, new):
+        self._update(user, old, -1)
+        self._update(user, new, 1)
+
+    def _update(self, user, transaction, sign):
+        summary = user.get(self.KEY)
+        if isinstance(summary, ReportSummary):
+            summary.add(transaction, sign)
+        else:
+            # not loaded yet: drop the saved copy, get() rebuilds it from the transactions
+            user.pop(self.KEY, None)
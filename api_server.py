@@ -0,0 +1,451 @@
+import asyncio
+import base64
+import binascii
+import functools
+import hmac
+import json
+import re
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import config
+import ledger_service
+from ledger_service import NotFound, to_json
+from query_engine import SORT_FIELDS, Query
+from user_manager import UserManager
+
+
+MAX_HEADER_LINES = 100
+MAX_BODY = 1 << 20  # bytes
+
+
+class ApiError(Exception):
+    """A request that cannot be served; `status` is the HTTP status to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    def __init__(self, method, target, headers, body, keep_alive):
+        self.method = method
+        url = urlsplit(target)
+        self.path = unquote(url.path)
+        self.query = parse_qs(url.query)
+        self.headers = headers  # lower-case names
+        self.body = body
+        self.keep_alive = keep_alive
+
+    def param(self, name, default=None):
+        values = self.query.get(name)
+        return values[-1] if values else default
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ApiError(400, "body is not valid JSON") from None
+        if not isinstance(data, dict):
+            raise ApiError(400, "body must be a JSON object")
+        return data
+
+
+class ApiServer:
+    """
+    JSON over HTTP/1.1 for the dashboard and mobile clients (python api_server.py).
+
+    Every client shares one UserManager, so users are loaded once and stay in
+    memory; each user gets a session (UserManager.session) on first use.
+    Requests of one user run one at a time (a lock per user), requests of
+    different users run side by side on API_WORKERS threads, and saves go
+    through the usual deferred, background writes. Connections are kept
+    alive and pipelined requests are answered in order.
+
+    Requests authenticate with HTTP Basic (username:PIN), except registration.
+
+        POST   /users                      {"username", "pin"}
+        GET    /transactions               ?start=&end=&category=&min=&max=&type=&note=
+                                            &sort=&desc=1&limit=&offset=
+        POST   /transactions               {"type", "amount", "category", "note", "date"}
+        PATCH  /transactions/<id>          any of those fields
+        DELETE /transactions/<id>
+        GET    /reports/<kind>             dashboard, monthly (?month=), categories,
+                                           trends, top (?month=&count=)
+        GET    /budgets
+        GET    /budgets/<YYYY-MM>          budget status
+        PUT    /budgets/<YYYY-MM>          {"amount"}
+        GET    /goals
+        POST   /goals                      {"name", "target", "deadline"}
+        POST   /goals/<id>/allocate        {"amount"}
+        DELETE /goals/<id>
+        GET    /notifications
+
+    Amounts are decimal strings in the user's currency (numbers are accepted
+    on input). Errors are {"error": message} with a 4xx/5xx status.
+    """
+
+    ROUTES = [
+        # method, path, handler, authenticated
+        ("POST", r"/users", "create_user", False),
+        ("GET", r"/transactions", "list_transactions", True),
+        ("POST", r"/transactions", "add_transaction", True),
+        ("PATCH", r"/transactions/([^/]+)", "edit_transaction", True),
+        ("DELETE", r"/transactions/([^/]+)", "delete_transaction", True),
+        ("GET", r"/reports/([a-z]+)", "report", True),
+        ("GET", r"/budgets", "list_budgets", True),
+        ("GET", r"/budgets/([^/]+)", "budget_status", True),
+        ("PUT", r"/budgets/([^/]+)", "set_budget", True),
+        ("GET", r"/goals", "list_goals", True),
+        ("POST", r"/goals", "add_goal", True),
+        ("POST", r"/goals/([^/]+)/allocate", "allocate_goal", True),
+        ("DELETE", r"/goals/([^/]+)", "delete_goal", True),
+        ("GET", r"/notifications", "notifications", True),
+    ]
+
+    def __init__(self, user_manager, host=None, port=None, workers=None, keepalive_timeout=None):
+        self.user_manager = user_manager
+        self.host = host or config.API_HOST
+        self.port = config.API_PORT if port is None else port
+        self.keepalive_timeout = keepalive_timeout or config.API_KEEPALIVE_TIMEOUT
+        self.pool = ThreadPoolExecutor(max_workers=workers or config.API_WORKERS, thread_name_prefix="api")
+        self.routes = [(method, re.compile(path + "$"), getattr(self, f"h_{name}"), auth)
+                       for method, path, name, auth in self.ROUTES]
+        self.sessions = {}  # username -> UserManager session
+        self.locks = {}  # username -> asyncio.Lock
+        self.stale = set()  # usernames changed by other processes, reloaded on next use
+        self.connections = set()
+        self.server = None
+
+    # -------------------------------
+    # Running
+    # -------------------------------
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # port 0: the one picked
+        print(f" API server listening on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        self.server.close()
+        for writer in list(self.connections):
+            writer.close()  # idle keep-alive connections
+        await self.server.wait_closed()
+        # requests still running finish, then every pending save is written
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.shutdown)
+        self.user_manager.close()
+
+    async def serve(self):
+        """Run until SIGINT/SIGTERM (Ctrl+C)."""
+        await self.start()
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stopping.set)
+            except (NotImplementedError, RuntimeError):  # Windows: Ctrl+C raises instead
+                pass
+        try:
+            await stopping.wait()
+        finally:
+            print(" Stopping the API server...")
+            await self.stop()
+
+    # -------------------------------
+    # HTTP
+    # -------------------------------
+    async def _serve_client(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break  # idle keep-alive connection
+                except ApiError as e:
+                    writer.write(self._response(e.status, {"error": str(e)}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                status, payload = await self._dispatch(request)
+                writer.write(self._response(status, payload, request.keep_alive))
+                await writer.drain()  # returns at once unless the client stopped reading
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Next request on the connection, or None once the client closed it."""
+        try:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n"):
+                line = await reader.readline()  # stray CRLF after a previous body
+            if not line:
+                return None
+            parts = line.decode("latin-1").rstrip("\r\n").split(" ")
+            if len(parts) != 3:
+                raise ApiError(400, "malformed request line")
+            method, target, version = parts
+            if version not in ("HTTP/1.1", "HTTP/1.0"):
+                raise ApiError(505, f"unsupported protocol {version}")
+
+            headers = {}
+            for _ in range(MAX_HEADER_LINES):
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, sep, value = line.decode("latin-1").partition(":")
+                if not sep:
+                    raise ApiError(400, "malformed header")
+                headers[name.strip().lower()] = value.strip()
+            else:
+                raise ApiError(431, "too many headers")
+        except (ValueError, asyncio.LimitOverrunError):
+            raise ApiError(431, "request line or header too long") from None
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise ApiError(411, "send a Content-Length instead of a chunked body")
+        length = headers.get("content-length", "0")
+        if not length.isdigit():
+            raise ApiError(400, "invalid Content-Length")
+        if int(length) > MAX_BODY:
+            raise ApiError(413, f"body larger than {MAX_BODY} bytes")
+        body = await reader.readexactly(int(length)) if int(length) else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return Request(method, target, headers, body, keep_alive)
+
+    def _response(self, status, payload, keep_alive):
+        status = HTTPStatus(status)
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: keep-alive" if keep_alive else "Connection: close",
+        ]
+        if status == HTTPStatus.UNAUTHORIZED:
+            head.append('WWW-Authenticate: Basic realm="python-fin"')
+        return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+    # -------------------------------
+    # Dispatch
+    # -------------------------------
+    async def _dispatch(self, request):
+        try:
+            handler, groups, authenticated = self._route(request)
+            if not authenticated:
+                result = await self._call(handler, None, request, *groups)
+            else:
+                username = await self._authenticate(request)
+                lock = self.locks.setdefault(username, asyncio.Lock())
+                async with lock:
+                    session = await self._session(username)
+                    result = await self._call(handler, session, request, *groups)
+        except ApiError as e:
+            return e.status, {"error": str(e)}
+        except NotFound as e:
+            return 404, {"error": str(e)}
+        except ValueError as e:  # ServiceError and create_user's checks
+            return 400, {"error": str(e)}
+        except TimeoutError as e:  # store locked by another session for too long
+            return 503, {"error": str(e)}
+        except Exception as e:
+            print(f" Error handling {request.method} {request.path}: {e!r}")
+            return 500, {"error": "internal error"}
+        return result if isinstance(result, tuple) else (200, result)
+
+    def _route(self, request):
+        allowed = False
+        for method, pattern, handler, authenticated in self.routes:
+            match = pattern.match(request.path)
+            if match:
+                if method == request.method:
+                    return handler, match.groups(), authenticated
+                allowed = True
+        if allowed:
+            raise ApiError(405, f"{request.method} is not allowed on {request.path}")
+        raise ApiError(404, f"no such endpoint: {request.path}")
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, functools.partial(fn, *args))
+
+    async def _authenticate(self, request):
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "basic":
+            raise ApiError(401, "authentication required")
+        try:
+            username, _, pin = base64.b64decode(credentials, validate=True).decode("utf-8").partition(":")
+        except (binascii.Error, UnicodeDecodeError):
+            raise ApiError(401, "malformed credentials") from None
+        user = self.user_manager.find_user(username)
+        if user is None:
+            await self._call(self.user_manager.refresh_users)  # registered by another process?
+            user = self.user_manager.find_user(username)
+        if user is None or not hmac.compare_digest(str(user.get("pin", "")), pin):
+            raise ApiError(401, "invalid credentials")
+        return username
+
+    async def _session(self, username):
+        # called with the user's lock held
+        self.stale |= self.user_manager.data_manager.take_stale()
+        session = self.sessions.get(username)
+        if session is None:
+            self.stale.discard(username)
+            user = self.user_manager.find_user(username)
+            session = self.sessions[username] = await self._call(self.user_manager.session, user)
+        elif username in self.stale:
+            self.stale.discard(username)
+            await self._call(session.reload_user, session.current_user)
+        return session
+
+    # -------------------------------
+    # Helpers (run on the worker threads)
+    # -------------------------------
+    def _date(self, request, name):
+        value = request.param(name)
+        return ledger_service.parse_date(value, name) if value else None
+
+    def _amount(self, session, request, name):
+        value = request.param(name)
+        return ledger_service.parse_amount(session.current_user, value, positive=False) if value else None
+
+    def _int_param(self, request, name, default=None):
+        value = request.param(name)
+        if value is None:
+            return default
+        if not value.isdigit():
+            raise ApiError(400, f"{name} must be a non-negative integer")
+        return int(value)
+
+    def _transaction(self, session, t):
+        return ledger_service.transaction_to_json(session.current_user, t)
+
+    # -------------------------------
+    # Users and transactions
+    # -------------------------------
+    def h_create_user(self, session, request):
+        body = request.json()
+        username = str(body.get("username", "")).strip()
+        if not username:
+            raise ApiError(400, "username is required")
+        if self.user_manager.find_user(username) is not None:
+            raise ApiError(409, "Username already exists.")
+        user = self.user_manager.create_user(username, str(body.get("pin", "")))
+        return 201, {"username": user["username"], "currency": user["currency"]}
+
+    def h_list_transactions(self, session, request):
+        sort = request.param("sort")
+        if sort is not None and sort not in SORT_FIELDS:
+            raise ApiError(400, f"sort must be one of {', '.join(SORT_FIELDS)}")
+        query = Query(
+            start=self._date(request, "start"),
+            end=self._date(request, "end"),
+            categories=request.query.get("category"),
+            min_amount=self._amount(session, request, "min"),
+            max_amount=self._amount(session, request, "max"),
+            t_type=request.param("type"),
+            note=request.param("note"),
+            order=sort,
+            descending=request.param("desc", "") in ("1", "true"),
+            limit=self._int_param(request, "limit"),
+            offset=self._int_param(request, "offset", 0),
+        )
+        results = ledger_service.search(session, query)
+        return {
+            "currency": session.currency(),
+            "plan": results.plan,
+            "transactions": [self._transaction(session, t) for t in results],
+        }
+
+    def h_add_transaction(self, session, request):
+        body = request.json()
+        transaction = ledger_service.add_transaction(session, body.get("type"), body.get("amount"),
+                                                     body.get("category", ""), body.get("note", ""),
+                                                     body.get("date"))
+        return 201, self._transaction(session, transaction)
+
+    def h_edit_transaction(self, session, request, tid):
+        body = request.json()
+        changes = {field: body[field] for field in ("type", "amount", "category", "note", "date") if field in body}
+        return self._transaction(session, ledger_service.edit_transaction(session, tid, changes))
+
+    def h_delete_transaction(self, session, request, tid):
+        return self._transaction(session, ledger_service.delete_transaction(session, tid))
+
+    # -------------------------------
+    # Reports
+    # -------------------------------
+    def h_report(self, session, request, kind):
+        user = session.current_user
+        result = {"report": kind, "currency": ledger_service.currency(user)}
+        if kind in ("dashboard", "monthly"):
+            month = ledger_service.parse_month(request.param("month")) if kind == "monthly" else None
+            totals = ledger_service.totals(user, month).to_json()
+            if not month:
+                del totals["month"]
+            result.update(totals)
+        elif kind == "categories":
+            result["categories"] = to_json(ledger_service.category_breakdown(user))
+        elif kind == "trends":
+            result["expense_by_month"] = to_json(ledger_service.spending_trends(user))
+        elif kind == "top":
+            month = request.param("month")
+            top = ledger_service.top_expenses(session, self._int_param(request, "count", 10), month)
+            result.update(month=month, transactions=[self._transaction(session, t) for t in top])
+        else:
+            raise ApiError(404, f"no such report: {kind}")
+        return result
+
+    # -------------------------------
+    # Budgets, goals, notifications
+    # -------------------------------
+    def h_list_budgets(self, session, request):
+        return [{"month": month, "amount": str(amount)}
+                for month, amount in ledger_service.budgets(session.current_user)]
+
+    def h_budget_status(self, session, request, month):
+        return ledger_service.budget_status(session.current_user, month).to_json()
+
+    def h_set_budget(self, session, request, month):
+        amount, _ = ledger_service.set_budget(session, month, request.json().get("amount"))
+        return {"month": month, "amount": str(amount)}
+
+    def h_list_goals(self, session, request):
+        return to_json(ledger_service.goals(session.current_user))
+
+    def h_add_goal(self, session, request):
+        body = request.json()
+        goal = ledger_service.add_goal(session, body.get("name", ""), body.get("target"), body.get("deadline") or "")
+        return 201, goal.to_json()
+
+    def h_allocate_goal(self, session, request, goal_id):
+        _, goal = ledger_service.allocate_to_goal(session, goal_id, request.json().get("amount"))
+        return goal.to_json()
+
+    def h_delete_goal(self, session, request, goal_id):
+        return ledger_service.delete_goal(session, goal_id).to_json()
+
+    def h_notifications(self, session, request):
+        return to_json(ledger_service.notifications(session.current_user))
+
+
+def main():
+    server = ApiServer(UserManager())
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:  # platforms without signal handlers in the loop
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from durability_manager import DurabilityManager
+from transaction_store import to_json
+
+
+class BackupManager:
+    """
+    Incremental, deduplicated backups.
+
+    Each user is split into a header (everything but transactions) and
+    chunks of transactions. Every piece is stored once under objects/ by
+    its SHA-256, and a backup is just a small manifest listing the pieces
+    per user. Unchanged users and chunks cost nothing to back up.
+
+    Chunks end after transactions whose id hashes to a multiple of
+    `chunk_size` (so about chunk_size transactions each, at most
+    MAX_CHUNK_FACTOR times that): boundaries follow the content, not the
+    position, so adding or deleting one transaction only changes its own
+    chunk instead of every chunk after it.
+
+    Full copies written before manifests existed (backup_<timestamp>.json
+    in backup_dir) are listed and restored as well; retention leaves
+    them alone.
+
+    `lock` returns a lock shared by every session writing to backup_dir
+    (see LockManager): creating a backup, pruning and restoring hold it,
+    so garbage collection never runs while a manifest is being written.
+    As a second guard, objects written or reused in the last `gc_grace`
+    seconds are never collected.
+    """
+
+    TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"
+    LEGACY_PREFIX = "backup_"
+    MAX_CHUNK_FACTOR = 4
+
+    def __init__(self, backup_dir, keep_last=20, keep_days=30, chunk_size=256, durability=None,
+                 lock=None, gc_grace=3600):
+        self.backup_dir = backup_dir
+        self.durability = durability or DurabilityManager()
+        self.objects_dir = os.path.join(backup_dir, "objects")
+        self.manifests_dir = os.path.join(backup_dir, "manifests")
+        self.keep_last = keep_last
+        self.keep_days = keep_days
+        self.chunk_size = chunk_size
+        self.lock = lock or nullcontext
+        self.gc_grace = gc_grace
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    # -------------------------------
+    # Create
+    # -------------------------------
+    def create_backup(self, users, changed=None, resolve_user=None):
+        """
+        Write a new manifest for users and return its path.
+        changed: optional set of usernames; other users reuse the previous backup's pieces.
+        resolve_user: optional callback returning the full user for a not-yet-loaded entry.
+        """
+        with self.lock():
+            return self._create_backup(users, changed, resolve_user)
+
+    def _create_backup(self, users, changed, resolve_user):
+        previous = {}
+        if changed is not None:
+            latest = self._latest_manifest_id()
+            if latest:
+                previous = self._read_manifest(latest)["users"]
+
+        entries = {}
+        for user in users:
+            username = user["username"]
+            if changed is not None and username not in changed and username in previous:
+                entries[username] = previous[username]
+            else:
+                entries[username] = self._store_user(resolve_user(user) if resolve_user else user)
+
+        manifest_id = self._new_manifest_id()
+        manifest = {
+            "created_at": datetime.now().isoformat(),
+            "order": [u["username"] for u in users],
+            "users": entries,
+        }
+        path = os.path.join(self.manifests_dir, f"{manifest_id}.json")
+        self._write_atomic(path, json.dumps(manifest).encode("utf-8"))
+        self._prune()
+        return path
+
+    def _store_user(self, user):
+        header = {k: v for k, v in user.items() if k != "transactions"}
+        transactions = user.get("transactions", [])
+        chunks = [self._store_object(transactions[start:end]) for start, end in self._chunk_bounds(transactions)]
+        return {"header": self._store_object(header), "chunks": chunks}
+
+    def _chunk_bounds(self, transactions):
+        limit = self.chunk_size * self.MAX_CHUNK_FACTOR
+        start = 0
+        for i, t in enumerate(transactions):
+            key = t.get("id")
+            key = str(key) if key is not None else json.dumps(t, sort_keys=True, default=to_json)
+            if zlib.crc32(key.encode("utf-8")) % self.chunk_size == 0 or i + 1 - start >= limit:
+                yield start, i + 1
+                start = i + 1
+        if start < len(transactions):
+            yield start, len(transactions)
+
+    def _store_object(self, value):
+        data = json.dumps(value, sort_keys=True, separators=(",", ":"), default=to_json).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            os.utime(path)  # in use again: restarts its grace period
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_atomic(path, zlib.compress(data))
+        return digest
+
+    # -------------------------------
+    # Restore
+    # -------------------------------
+    def list_backups(self):
+        """Backup ids, oldest first: manifest timestamps, and backup_<timestamp> for old full copies."""
+        legacy = [
+            name[:-5] for name in os.listdir(self.backup_dir)
+            if name.startswith(self.LEGACY_PREFIX) and name.endswith(".json")
+        ]
+        return sorted(self._manifest_ids() + legacy, key=self._backup_time)
+
+    def restore(self, at=None):
+        """
+        Rebuild the users list from the newest backup taken at or before `at`
+        (datetime, backup id, or None for the latest). Returns None if there is none.
+        """
+        with self.lock():
+            return self._restore(at)
+
+    def _restore(self, at):
+        if isinstance(at, datetime):
+            at = at.strftime(self.TIMESTAMP_FORMAT)
+        elif at is not None:
+            at = self._backup_time(at)
+        candidates = [b for b in self.list_backups() if at is None or self._backup_time(b) <= at]
+        if not candidates:
+            return None
+
+        if candidates[-1].startswith(self.LEGACY_PREFIX):
+            with open(os.path.join(self.backup_dir, f"{candidates[-1]}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        manifest = self._read_manifest(candidates[-1])
+        users = []
+        for username in manifest["order"]:
+            entry = manifest["users"][username]
+            user = self._load_object(entry["header"])
+            user["transactions"] = []
+            for digest in entry["chunks"]:
+                user["transactions"].extend(self._load_object(digest))
+            users.append(user)
+        return users
+
+    def restore_latest_valid(self):
+        """(backup id, users) from the newest backup that reads back completely, or (None, None)."""
+        for backup_id in reversed(self.list_backups()):
+            try:
+                return backup_id, self.restore(backup_id)
+            except Exception:
+                continue  # damaged or incomplete backup: try the one before
+        return None, None
+
+    def _load_object(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return json.loads(zlib.decompress(f.read()).decode("utf-8"))
+
+    # -------------------------------
+    # Retention
+    # -------------------------------
+    def prune(self):
+        """
+        Keep the newest `keep_last` backups plus the last backup of each day
+        for `keep_days` days, then delete objects no backup refers to.
+        """
+        with self.lock():
+            return self._prune()
+
+    def _prune(self):
+        backups = self._manifest_ids()
+        keep = set(backups[-self.keep_last:]) if self.keep_last > 0 else set()
+
+        cutoff = (datetime.now() - timedelta(days=self.keep_days)).strftime(self.TIMESTAMP_FORMAT)
+        last_of_day = {}
+        for b in backups:
+            if b >= cutoff:
+                last_of_day[b[:8]] = b
+        keep.update(last_of_day.values())
+
+        removed = [b for b in backups if b not in keep]
+        if not removed:
+            return 0
+        for b in removed:
+            os.remove(os.path.join(self.manifests_dir, f"{b}.json"))
+        self._collect_garbage()
+        return len(removed)
+
+    def _collect_garbage(self):
+        referenced = set()
+        for b in self._manifest_ids():
+            for entry in self._read_manifest(b)["users"].values():
+                referenced.add(entry["header"])
+                referenced.update(entry["chunks"])
+
+        cutoff = time.time() - self.gc_grace
+        for prefix in os.listdir(self.objects_dir):
+            folder = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if name not in referenced and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+
+    # -------------------------------
+    # Helpers
+    # -------------------------------
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _new_manifest_id(self):
+        # Microsecond timestamps plus a counter: same-second saves never overwrite each other
+        base = datetime.now().strftime(self.TIMESTAMP_FORMAT)
+        manifest_id, n = base, 0
+        while os.path.exists(os.path.join(self.manifests_dir, f"{manifest_id}.json")):
+            n += 1
+            manifest_id = f"{base}_{n}"
+        return manifest_id
+
+    def _manifest_ids(self):
+        return sorted(name[:-5] for name in os.listdir(self.manifests_dir) if name.endswith(".json"))
+
+    def _backup_time(self, backup_id):
+        # backup_20250101_120000 sorts as 20250101_120000, just before that second's manifests
+        if backup_id.startswith(self.LEGACY_PREFIX):
+            return backup_id[len(self.LEGACY_PREFIX):]
+        return backup_id
+
+    def _latest_manifest_id(self):
+        backups = self._manifest_ids()
+        return backups[-1] if backups else None
+
+    def _read_manifest(self, manifest_id):
+        with open(os.path.join(self.manifests_dir, f"{manifest_id}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_atomic(self, path, data):
+        self.durability.write_atomic(path, data)
@@ -0,0 +1,377 @@
+"""
+Benchmarks on generated ledgers, to compare commits.
+
+    python benchmark.py                                  scales 1k and 100k, results in benchmark_results.json
+    python benchmark.py --scales 1k,100k,1m,10m --output after.json
+    python benchmark.py --baseline before.json           run, then fail on regressions against before.json
+    python benchmark.py --results after.json --baseline before.json   only compare two results files
+    python benchmark.py --generate 1m --path users.json  only write a dataset
+
+Each scale writes a deterministic users.json (see generate_users: N users
+with M transactions each, skewed categories, monthly budgets and savings
+goals) into a temp directory and times, in the storage mode of config
+(FIN_STORAGE_MODE, FIN_COLUMNAR, ...):
+
+    startup, load            UserManager() alone, then with every user loaded
+    save, backup, export     full save (with its automatic backup), backup of
+                             every user, CSV export of every transaction
+    login                    sessions for the sampled users
+    report.*, filter.*,      what the report, filter, budget and notification
+    notifications            menus run, for each of --sample users
+
+Every operation runs --repeat times; results keep the first (cold) run,
+the fastest and the median, in seconds. --baseline compares the fastest
+runs and exits with 1 when one is more than --threshold slower.
+The 10m scale needs several GB of memory in the json modes.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import config
+import ledger_service
+from notification_manager import NotificationManager
+from query_engine import Query
+from report_engine import ReportSummary
+from report_manager import ReportManager
+from user_manager import UserManager
+
+
+# name -> (users, transactions per user)
+SCALES = {
+    "1k": (10, 100),
+    "10k": (50, 200),
+    "100k": (200, 500),
+    "1m": (1000, 1000),
+    "10m": (10000, 1000),
+}
+
+# category, typical amount in minor units; earlier entries are picked more often (see skew)
+EXPENSES = [
+    ("Food", 2500), ("Transport", 1800), ("Shopping", 4500), ("Utilities", 9000), ("Entertainment", 3500),
+    ("Rent", 120000), ("Health", 6000), ("Subscriptions", 1500), ("Travel", 40000), ("Education", 25000),
+    ("Gifts", 5000), ("Insurance", 15000),
+]
+INCOMES = [("Salary", 350000), ("Freelance", 60000), ("Interest", 1200), ("Refund", 3000)]
+NOTES = ["", "", "", "card payment", "cash", "online order", "weekly shop", "monthly", "shared with friends",
+         "work trip", "birthday", "repair"]
+GOALS = ["Emergency fund", "Holiday", "New laptop", "Car", "Wedding", "House deposit"]
+LAST_MONTH = (2025, 12)  # fixed, so a seed always gives the same file
+
+
+# -------------------------------
+# Synthetic ledgers
+# -------------------------------
+def _months(count):
+    year, month = LAST_MONTH
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
+def _weights(items, skew):
+    # Zipf-like: the k-th entry is picked 1/k**skew as often as the first
+    return [1 / (k + 1) ** skew for k in range(len(items))]
+
+
+def generate_user(rnd, username, transactions, months=12, skew=1.2, income_ratio=0.1):
+    """One user as saved by the json modes (amounts in USD cents), transactions in date order."""
+    calendar = _months(months)
+    expense_weights, income_weights = _weights(EXPENSES, skew), _weights(INCOMES, skew)
+    rows = []
+    for _ in range(transactions):
+        income = rnd.random() < income_ratio
+        category, typical = rnd.choices(INCOMES if income else EXPENSES,
+                                        income_weights if income else expense_weights)[0]
+        year, month = rnd.choice(calendar)
+        rows.append({
+            "id": str(uuid.UUID(int=rnd.getrandbits(128), version=4)),
+            "type": "income" if income else "expense",
+            "amount": max(1, round(typical * rnd.lognormvariate(0, 0.5))),
+            "category": category,
+            "note": rnd.choice(NOTES),
+            "date": f"{year:04d}-{month:02d}-{rnd.randint(1, 28):02d}",
+        })
+    rows.sort(key=lambda t: t["date"])
+
+    spent = {}
+    for t in rows:
+        if t["type"] == "expense":
+            spent[t["date"][:7]] = spent.get(t["date"][:7], 0) + t["amount"]
+    average = sum(spent.values()) // max(1, len(spent))
+    budgets = [{"month": f"{y:04d}-{m:02d}", "amount": max(100, round(average * rnd.uniform(0.8, 1.3)))}
+               for y, m in calendar]
+
+    goals = []
+    for name in rnd.sample(GOALS, rnd.randint(0, 3)):
+        target = rnd.randint(1000, 20000) * 100
+        goals.append({
+            "id": str(uuid.UUID(int=rnd.getrandbits(128), version=4)),
+            "name": name,
+            "target_amount": target,
+            "saved_amount": round(target * rnd.uniform(0, 1.1)),
+            "deadline": f"{LAST_MONTH[0] + 1}-{rnd.randint(1, 12):02d}-01",
+            "created_at": f"{calendar[0][0]:04d}-{calendar[0][1]:02d}-01T09:00:00",
+        })
+
+    return {
+        "username": username,
+        "pin": "1234",
+        "currency": "USD",
+        "transactions": rows,
+        "monthly_budgets": budgets,
+        "savings_goals": goals,
+    }
+
+
+def generate_users(path, users, transactions, seed=1, **options):
+    """
+    Write users.json with `users` users of `transactions` transactions each
+    (options: see generate_user). Users are written one at a time, in the
+    json.dump(indent=4) layout the json modes save, so memory stays flat.
+    """
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n" if users else "[]")
+        for i in range(users):
+            user = generate_user(rnd, f"user{i:05d}", transactions, **options)
+            f.write("    " if i == 0 else ",\n    ")
+            f.write(json.dumps(user, indent=4).replace("\n", "\n    "))
+        if users:
+            f.write("\n]")
+
+
+# -------------------------------
+# Timing
+# -------------------------------
+@contextlib.contextmanager
+def _quiet():
+    # the menus and the storage layer print as they go
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _time(fn, repeat, cleanup=None):
+    runs = []
+    for _ in range(repeat):
+        with _quiet():
+            started = time.perf_counter()
+            result = fn()
+            runs.append(time.perf_counter() - started)
+            if cleanup is not None:
+                cleanup(result)
+    return {"first": round(runs[0], 6), "min": round(min(runs), 6), "median": round(statistics.median(runs), 6)}
+
+
+def _each(sessions, fn):
+    def run():
+        for session in sessions:
+            fn(session)
+    return run
+
+
+def _loaded():
+    user_manager = UserManager()
+    user_manager.all_users()
+    return user_manager
+
+
+def _filters(month):
+    # what the search/filter menu builds (see SearchFilterManager)
+    first, last = f"{month}-01", f"{month}-28"
+    return {
+        "filter.date_range": Query().between(first, last),
+        "filter.category": Query().in_categories(["food"]),
+        "filter.amount": Query().amount_between(2000, 5000),
+        "filter.sort_date": Query().order_by("date", descending=True),
+        "filter.sort_amount": Query().order_by("amount", descending=True),
+        "filter.advanced": Query(start=f"{month[:4]}-01-01", end=last, categories=["food", "shopping"], min_amount=1000,
+                                 note="card").order_by("amount", descending=True).page(20),
+    }
+
+
+def run_scale(name, users, transactions, repeat=3, sample=20, seed=1):
+    """Timings of every operation on one generated dataset; works in a temp directory."""
+    directory = tempfile.mkdtemp(prefix="fin-bench-")
+    cwd = os.getcwd()
+    os.chdir(directory)  # DataManager works on ./data
+    try:
+        os.makedirs("data")
+        started = time.perf_counter()
+        generate_users(os.path.join("data", "users.json"), users, transactions, seed=seed)
+        generated = time.perf_counter() - started
+        with _quiet():
+            _loaded().close()  # first start: converts users.json to the storage mode, builds indexes
+
+        timings = {
+            "startup": _time(UserManager, repeat, cleanup=lambda um: um.close()),
+            "load": _time(_loaded, repeat, cleanup=lambda um: um.close()),
+        }
+        with _quiet():
+            user_manager = _loaded()
+        try:
+            dm = user_manager.data_manager
+
+            def save():
+                user_manager.save()
+                dm.drain()
+
+            timings["save"] = _time(save, repeat)
+            timings["backup"] = _time(lambda: dm.create_backup(user_manager.users), repeat)
+            export_path = os.path.join(directory, "export.csv")
+            timings["export"] = _time(lambda: dm.export_to_csv(user_manager.users, export_path), repeat)
+
+            chosen = user_manager.users[:sample]
+            timings["login"] = _time(lambda: [user_manager.session(u) for u in chosen], repeat)
+            sessions = [user_manager.session(u) for u in chosen]
+            month = f"{LAST_MONTH[0]:04d}-{LAST_MONTH[1]:02d}"
+            operations = {
+                "report.totals_rebuild": lambda s: ReportSummary.from_transactions(
+                    s.current_user["transactions"], s.currency()),
+                "report.dashboard": lambda s: ReportManager(s).dashboard_summary(),
+                "report.monthly": lambda s: ledger_service.totals(s.current_user, month),
+                "report.categories": lambda s: ReportManager(s).category_breakdown(),
+                "report.trends": lambda s: ReportManager(s).spending_trends(),
+                "report.top_expenses": lambda s: ledger_service.top_expenses(s, 10, month),
+                "report.ascii": lambda s: ReportManager(s).ascii_visualization(),
+                "report.budget_status": lambda s: ledger_service.budget_status(s.current_user, month),
+                "notifications": lambda s: NotificationManager(s).check_notifications(),
+            }
+            for op, query in _filters(month).items():
+                operations[op] = lambda s, query=query: list(ledger_service.search(s, query))
+            for op, fn in operations.items():
+                timings[op] = _time(_each(sessions, fn), repeat)
+        finally:
+            with _quiet():
+                user_manager.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "users": users,
+        "transactions_per_user": transactions,
+        "rows": users * transactions,
+        "sampled_users": min(sample, users),
+        "generate_seconds": round(generated, 3),
+        "timings": timings,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit or None,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "storage_mode": config.STORAGE_MODE,
+        "lazy_load": config.LAZY_LOAD,
+        "columnar": config.COLUMNAR_TRANSACTIONS,
+        "background_writes": config.BACKGROUND_WRITES,
+        "durability": config.DURABILITY,
+    }
+
+
+# -------------------------------
+# Regression check
+# -------------------------------
+def compare(baseline, current, threshold=0.25, floor=0.001):
+    """
+    [(scale, operation, baseline s, current s, ratio, regressed)] for the
+    timings both results have. An operation regressed when its fastest run
+    is more than `threshold` slower and by more than `floor` seconds
+    (shorter timings are mostly noise).
+    """
+    rows = []
+    for scale, result in current["scales"].items():
+        before = baseline.get("scales", {}).get(scale)
+        if before is None:
+            continue
+        for op, timing in result["timings"].items():
+            if op not in before["timings"]:
+                continue
+            old, new = before["timings"][op]["min"], timing["min"]
+            ratio = new / old if old > 0 else 1.0
+            rows.append((scale, op, old, new, ratio, ratio > 1 + threshold and new - old > floor))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks on generated ledgers")
+    parser.add_argument("--scales", default="1k,100k", help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every operation")
+    parser.add_argument("--sample", type=int, default=20, help="users the per-user operations run for")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_results.json", help="results file")
+    parser.add_argument("--results", help="compare this results file instead of running")
+    parser.add_argument("--baseline", help="results of an earlier commit to check against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown counted as a regression (0.25 = 25%%)")
+    parser.add_argument("--generate", metavar="SCALE", help="only write the dataset of SCALE to --path")
+    parser.add_argument("--path", default="users.json", help="dataset file of --generate")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        if args.generate not in SCALES:
+            parser.error(f"unknown scale {args.generate!r}")
+        users, transactions = SCALES[args.generate]
+        generate_users(args.path, users, transactions, seed=args.seed)
+        print(f"{users} users x {transactions} transactions written to {args.path}")
+        return 0
+
+    if args.results:
+        with open(args.results, "r", encoding="utf-8") as f:
+            results = json.load(f)
+    else:
+        scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+        unknown = [s for s in scales if s not in SCALES]
+        if unknown:
+            parser.error(f"unknown scale(s): {', '.join(unknown)}")
+        results = {"environment": environment(), "repeat": args.repeat, "seed": args.seed, "scales": {}}
+        for scale in scales:
+            users, transactions = SCALES[scale]
+            print(f"{scale}: {users} users x {transactions} transactions ...", flush=True)
+            result = run_scale(scale, users, transactions, args.repeat, args.sample, args.seed)
+            results["scales"][scale] = result
+            for op, timing in result["timings"].items():
+                print(f"  {op:<22} {timing['min'] * 1000:12.2f} ms  (first {timing['first'] * 1000:.2f} ms)")
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(baseline, results, args.threshold)
+    regressions = [row for row in rows if row[5]]
+    for scale, op, old, new, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{scale:<5} {op:<22} {old * 1000:10.2f} -> {new * 1000:10.2f} ms  x{ratio:5.2f}{flag}")
+    if regressions:
+        print(f"{len(regressions)} of {len(rows)} timing(s) more than {args.threshold:.0%} slower than {args.baseline}")
+        return 1
+    print(f"No regressions against {args.baseline} ({len(rows)} timing(s) compared)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import gc
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import date
+
+from durability_manager import DurabilityManager
+from transaction_store import TransactionStore, to_json
+
+
+MAGIC = b"PYFINBIN"
+VERSION = 2  # 2: amounts of users with a "currency" are integer minor units
+READABLE_VERSIONS = (1, 2)
+# magic, version, flags, user count, directory offset, directory length
+HEADER = struct.Struct("<8sHHIQQ")
+# rows, meta length
+BLOCK_HEADER = struct.Struct("<II")
+
+FIELDS = ("id", "type", "amount", "category", "note", "date")
+TYPE_NAMES = ("income", "expense")
+TYPE_FLAGS = {name: flag for flag, name in enumerate(TYPE_NAMES)}
+ID_WIDTH = 36  # uuid4 strings; other ids go to the odd rows
+
+
+class BinarySnapshotManager:
+    """
+    Compact binary snapshot of every user (users.bin), read through mmap.
+
+    Layout (little-endian):
+        header     magic, format version, flags, user count, directory offset/length
+        blocks     one per user, see encode_user
+        directory  JSON [[username, pin, offset, length, version], ...]
+
+    Startup reads only the header and the directory; a user's block is
+    decoded on login. Blocks of users that were never loaded are copied as
+    they are on the next save.
+    """
+
+    def __init__(self, path, durability=None):
+        self.path = path
+        self.durability = durability or DurabilityManager()
+        self.offsets = {}  # username -> (offset, length) in the mapped file
+        self._file = None
+        self._map = None
+        self._mapped_stat = None  # identity of the mapped file, see read_user
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # -------------------------------
+    # Reading
+    # -------------------------------
+    def load_directory(self):
+        """[{"username", "pin", "version"}, ...] from the directory, without touching any block."""
+        self._open()
+        magic, version, _, count, dir_offset, dir_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a binary snapshot")
+        if version not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported snapshot version {version} (expected {VERSION})")
+        directory = json.loads(self._map[dir_offset:dir_offset + dir_length])
+        self.offsets = {e[0]: (e[2], e[3]) for e in directory}
+        # snapshots written before versions existed have four fields
+        return [{"username": e[0], "pin": e[1], "version": e[4] if len(e) > 4 else 0} for e in directory]
+
+    def read_user(self, username):
+        if self._stat() != self._mapped_stat:
+            self.load_directory()  # replaced by another session: map the new file
+        offset, length = self.offsets[username]
+        return decode_user(memoryview(self._map)[offset:offset + length])
+
+    def read_all(self):
+        return [self.read_user(stub["username"]) for stub in self.load_directory()]
+
+    def _open(self):
+        self.close()
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        stat = os.fstat(self._file.fileno())
+        self._mapped_stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+
+    # -------------------------------
+    # Writing
+    # -------------------------------
+    def write_snapshot(self, users, is_stub=lambda user: False):
+        """Write users (tmp file + rename); stubs are copied from the current file."""
+        directory = []
+        with self.durability.atomic_open(self.path, "wb") as f:
+            f.write(bytes(HEADER.size))
+            for user in users:
+                if is_stub(user):
+                    offset, length = self.offsets[user["username"]]
+                    block = self._map[offset:offset + length]
+                else:
+                    block = encode_user(user)
+                directory.append([user["username"], user.get("pin"), f.tell(), len(block), user.get("version", 0)])
+                f.write(block)
+            dir_offset = f.tell()
+            dir_bytes = json.dumps(directory, separators=(",", ":")).encode("utf-8")
+            f.write(dir_bytes)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(users), dir_offset, len(dir_bytes)))
+            # the old file must be unmapped before it is replaced (Windows)
+            self.close()
+        self._open()
+        self.offsets = {e[0]: (e[2], e[3]) for e in directory}
+
+
+# -------------------------------
+# One user <-> one block
+# -------------------------------
+def encode_user(user):
+    """
+    Block layout: rows, meta length, meta JSON, then one column per field:
+        ids (36 ASCII bytes each), amounts (int64 minor units), dates (int32 ordinals),
+        types (uint8), categories and notes (uint32 indexes into the string tables).
+    meta holds the other user fields, the string tables, and "odd" rows (any
+    transaction that does not fit the columns exactly) stored as JSON.
+    Users not yet converted to minor units (no "currency") keep float
+    amounts, stored as cents.
+    """
+    transactions = user.get("transactions")
+    if isinstance(transactions, TransactionStore):
+        transactions = transactions.to_list()
+    transactions = transactions or []
+    migrated = "currency" in user
+    amount_type = int if migrated else float
+
+    ids = []
+    amounts = array("q")
+    dates = array("i")
+    types = bytearray()
+    categories = array("I")
+    notes = array("I")
+    category_table = {}
+    note_table = {}
+    ordinals = {}  # date string -> ordinal (0 = not a plain YYYY-MM-DD date)
+    odd = {}
+
+    for row, t in enumerate(transactions):
+        tid, amount, day = t.get("id"), t.get("amount"), t.get("date")
+        ordinal = ordinals.get(day)
+        if ordinal is None:
+            ordinal = ordinals[day] = _ordinal(day)
+        if (
+            type(amount) is amount_type and ordinal
+            and type(tid) is str and len(tid) == ID_WIDTH and tid.isascii()
+            and t.get("type") in TYPE_FLAGS
+            and type(t.get("category")) is str and type(t.get("note")) is str
+            and tuple(t) == FIELDS
+        ):
+            cents = amount if migrated else round(amount * 100)
+            if (migrated or cents / 100 == amount) and abs(cents) < 2 ** 63:
+                ids.append(tid)
+                amounts.append(cents)
+                dates.append(ordinal)
+                types.append(TYPE_FLAGS[t["type"]])
+                categories.append(category_table.setdefault(t["category"], len(category_table)))
+                notes.append(note_table.setdefault(t["note"], len(note_table)))
+                continue
+        odd[row] = t
+        ids.append(" " * ID_WIDTH)
+        amounts.append(0)
+        dates.append(0)
+        types.append(0)
+        categories.append(0)
+        notes.append(0)
+
+    meta = {
+        # "transactions" stays in place (as null) so the key order survives
+        "user": {k: (None if k == "transactions" else v) for k, v in user.items()},
+        "categories": list(category_table),
+        "notes": list(note_table),
+        "odd": odd,
+    }
+    meta_bytes = json.dumps(meta, separators=(",", ":"), default=to_json).encode("utf-8")
+    columns = [amounts, dates, categories, notes]
+    if sys.byteorder == "big":
+        for column in columns:
+            column.byteswap()
+    return b"".join([
+        BLOCK_HEADER.pack(len(ids), len(meta_bytes)), meta_bytes,
+        "".join(ids).encode("ascii"), amounts.tobytes(), dates.tobytes(), bytes(types),
+        categories.tobytes(), notes.tobytes(),
+    ])
+
+
+def decode_user(block):
+    n, meta_length = BLOCK_HEADER.unpack_from(block, 0)
+    pos = BLOCK_HEADER.size
+    meta = json.loads(bytes(block[pos:pos + meta_length]))
+    pos += meta_length
+    user = meta["user"]
+    if "transactions" not in user:
+        return user
+
+    def column(typecode, size):
+        nonlocal pos
+        values = array(typecode)
+        values.frombytes(block[pos:pos + size * n])
+        if sys.byteorder == "big":
+            values.byteswap()
+        pos += size * n
+        return values
+
+    text = bytes(block[pos:pos + ID_WIDTH * n]).decode("ascii")
+    pos += ID_WIDTH * n
+    amounts = column("q", 8)
+    if "currency" not in user:
+        amounts = [cents / 100 for cents in amounts]
+    dates = column("i", 4)
+    types = block[pos:pos + n]
+    pos += n
+    category_ids = column("I", 4)
+    note_ids = column("I", 4)
+
+    # Only plain dicts, lists and strings are created here: pausing the cyclic GC
+    # while building them saves a large share of the decode time
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        day_names = {o: date.fromordinal(o).isoformat() for o in set(dates) if o}
+        # odd rows point at entry 0, which must exist even when every row is odd
+        category_table, note_table = meta["categories"] or [""], meta["notes"] or [""]
+        rows = [
+            {"id": tid, "type": t_type, "amount": amount, "category": category, "note": note, "date": day}
+            for tid, t_type, amount, category, note, day in zip(
+                [text[i:i + ID_WIDTH] for i in range(0, ID_WIDTH * n, ID_WIDTH)],
+                map(TYPE_NAMES.__getitem__, types),
+                amounts,
+                map(category_table.__getitem__, category_ids),
+                map(note_table.__getitem__, note_ids),
+                map(day_names.get, dates),
+            )
+        ]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    for row, t in meta["odd"].items():
+        rows[int(row)] = t
+    user["transactions"] = rows
+    return user
+
+
+def _ordinal(value):
+    try:
+        d = date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0
+    return d.toordinal() if d.isoformat() == value else 0
+
+
+# -------------------------------
+# Converters: python binary_snapshot_manager.py to-binary|to-json SOURCE TARGET
+# -------------------------------
+def json_to_binary(json_path, binary_path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        users = json.load(f)
+    BinarySnapshotManager(binary_path).write_snapshot(users)
+    return len(users)
+
+
+def binary_to_json(binary_path, json_path):
+    snapshot = BinarySnapshotManager(binary_path)
+    users = snapshot.read_all()
+    snapshot.close()
+    with DurabilityManager().atomic_open(json_path) as f:
+        json.dump(users, f, indent=4, default=to_json)
+    return len(users)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-binary", "to-json"):
+        print("Usage: python binary_snapshot_manager.py to-binary|to-json SOURCE TARGET")
+        sys.exit(2)
+    convert = json_to_binary if sys.argv[1] == "to-binary" else binary_to_json
+    count = convert(sys.argv[2], sys.argv[3])
+    print(f" Converted {count} user(s): {sys.argv[2]} -> {sys.argv[3]}")
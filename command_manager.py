@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import shlex
+import sys
+from contextlib import redirect_stdout
+
+import config
+import ledger_service
+from import_manager import ImportManager
+from ledger_service import to_json
+from month_end_manager import MonthEndManager
+from query_engine import SORT_FIELDS, Query
+from user_manager import UserManager
+
+
+class CommandError(Exception):
+    """A command that cannot run (bad arguments, unknown user, wrong PIN, ...)."""
+
+
+class _Parser(argparse.ArgumentParser):
+    # batch lines must not end the process on a typo
+    def error(self, message):
+        raise CommandError(message)
+
+
+class CommandManager:
+    """
+    Non-interactive commands over one loaded dataset, for scripts and cron:
+
+        python main.py add --user alice --pin 1234 --type expense --amount 12.50 --category Food
+        python main.py report dashboard --user alice
+        python main.py batch commands.txt --user alice
+
+    Every command writes one JSON line to stdout:
+        {"ok": true, "command": "add", "result": {...}}
+        {"ok": false, "command": "add", "error": "..."}
+    (status messages of the storage layer go to stderr). Amounts are
+    decimal strings in the user's currency, as typed on input.
+
+    `batch FILE` ("-" for stdin) runs one command line per line (same
+    syntax, without "python main.py"; blank lines and # comments are
+    skipped) against the data loaded once, and saves all their changes
+    together at the end. Its --user/--pin apply to lines that give none.
+    The PIN can also come from FIN_PIN.
+    """
+
+    def __init__(self, user_manager, out=None):
+        self.user_manager = user_manager
+        self.out = out or sys.stdout
+        self.parser = self._build_parser()
+        self.defaults = {}  # --user/--pin of the running batch
+
+    # -------------------------------
+    # Command line
+    # -------------------------------
+    def _build_parser(self):
+        parser = _Parser(prog="main.py", description="Personal finance manager (no arguments: interactive menu)")
+        commands = parser.add_subparsers(dest="command", metavar="COMMAND", parser_class=_Parser)
+
+        login = _Parser(add_help=False)
+        login.add_argument("--user", help="username")
+        login.add_argument("--pin", help="4-digit PIN (default: FIN_PIN)")
+
+        filters = _Parser(add_help=False)
+        filters.add_argument("--from", dest="start", help="first date (YYYY-MM-DD)")
+        filters.add_argument("--to", dest="end", help="last date (YYYY-MM-DD)")
+        filters.add_argument("--category", dest="categories", action="append", help="category (repeatable)")
+
+        commands.add_parser("users", help="list usernames")
+
+        commands.add_parser("register", parents=[login], help="create a user")
+
+        add = commands.add_parser("add", parents=[login], help="add a transaction")
+        add.add_argument("--type", dest="t_type", required=True, choices=("income", "expense"))
+        add.add_argument("--amount", required=True)
+        add.add_argument("--category", default="")
+        add.add_argument("--note", default="")
+        add.add_argument("--date", help="YYYY-MM-DD (default: today)")
+        add.add_argument("--id", dest="tid", help="transaction id (default: a new uuid)")
+
+        search = commands.add_parser("list", parents=[login, filters], help="list or search transactions")
+        search.add_argument("--min", dest="min_amount")
+        search.add_argument("--max", dest="max_amount")
+        search.add_argument("--type", dest="t_type", choices=("income", "expense"))
+        search.add_argument("--note", help="note contains (case-insensitive)")
+        search.add_argument("--sort", choices=SORT_FIELDS)
+        search.add_argument("--desc", action="store_true", help="sort descending")
+        search.add_argument("--limit", type=int)
+        search.add_argument("--offset", type=int, default=0)
+
+        delete = commands.add_parser("delete", parents=[login], help="delete a transaction by id")
+        delete.add_argument("--id", dest="tid", required=True)
+
+        report = commands.add_parser("report", parents=[login], help="dashboard, monthly, categories, trends, top")
+        report.add_argument("kind", choices=("dashboard", "monthly", "categories", "trends", "top"))
+        report.add_argument("--month", help="YYYY-MM (required for monthly, optional for top)")
+        report.add_argument("--count", type=int, default=10, help="rows of the top report")
+
+        export = commands.add_parser("export", parents=[filters], help="export transactions to CSV")
+        export.add_argument("--user", help="only this user (default: everyone)")
+        export.add_argument("--path", help=f"target file (default: {config.EXPORT_PATH})")
+
+        imports = commands.add_parser("import", parents=[login], help="import a CSV/OFX/QIF file")
+        imports.add_argument("path")
+        imports.add_argument("--format", dest="file_format", choices=("csv", "ofx", "qfx", "qif"))
+
+        batch = commands.add_parser("batch", parents=[login], help="run the commands in a file, one per line")
+        batch.add_argument("path", help='command file ("-" for stdin)')
+
+        report_all = commands.add_parser("report-all", help="reports of every user, on worker processes")
+        report_all.add_argument("--month", help="YYYY-MM: also that month's totals and budget")
+        report_all.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+
+        month_end = commands.add_parser("month-end", help="month-end reports of every user, on worker processes")
+        month_end.add_argument("--month", help="YYYY-MM (default: this month)")
+        month_end.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+        month_end.add_argument("--output", dest="path", help=f"results file (default: {config.MONTH_END_PATH})")
+        return parser
+
+    def run(self, argv):
+        """Run one command line (a list of arguments); returns True when it succeeded."""
+        command = argv[0] if argv else None
+        try:
+            args = self.parser.parse_args(argv)
+            command = args.command
+            if command is None:
+                raise CommandError("no command given")
+            result = getattr(self, f"cmd_{command.replace('-', '_')}")(args)
+        except (CommandError, ValueError, OSError) as e:
+            self._emit({"ok": False, "command": command, "error": str(e)})
+            return False
+        self._emit({"ok": True, "command": command, "result": result})
+        return True
+
+    def _emit(self, record):
+        self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+    # -------------------------------
+    # Helpers
+    # -------------------------------
+    def _login(self, args):
+        username = args.user or self.defaults.get("user")
+        pin = args.pin or self.defaults.get("pin") or os.environ.get("FIN_PIN", "")
+        if not username:
+            raise CommandError("--user is required")
+        current = self.user_manager.current_user
+        if current is not None and current["username"] == username and current["pin"] == pin:
+            return current
+        if self.user_manager.authenticate(username, pin) is None:
+            raise CommandError("invalid credentials")
+        return self.user_manager.current_user
+
+    def _date(self, text, name):
+        return ledger_service.parse_date(text, name) if text is not None else None
+
+    def _amount(self, text):
+        if text is None:
+            return None
+        return ledger_service.parse_amount(self.user_manager.current_user, text, positive=False)
+
+    def _transaction(self, t):
+        return ledger_service.transaction_to_json(self.user_manager.current_user, t)
+
+    # -------------------------------
+    # Commands (each returns the JSON result)
+    # -------------------------------
+    def cmd_users(self, args):
+        return [u["username"] for u in self.user_manager.users]
+
+    def cmd_register(self, args):
+        if not args.user:
+            raise CommandError("--user is required")
+        pin = args.pin or os.environ.get("FIN_PIN", "")
+        user = self.user_manager.create_user(args.user, pin)
+        return {"username": user["username"], "currency": user["currency"]}
+
+    def cmd_add(self, args):
+        self._login(args)
+        transaction = ledger_service.add_transaction(self.user_manager, args.t_type, args.amount, args.category,
+                                                     args.note, args.date, args.tid)
+        return self._transaction(transaction)
+
+    def cmd_list(self, args):
+        self._login(args)
+        query = Query(
+            start=self._date(args.start, "--from"),
+            end=self._date(args.end, "--to"),
+            categories=args.categories,
+            min_amount=self._amount(args.min_amount),
+            max_amount=self._amount(args.max_amount),
+            t_type=args.t_type,
+            note=args.note,
+            limit=args.limit,
+            offset=args.offset,
+        )
+        if args.sort:
+            query = query.order_by(args.sort, descending=args.desc)
+        results = ledger_service.search(self.user_manager, query)
+        return {
+            "currency": self.user_manager.currency(),
+            "plan": results.plan,
+            "transactions": [self._transaction(t) for t in results],
+        }
+
+    def cmd_delete(self, args):
+        self._login(args)
+        return self._transaction(ledger_service.delete_transaction(self.user_manager, args.tid))
+
+    def cmd_report(self, args):
+        user = self._login(args)
+        result = {"report": args.kind, "currency": ledger_service.currency(user)}
+        if args.kind == "dashboard":
+            totals = ledger_service.totals(user).to_json()
+            del totals["month"]
+            result.update(totals)
+        elif args.kind == "monthly":
+            if not args.month:
+                raise CommandError("--month is required for the monthly report")
+            result.update(ledger_service.totals(user, ledger_service.parse_month(args.month)).to_json())
+        elif args.kind == "categories":
+            result["categories"] = to_json(ledger_service.category_breakdown(user))
+        elif args.kind == "trends":
+            result["expense_by_month"] = to_json(ledger_service.spending_trends(user))
+        else:
+            top = ledger_service.top_expenses(self.user_manager, args.count, args.month)
+            result.update(month=args.month, transactions=[self._transaction(t) for t in top])
+        return result
+
+    def cmd_export(self, args):
+        if args.user is not None and self.user_manager.find_user(args.user) is None:
+            raise CommandError(f"unknown user {args.user!r}")
+        self.user_manager.flush()
+        path = args.path or config.EXPORT_PATH
+        rows = self.user_manager.data_manager.export_to_csv(
+            self.user_manager.users, path, username=args.user,
+            start=self._date(args.start, "--from"), end=self._date(args.end, "--to"), categories=args.categories,
+        )
+        if rows is None:
+            raise CommandError("export failed (see the messages on stderr)")
+        return {"rows": rows, "path": path}
+
+    def cmd_import(self, args):
+        self._login(args)
+        importer = ImportManager(self.user_manager, batch_size=config.IMPORT_BATCH_SIZE)
+        stats = importer.import_file(args.path, file_format=args.file_format, progress=False)
+        stats["seconds"] = round(stats["seconds"], 3)
+        return stats
+
+    def cmd_batch(self, args):
+        if self.defaults:
+            raise CommandError("batch files cannot run other batch files")
+        self.defaults = {"user": args.user, "pin": args.pin}
+        commands = failed = 0
+        try:
+            f = sys.stdin if args.path == "-" else open(args.path, "r", encoding="utf-8")
+            try:
+                # one save for every change of the file
+                with self.user_manager.saves.held():
+                    for line in f:
+                        try:
+                            argv = shlex.split(line, comments=True)
+                        except ValueError as e:  # unbalanced quotes
+                            commands += 1
+                            failed += 1
+                            self._emit({"ok": False, "command": None, "error": str(e)})
+                            continue
+                        if argv:
+                            commands += 1
+                            failed += not self.run(argv)
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+        finally:
+            self.defaults = {}
+        if failed:
+            raise CommandError(f"{failed} of {commands} command(s) failed")
+        return {"commands": commands}
+
+    def cmd_report_all(self, args):
+        month = ledger_service.parse_month(args.month) if args.month else None
+        reports = MonthEndManager(self.user_manager).reports(month, args.workers)
+        return {"month": month, "users": to_json(reports)}
+
+    def cmd_month_end(self, args):
+        return MonthEndManager(self.user_manager).run(args.month, args.workers, args.path)
+
+
+def main(argv):
+    """Entry point of `python main.py COMMAND ...`; returns the exit status."""
+    out = sys.stdout
+    # only the JSON lines go to stdout
+    with redirect_stdout(sys.stderr):
+        user_manager = UserManager()
+        try:
+            ok = CommandManager(user_manager, out=out).run(argv)
+        finally:
+            user_manager.close()
+    return 0 if ok else 1
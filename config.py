@@ -0,0 +1,89 @@
+import os
+
+# Storage settings (can be overridden with environment variables)
+
+# "json"    -> rewrite users.json on every save (default)
+# "journal" -> append each change to users.journal, compact into users.json in the background
+# "sharded" -> one file per user in data/users/ plus an index; only the changed user is rewritten
+# "sqlite"  -> local SQLite database (WAL mode) with indexed tables, see SQLITE_PATH
+# "binary"  -> compact binary snapshot (users.bin) read through mmap, see BINARY_PATH;
+#              convert with: python binary_snapshot_manager.py to-binary|to-json SOURCE TARGET
+STORAGE_MODE = os.environ.get("FIN_STORAGE_MODE", "json")
+
+# json mode: read only the user directory at startup (users.idx) and load a user's
+# transactions on login
+LAZY_LOAD = os.environ.get("FIN_LAZY_LOAD", "1") == "1"
+
+# Database file for the sqlite backend (default: next to users.json, as users.db)
+SQLITE_PATH = os.environ.get("FIN_SQLITE_PATH") or None
+
+# Snapshot file for the binary backend (default: next to users.json, as users.bin)
+BINARY_PATH = os.environ.get("FIN_BINARY_PATH") or None
+
+# Keep a logged-in user's transactions in a columnar TransactionStore (much less memory,
+# array/NumPy scans) instead of a list of dicts
+COLUMNAR_TRANSACTIONS = os.environ.get("FIN_COLUMNAR", "0") == "1"
+
+# Durability of saves (every save is an atomic temp-file + rename either way):
+# "always"   -> fsync on every save: nothing saved is lost on a crash or power cut (slowest)
+# "group"    -> fsync once every FSYNC_GROUP_SIZE saves: a crash can lose the last group
+# "interval" -> fsync at most every FSYNC_INTERVAL seconds: a crash can lose that window
+# "none"     -> never fsync, leave it to the OS (fastest)
+# Lost or damaged data is restored from the newest valid backup on the next start.
+# Compare the modes on this disk with: python durability_manager.py
+DURABILITY = os.environ.get("FIN_DURABILITY", "always")
+FSYNC_GROUP_SIZE = int(os.environ.get("FIN_FSYNC_GROUP_SIZE", "20"))
+FSYNC_INTERVAL = float(os.environ.get("FIN_FSYNC_INTERVAL", "1.0"))
+
+# Deferred saves: changes are written together once no change arrived for SAVE_DELAY_MS,
+# or as soon as SAVE_MAX_CHANGES are pending (and always on exit). 0 = save every change at once.
+SAVE_DELAY_MS = int(os.environ.get("FIN_SAVE_DELAY_MS", "500"))
+SAVE_MAX_CHANGES = int(os.environ.get("FIN_SAVE_MAX_CHANGES", "50"))
+
+# Background writes: saves and backups run on a writer thread so the menu returns at once;
+# at most WRITE_QUEUE_SIZE saves wait in line (further changes wait for a free slot).
+# Pending saves are written before exit. 0 = save on the menu thread.
+BACKGROUND_WRITES = os.environ.get("FIN_BACKGROUND_WRITES", "1") == "1"
+WRITE_QUEUE_SIZE = int(os.environ.get("FIN_WRITE_QUEUE_SIZE", "16"))
+
+# Several sessions may use the same data directory at once: saves lock the store (or, in
+# sharded mode, only the users being saved) and merge with what other sessions saved.
+# Seconds to wait for a lock held by another session before the save fails.
+LOCK_TIMEOUT = float(os.environ.get("FIN_LOCK_TIMEOUT", "10"))
+
+# Currency of new users and of amounts saved before amounts were kept as whole minor units
+# (ISO 4217 code: "USD" -> cents, "JPY" -> yen, "KWD" -> fils). Existing users keep theirs.
+CURRENCY = os.environ.get("FIN_CURRENCY", "USD")
+
+# HTTP API server (python api_server.py): address to listen on ("0.0.0.0" for the LAN),
+# threads running requests (one user's requests run one at a time), and seconds an idle
+# keep-alive connection stays open. PINs travel in plain HTTP: keep it on a trusted network.
+API_HOST = os.environ.get("FIN_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("FIN_API_PORT", "8765"))
+API_WORKERS = int(os.environ.get("FIN_API_WORKERS", "8"))
+API_KEEPALIVE_TIMEOUT = float(os.environ.get("FIN_API_KEEPALIVE_TIMEOUT", "15"))
+
+# Month-end batch job (`python main.py month-end`, also `report-all`): worker processes (0 = one per CPU)
+# and the results file ({month} is replaced by the month, e.g. month_end_2025-01.json)
+MONTH_END_WORKERS = int(os.environ.get("FIN_MONTH_END_WORKERS", "0"))
+MONTH_END_PATH = os.environ.get("FIN_MONTH_END_PATH", os.path.join("backup", "month_end_{month}.json"))
+
+# Number of journal records before a background compaction is started
+JOURNAL_COMPACT_EVERY = int(os.environ.get("FIN_JOURNAL_COMPACT_EVERY", "500"))
+
+# CSV export: default file (.gz / .zst are compressed), rows fetched and written per batch,
+# and the size in bytes after which a new numbered part is started (0 = one file)
+EXPORT_PATH = os.environ.get("FIN_EXPORT_PATH", os.path.join("backup", "transactions_export.csv"))
+EXPORT_BATCH_SIZE = int(os.environ.get("FIN_EXPORT_BATCH_SIZE", "5000"))
+EXPORT_MAX_BYTES = int(os.environ.get("FIN_EXPORT_MAX_BYTES", "0"))
+
+# Bulk import: rows parsed, validated and deduplicated per batch (saved once at the end)
+IMPORT_BATCH_SIZE = int(os.environ.get("FIN_IMPORT_BATCH_SIZE", "5000"))
+
+# Backups: newest N are always kept, plus the last backup of each day for D days
+BACKUP_KEEP_LAST = int(os.environ.get("FIN_BACKUP_KEEP_LAST", "20"))
+BACKUP_KEEP_DAYS = int(os.environ.get("FIN_BACKUP_KEEP_DAYS", "30"))
+# Average transactions per deduplicated backup chunk (cut on content, see BackupManager)
+BACKUP_CHUNK_SIZE = int(os.environ.get("FIN_BACKUP_CHUNK_SIZE", "256"))
+# Seconds an unreferenced backup object is kept after it was last written or reused
+BACKUP_GC_GRACE = int(os.environ.get("FIN_BACKUP_GC_GRACE", "3600"))
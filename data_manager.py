@@ -1,76 +1,444 @@
 import json
-import csv
 import os
-import shutil
-from datetime import datetime
+import threading
+
+import config
+from backup_manager import BackupManager
+from durability_manager import DurabilityManager
+from export_manager import ExportManager
+from journal_manager import JournalManager
+from lock_manager import LockManager
+from money import migrate_user
+from storage_backend import BinaryBackend, JsonBackend, ShardedBackend
+from sqlite_backend import SqliteBackend
+from transaction_store import TransactionStore, to_json
+from writer_manager import WriterManager
+
+BACKUP_LOCK = "backups"  # LockManager name shared by every session backing up to backup_dir
 
 class DataManager:
-    def __init__(self, file_path="data/users.json", backup_dir="data/backup"):
+    """
+    Loads and saves users through a storage backend (see StorageBackend),
+    chosen by config.STORAGE_MODE, and takes care of backups and exports.
+
+    With config.BACKGROUND_WRITES, saves and their backups run on a writer
+    thread (see WriterManager) from snapshots taken when the save is asked
+    for; errors are shown by report_errors. io_lock guards the backend and
+    backups against the writer thread and the journal's compaction thread;
+    the "backups" lock serializes backups between sessions.
+
+    Several sessions (processes) can share the data directory: every save
+    re-reads what is stored under the backend's lock and only puts in the
+    users this session changed, checking their version (see _merge_users).
+
+    Users saved before amounts were integer minor units are converted when
+    they are read (see money.migrate_user); UserManager saves them back.
+    """
+
+    def __init__(self, file_path="data/users.json", backup_dir="data/backup", storage_mode=None):
         self.file_path = file_path
         self.backup_dir = backup_dir
+        self.storage_mode = storage_mode or config.STORAGE_MODE
         os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
         os.makedirs(self.backup_dir, exist_ok=True)
 
-    # Load data on startup
-    def load_data(self):
-        if not os.path.exists(self.file_path):
-            print("No saved data found ")
-            return []
+        self.durability = DurabilityManager(
+            config.DURABILITY, group_size=config.FSYNC_GROUP_SIZE, interval=config.FSYNC_INTERVAL
+        )
+        self.locks = LockManager(os.path.join(os.path.dirname(self.file_path), "locks"), timeout=config.LOCK_TIMEOUT)
+        self.backups = BackupManager(
+            self.backup_dir,
+            keep_last=config.BACKUP_KEEP_LAST,
+            keep_days=config.BACKUP_KEEP_DAYS,
+            chunk_size=config.BACKUP_CHUNK_SIZE,
+            durability=self.durability,
+            lock=lambda: self.locks.locked([BACKUP_LOCK]),
+            gc_grace=config.BACKUP_GC_GRACE,
+        )
+        self.backend = self._create_backend()
+        self.exporter = ExportManager(
+            self.backend, batch_size=config.EXPORT_BATCH_SIZE, max_bytes=config.EXPORT_MAX_BYTES,
+            currency=config.CURRENCY,
+        )
+        self.io_lock = threading.RLock()
+        self.writer = WriterManager(config.WRITE_QUEUE_SIZE) if config.BACKGROUND_WRITES else None
+        self._unsaved = set()  # usernames whose last background write failed
+        self._failed_records = []  # journal records still to be appended
+        self.versions = {}  # username -> stored version our copy of the user is based on
+        self.stale = set()  # usernames changed by another session, see take_stale
+        self.migrated = set()  # usernames converted to minor units and not saved yet, see take_migrated
+
+    def _create_backend(self):
+        if self.storage_mode == "json":
+            return JsonBackend(self.file_path, lazy=config.LAZY_LOAD, durability=self.durability, locks=self.locks)
+        if self.storage_mode == "journal":
+            return JsonBackend(
+                self.file_path,
+                journal=True,
+                compact_every=config.JOURNAL_COMPACT_EVERY,
+                on_compact=self.create_backup,
+                durability=self.durability,
+                locks=self.locks,
+            )
+        if self.storage_mode == "sharded":
+            return ShardedBackend(self.file_path, durability=self.durability, locks=self.locks)
+        if self.storage_mode == "sqlite":
+            return SqliteBackend(
+                self.file_path, db_path=config.SQLITE_PATH, durability=self.durability, locks=self.locks,
+                currency=config.CURRENCY,
+            )
+        if self.storage_mode == "binary":
+            return BinaryBackend(
+                self.file_path, binary_path=config.BINARY_PATH, durability=self.durability, locks=self.locks
+            )
+        raise ValueError(f"Unknown storage mode: {self.storage_mode}")
 
+    # Load data on startup; damaged data is replaced from the newest valid backup
+    def load_data(self):
         try:
-            with open(self.file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                print(" Data loaded successfully.")
-                return data
-        except json.JSONDecodeError:
-            print(" Corrupted data file. Starting new session.")
+            with self.backend.locked([]):
+                users = self.backend.load_users()
+        except Exception as e:
+            print(f" Saved data could not be read ({e}).")
+            users = self.recover_from_backup()
+        self.versions = {u["username"]: u.get("version", 0) for u in users}
+        for user in users:
+            self._migrate(user)
+        if self.migrated:
+            print(f" Converted the amounts of {len(self.migrated)} user(s) to {config.CURRENCY} minor units.")
+        return users
+
+    def recover_from_backup(self):
+        backup_id, users = self.backups.restore_latest_valid()
+        if users is None:
+            print(" No valid backup found. Starting new session.")
             return []
+        for user in users:
+            migrate_user(user, config.CURRENCY)
+        try:
+            with self.backend.locked([u["username"] for u in users]):
+                self.backend.recover(users)
+        except Exception as e:
+            print(f" Error saving recovered data: {e}")
+        print(f" Recovered {len(users)} user(s) from backup {backup_id}.")
+        return users
+
+    # Fill a user stub (lazy backends only load users on login)
+    def load_user(self, user):
+        with self.io_lock:
+            if self.backend.is_stub(user):
+                with self.backend.locked([user["username"]]):
+                    self.backend.load_user(user)
+                self.versions[user["username"]] = user.get("version", 0)
+                self._migrate(user)
+        return self._prepare(user)
+
+    def _migrate(self, user):
+        if migrate_user(user, config.CURRENCY):
+            self.migrated.add(user["username"])
+
+    def take_migrated(self):
+        """Usernames converted to minor units since the last call (to be saved whole)."""
+        migrated, self.migrated = self.migrated, set()
+        return migrated
+
+    def _prepare(self, user):
+        if config.COLUMNAR_TRANSACTIONS and isinstance(user.get("transactions"), list):
+            user["transactions"] = TransactionStore(user["transactions"])
+        return user
 
-    #  Save to JSON (main)
-    def save_data(self, users):
+    #  Save all users
+    # changed: usernames modified since the last save (None = unknown, back up everyone)
+    def save_data(self, users, changed=None):
+        if self.writer is not None:
+            self.writer.submit("saving data", self._save_users_job, self._snapshot_users(users, changed), changed)
+            return
         try:
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(users, f, indent=4)
+            users, changed = self._write_users(users, changed)
             print(" Data saved successfully.")
-            self.create_backup()  # Auto backup after each save
+            self.create_backup(users, changed)  # Auto backup after each save
         except Exception as e:
             print(f" Error saving data: {e}")
 
-    #  Save to CSV (optional export)
-    def export_to_csv(self, users, file_name="/home/ahmed/Desktop/py-project/backup/transactions_export.csv"):
+    #  Save a single change (journal-style record, see JournalManager)
+    def save_change(self, users, record):
+        self.save_changes(users, [record])
+
+    #  Save several changes with one write and one backup (deferred saves)
+    def save_changes(self, users, records):
+        if self.writer is not None:
+            # records point at live transactions: serialize them now, as the journal would
+            records = json.loads(json.dumps(records, default=to_json))
+            snapshot = None
+            if self.storage_mode != "journal":
+                snapshot = self._snapshot_users(users, {r["user"] for r in records})
+            self.writer.submit("saving changes", self._save_changes_job, snapshot, records)
+            return
         try:
-            os.makedirs(os.path.dirname(file_name), exist_ok=True)
-            with open(file_name, "w", newline='', encoding="utf-8") as csvfile:
-                fieldnames = ["username", "type", "amount", "category", "date", "note"]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-
-                for user in users:
-                    username = user["username"]
-                    for t in user.get("transactions", []):
-                        row = {
-                            "username": username,
-                            "type": t["type"],
-                            "amount": t["amount"],
-                            "category": t["category"],
-                            "date": t["date"],
-                            "note": t["note"]
-                        }
-                        writer.writerow(row)
-
-            print(f" Transactions exported to CSV: {file_name}")
+            users, changed = self._write_changes(users, records)
+        except Exception as e:
+            print(f" Error saving changes: {e}")
+            return
+        # Journal mode backs up after each compaction instead
+        if users is not None:
+            print(" Data saved successfully.")
+            self.create_backup(users, changed)
+
+    # -------------------------------
+    # Writing (menu thread or writer thread)
+    # -------------------------------
+    def _write_users(self, users, changed):
+        """Full save; returns the users written and the usernames saved (for the backup)."""
+        if changed is not None:
+            changed = set(changed) | self._unsaved
+        names = changed if changed is not None else [u["username"] for u in users if not self.backend.is_stub(u)]
+        with self.io_lock:
+            try:
+                with self.backend.locked(names):
+                    users, written, merged = self._merge_users(users, changed)
+                    self.backend.save_users(users, written)
+                self.durability.commit()
+            except Exception:
+                # rebound, never changed in place: _snapshot_users reads it from the menu thread
+                self._unsaved = self._unsaved | set(names)
+                raise
+            self._saved(users, written, merged)
+            self._unsaved = set()
+        return users, written
+
+    def _write_changes(self, users, records):
+        """Save records; returns what _write_users does, or (None, None) in journal mode (no backup)."""
+        changed = {r["user"] for r in records}
+        with self.io_lock:
+            if self.storage_mode == "journal":
+                # records are merged by replay, in the order sessions appended them
+                records = self._failed_records + records
+                try:
+                    with self.backend.locked(changed):
+                        self.backend.save_changes(users, records)
+                except Exception:
+                    self._failed_records = records
+                    raise
+                self._failed_records = []
+                self.durability.commit()
+                return None, None
+            if self._unsaved:
+                # an earlier write failed: its records are lost, save those users whole
+                return self._write_users(users, changed)
+            try:
+                with self.backend.locked(changed):
+                    users, written, merged = self._merge_users(users, changed, records)
+                    self.backend.save_changes(users, records)
+                self.durability.commit()
+            except Exception:
+                self._unsaved = self._unsaved | changed
+                raise
+            self._saved(users, written, merged)
+        return users, written
+
+    def _merge_users(self, users, changed, records=None):
+        """
+        Users to write (call while locked): everyone as stored right now, so
+        other sessions' saves are kept, with our changed users put in place
+        and our new users added at the end. Every written user's version is
+        the stored one + 1.
+
+        A changed user that another session saved since we loaded it (stored
+        version != ours) is merged: our records are applied again on top of
+        the stored copy. Full saves (no records, e.g. a restore) overwrite it.
+        Returns (users to write, usernames written, usernames merged).
+        """
+        result = list(self.backend.stored_users())
+        position = {u["username"]: i for i, u in enumerate(result)}
+        written, merged, stale = set(), set(), set()
+        for user in users:
+            name = user["username"]
+            i = position.get(name)
+            stored_version = result[i].get("version", 0) if i is not None else 0
+            if self.backend.is_stub(user) or (changed is not None and name not in changed):
+                if i is not None and stored_version != self.versions.get(name, stored_version):
+                    stale.add(name)
+                continue
+            if i is not None and records is not None and stored_version != self.versions.get(name, stored_version):
+                user = self._merge_user(result[i], [r for r in records if r["user"] == name])
+                merged.add(name)
+            user["version"] = stored_version + 1
+            if i is None:
+                position[name] = len(result)
+                result.append(user)
+            else:
+                result[i] = user
+            written.add(name)
+        if stale:
+            self.stale = self.stale | stale
+        return result, written, merged
+
+    def _merge_user(self, stored, records):
+        users = [dict(self.backend.full_user(stored))]
+        migrate_user(users[0], config.CURRENCY)
+        for record in records:
+            JournalManager.apply(users, record)
+        # totals saved by the other session no longer match
+        users[0].pop("aggregates", None)
+        return users[0]
+
+    def _saved(self, users, written, merged):
+        for user in users:
+            if user["username"] in written - merged:
+                self.versions[user["username"]] = user["version"]
+        # Merged users keep their old base version until reloaded, so further
+        # changes are merged onto the stored copy too
+        if merged:
+            self.stale = self.stale | merged
+
+    # -------------------------------
+    # Changes made by other sessions
+    # -------------------------------
+    def take_stale(self):
+        """Usernames another session changed since we loaded them (each reported once)."""
+        stale, self.stale = self.stale, set()
+        return stale
+
+    def reload_user(self, user):
+        """Replace a loaded user in place with what is stored now."""
+        self.drain()
+        name = user["username"]
+        with self.io_lock:
+            with self.backend.locked([name]):
+                stored = next((u for u in self.backend.stored_users() if u["username"] == name), None)
+                fresh = self.backend.full_user(stored) if stored is not None else None
+            if fresh is None:
+                return user
+            user.clear()
+            user.update(fresh)
+            self.versions[name] = user.get("version", 0)
+            self._migrate(user)
+        return self._prepare(user)
+
+    def new_users(self, known):
+        """Users registered by other sessions: stored users whose username is not in known."""
+        self.drain()
+        with self.io_lock:
+            with self.backend.locked([]):
+                stored = self.backend.stored_users()
+        users = [u for u in stored if u["username"] not in known]
+        for user in users:
+            self.versions[user["username"]] = user.get("version", 0)
+            self._migrate(user)
+        return users
+
+    # -------------------------------
+    # Background writes (writer thread)
+    # -------------------------------
+    def _snapshot_users(self, users, changed):
+        """
+        Copy of users as they are now, for the writer thread. Only changed
+        users (and those whose last write failed) are copied; the others
+        become stubs, replaced by their stored copy when written: every
+        earlier change of theirs is already queued ahead of this save.
+        """
+        if changed is not None:
+            changed = set(changed) | self._unsaved
+        snapshot = []
+        for user in users:
+            if self.backend.is_stub(user) or (changed is not None and user["username"] not in changed):
+                snapshot.append({"username": user["username"], "pin": user.get("pin")})
+            else:
+                snapshot.append(self._copy_user(user))
+        return snapshot
+
+    def _copy_user(self, user):
+        copy = {}
+        for key, value in user.items():
+            if key == "transactions":
+                copy[key] = [dict(t) for t in value]  # flat dicts (or columnar views)
+            else:
+                copy[key] = json.loads(json.dumps(value, default=to_json))
+        return copy
+
+    def _save_users_job(self, users, changed):
+        self._backup(*self._write_users(users, changed))
+
+    def _save_changes_job(self, users, records):
+        users, changed = self._write_changes(users, records)
+        if users is not None:
+            self._backup(users, changed)
+
+    def _backup(self, users, changed):
+        try:
+            with self.io_lock:
+                self.backups.create_backup(users, changed, resolve_user=self.backend.full_user)
+        except Exception as e:
+            raise RuntimeError(f"backup failed: {e}") from e
+
+    # Wait until every queued save has been written
+    def drain(self):
+        if self.writer is not None:
+            self.writer.drain()
+
+    # Print errors of background saves since the last call
+    def report_errors(self):
+        if self.writer is None:
+            return
+        for error in self.writer.take_errors():
+            print(error)
+
+    # Transactions of a user matching the filters (pushed into SQL by the sqlite backend)
+    def query_transactions(self, user, **filters):
+        self.drain()
+        with self.io_lock:
+            return self.backend.query_transactions(user, **filters)
+
+    # Wait for background work (queued saves, journal compaction) before exit
+    def close(self):
+        if self.writer is not None:
+            pending = self.writer.pending()
+            if pending:
+                print(f" Waiting for {pending} pending save(s)...")
+            self.writer.close()
+            self.report_errors()
+        self.backend.close()
+        self.durability.close()
+
+    #  Save to CSV (optional export), streamed in batches
+    # target: path (.gz / .zst compressed), "-" for stdout or a file object
+    # filters: username, start, end, categories, compression (see ExportManager.export)
+    def export_to_csv(self, users, target=None, **filters):
+        target = target or config.EXPORT_PATH
+        self.drain()
+        try:
+            with self.io_lock:
+                rows, files = self.exporter.export(users, target, **filters)
+            if files:
+                print(f" Exported {rows} transaction(s) to CSV: {', '.join(files)}")
+            return rows
         except Exception as e:
             print(f" Error exporting CSV: {e}")
+            return None
 
-    # Create backup copy
-    def create_backup(self):
+    # Create backup (only changed users / chunks are written)
+    # Also called from the journal's compaction thread: io_lock keeps it off the backend meanwhile
+    def create_backup(self, users, changed=None):
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(self.backup_dir, f"backup_{timestamp}.json")
-            shutil.copy(self.file_path, backup_file)
+            with self.io_lock:
+                backup_file = self.backups.create_backup(users, changed, resolve_user=self.backend.full_user)
             print(f" Backup created: {backup_file}")
         except Exception as e:
             print(f" Backup failed: {e}")
 
+    def list_backups(self):
+        self.drain()
+        return self.backups.list_backups()
 
-            
\ No newline at end of file
+    # Point-in-time restore: newest backup at or before `at` (None = latest)
+    def restore_backup(self, at=None):
+        self.drain()
+        try:
+            with self.io_lock:
+                users = self.backups.restore(at)
+        except Exception as e:
+            print(f" Restore failed: {e}")
+            return None
+        for user in users or []:
+            migrate_user(user, config.CURRENCY)  # saved whole by the caller
+        return users
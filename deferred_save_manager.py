@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+
+
+class DeferredSaveManager:
+    """
+    Coalesces saves: changes are queued as journal-style records and written
+    together by one flush (one save and one backup for all dirty users).
+
+    A flush runs on a timer thread once no change has arrived for `delay`
+    seconds, or right away (still in the background) when `max_changes` are
+    pending. flush() writes everything now; close() is a final flush.
+    delay <= 0 saves every change immediately on the calling thread.
+    Inside held() nothing is written until the block ends (batch runs).
+
+    `lock` must be held while users are changed, so a flush never sees a
+    half-made change; flushes take it too.
+    """
+
+    def __init__(self, flush_records, delay=0.5, max_changes=50):
+        self.flush_records = flush_records  # called with the pending records, oldest first
+        self.delay = delay
+        self.max_changes = max_changes
+        self.lock = threading.RLock()
+        self.pending = []
+        self.dirty = set()  # usernames with pending changes
+        self._timer = None
+        self._held = 0
+
+    def mark(self, record):
+        with self.lock:
+            self.pending.append(record)
+            self.dirty.add(record["user"])
+            if self._held:
+                return
+            if self.delay <= 0:
+                self.flush()
+            elif len(self.pending) >= self.max_changes:
+                self._schedule(0)
+            else:
+                self._schedule(self.delay)  # debounce: every change restarts the wait
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            records, self.pending = self.pending, []
+            self.dirty = set()
+            if records:
+                self.flush_records(records)
+
+    @contextmanager
+    def held(self):
+        """Queue every change made in the block, then write them with one flush."""
+        with self.lock:
+            self._held += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            yield
+        finally:
+            with self.lock:
+                self._held -= 1
+                if not self._held:
+                    self.flush()
+
+    def close(self):
+        self.flush()
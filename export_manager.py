@@ -0,0 +1,152 @@
+import csv
+import gzip
+import io
+import os
+import sys
+
+from money import format_amount
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst exports
+    zstandard = None
+
+
+FIELDS = ("username", "type", "amount", "category", "date", "note")
+
+
+class ExportManager:
+    """
+    Streaming CSV export.
+
+    Rows are pulled from the storage backend a batch at a time and written
+    with csv.writer, so memory stays flat however large the ledger is. The
+    output can be a path (optionally gzip/zstd compressed and rotated into
+    numbered parts by size), "-" for stdout, or any text/binary file object.
+    Amounts are written as decimal text ("12.50"), so files can be imported again.
+    """
+
+    def __init__(self, backend, batch_size=5000, max_bytes=0, currency="USD"):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes  # 0 = never rotate
+        self.currency = currency  # for users not loaded (stubs carry no currency)
+
+    def export(self, users, target, username=None, start=None, end=None, categories=None, compression=None):
+        """
+        Write the matching transactions of users (or only `username`) to target.
+        compression: None (guessed from the file extension), "none", "gzip" or "zstd".
+        Returns (rows written, list of files written).
+        """
+        if compression is None:
+            compression = self._guess_compression(target)
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("zstd export needs the 'zstandard' package")
+
+        output = _Output(target, compression, self.max_bytes)
+        rows = 0
+        try:
+            for user in users:
+                if username is not None and user["username"] != username:
+                    continue
+                for batch in self._batches(user, start, end, categories):
+                    output.write_rows(batch)
+                    rows += len(batch)
+        finally:
+            output.close()
+        return rows, output.files
+
+    def _batches(self, user, start, end, categories):
+        name = user["username"]
+        currency = user.get("currency", self.currency)
+        batch = []
+        for t in self.backend.iter_transactions(user, batch_size=self.batch_size,
+                                                start=start, end=end, categories=categories):
+            amount = format_amount(t.get("amount"), currency)
+            batch.append((name, t.get("type"), amount, t.get("category"), t.get("date"), t.get("note")))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _guess_compression(self, target):
+        if isinstance(target, str):
+            if target.endswith(".gz"):
+                return "gzip"
+            if target.endswith(".zst"):
+                return "zstd"
+        return "none"
+
+
+class _Output:
+    """CSV writer over a path, stdout or file object; a new part is started once max_bytes is reached."""
+
+    def __init__(self, target, compression, max_bytes):
+        self.target = sys.stdout if target == "-" else target
+        self.compression = compression
+        self.max_bytes = max_bytes if isinstance(self.target, str) else 0
+        self.files = []
+        self.part = 0
+        self.raw = None  # file opened here (None when writing to the caller's stream)
+        self.stream = None  # compressor, if any
+        self.text = None
+        self._open()
+
+    def _open(self):
+        target = self.target
+        self.raw = self.stream = None
+        if isinstance(target, str):
+            path = self._part_path(target)
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.raw = binary = open(path, "wb")
+            self.files.append(path)
+        elif isinstance(target, io.TextIOBase) and self.compression == "none":
+            binary = None
+        else:
+            # compressed output to a text stream (stdout) goes to its byte buffer
+            binary = getattr(target, "buffer", target)
+
+        if self.compression == "gzip":
+            self.stream = gzip.GzipFile(fileobj=binary, mode="wb")
+        elif self.compression == "zstd":
+            self.stream = zstandard.ZstdCompressor().stream_writer(binary, closefd=False)
+
+        if binary is None:
+            self.text = target
+        else:
+            self.text = io.TextIOWrapper(self.stream or binary, encoding="utf-8", newline="", write_through=True)
+        self.writer = csv.writer(self.text)
+        self.writer.writerow(FIELDS)
+
+    def _part_path(self, path):
+        if not self.max_bytes:
+            return path
+        # transactions.csv.gz -> transactions-0001.csv.gz
+        directory, base = os.path.split(path)
+        stem, dot, suffix = base.partition(".")
+        return os.path.join(directory, f"{stem}-{self.part + 1:04d}{dot}{suffix}")
+
+    def write_rows(self, rows):
+        if self.text is None:
+            self.part += 1
+            self._open()
+        self.writer.writerows(rows)
+        if self.max_bytes and self.raw.tell() >= self.max_bytes:
+            self.close()  # the next batch opens the next part
+
+    def close(self):
+        if self.text is None:
+            return
+        self.text.flush()
+        if self.text is not self.target:
+            # detach so the caller's stream is never closed by the wrapper
+            self.text.detach()
+        if self.stream is not None:
+            self.stream.close()
+        if self.raw is not None:
+            self.raw.close()
+        elif hasattr(self.target, "flush"):
+            self.target.flush()
+        self.text = None
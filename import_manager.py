@@ -0,0 +1,232 @@
+import csv
+import datetime
+import os
+import re
+import time
+import uuid
+from collections import Counter
+
+from index_manager import normalize_category
+from money import Money
+
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+QIF_DATE = re.compile(r"^\s*(\d{1,2})/\s*(\d{1,2})['/-]\s*(\d{2,4})\s*$")
+
+
+def parse_amount(value, currency):
+    """'1,234.50', '-12', ' 7.1 ' -> Money; ValueError for anything else."""
+    return Money.parse(value, currency)
+
+
+def parse_date(value):
+    """ISO (2024-01-31), OFX (20240131[120000...]) or QIF (1/31/2024, 1/31'24) -> ISO date."""
+    text = str(value or "").strip()
+    try:
+        if len(text) >= 8 and text[:8].isdigit():
+            return datetime.date(int(text[:4]), int(text[4:6]), int(text[6:8])).isoformat()
+        match = QIF_DATE.match(text)
+        if match:
+            month, day, year = (int(part) for part in match.groups())
+            if year < 100:
+                year += 2000 if year < 70 else 1900
+            return datetime.date(year, month, day).isoformat()
+        return datetime.date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"invalid date {value!r}") from None
+
+
+class ImportManager:
+    """
+    Bulk import of bank statements into the current user.
+
+    Records are streamed from CSV (the export's columns, "id" optional),
+    OFX or QIF files, then validated and deduplicated a batch at a time:
+    a row is skipped when its id is already known or, for rows without an
+    id, when its fingerprint (date, amount, type, category, note) matches
+    a transaction the ledger had before the import. Fingerprints are
+    counted: two identical purchases in the file are both kept, and
+    re-importing the file skips as many rows as the ledger already has.
+    All accepted rows are committed with a single save at the end.
+    """
+
+    def __init__(self, user_manager, batch_size=5000):
+        self.user_manager = user_manager
+        self.batch_size = batch_size
+
+    def import_file(self, path, file_format=None, progress=True):
+        """
+        Import path into the current user. file_format: "csv", "ofx" or "qif"
+        (default: from the extension). Returns a dict with the counts.
+        """
+        user = self.user_manager.current_user
+        file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+        readers = {"csv": self.read_csv, "ofx": self.read_ofx, "qfx": self.read_ofx, "qif": self.read_qif}
+        if file_format not in readers:
+            raise ValueError(f"Unsupported import format: {file_format}")
+
+        existing = user.get("transactions", [])
+        known_ids = {t.get("id") for t in existing}
+        known_prints = Counter(self.fingerprint(t) for t in existing)
+        stats = {"read": 0, "imported": 0, "duplicates": 0, "invalid": 0, "other_user": 0, "errors": []}
+        accepted = []
+        started = time.perf_counter()
+
+        batch = []
+        for record in readers[file_format](path):
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                accepted.extend(self._process_batch(batch, user["username"], known_ids, known_prints, stats))
+                batch = []
+                if progress:
+                    self._report(stats, len(accepted), started)
+        if batch:
+            accepted.extend(self._process_batch(batch, user["username"], known_ids, known_prints, stats))
+
+        # One save (a single journal record / SQL transaction) for the whole file
+        self.user_manager.add_transactions(accepted)
+        stats["imported"] = len(accepted)
+        stats["seconds"] = time.perf_counter() - started
+        if progress:
+            self._report(stats, len(accepted), started, done=True)
+        return stats
+
+    # -------------------------------
+    # Validation and dedupe (per batch)
+    # -------------------------------
+    def _process_batch(self, batch, username, known_ids, known_prints, stats):
+        accepted = []
+        for line, record in batch:
+            stats["read"] += 1
+            owner = (record.get("username") or "").strip()
+            if owner and owner != username:
+                stats["other_user"] += 1
+                continue
+            try:
+                t = self.validate(record)
+            except ValueError as e:
+                stats["invalid"] += 1
+                if len(stats["errors"]) < 10:
+                    stats["errors"].append(f"line {line}: {e}")
+                continue
+
+            if t["id"] in known_ids:
+                stats["duplicates"] += 1
+                continue
+            if not record.get("id"):
+                fingerprint = self.fingerprint(t)
+                if known_prints[fingerprint] > 0:
+                    known_prints[fingerprint] -= 1  # each stored transaction matches one row
+                    stats["duplicates"] += 1
+                    continue
+            known_ids.add(t["id"])
+            accepted.append(t)
+        return accepted
+
+    def validate(self, record):
+        """Raw record -> transaction dict; raises ValueError when a field is unusable."""
+        amount = parse_amount(record.get("amount"), self.user_manager.currency()).minor
+        t_type = (record.get("type") or "").strip().lower()
+        if not t_type:
+            # bank files: the sign gives the direction
+            t_type = "expense" if amount < 0 else "income"
+        elif t_type not in ("income", "expense"):
+            raise ValueError(f"invalid type {record.get('type')!r}")
+        return {
+            "id": (record.get("id") or "").strip() or str(uuid.uuid4()),
+            "type": t_type,
+            "amount": abs(amount),
+            "category": (record.get("category") or "").strip() or "Uncategorized",
+            "note": (record.get("note") or "").strip(),
+            "date": parse_date(record.get("date")),
+        }
+
+    @staticmethod
+    def fingerprint(t):
+        cents = t.get("amount", 0)
+        if type(cents) is not int:
+            cents = str(cents)
+        return (
+            t.get("date", ""),
+            cents,
+            t.get("type"),
+            normalize_category(t.get("category", "")),
+            str(t.get("note", "")).strip().lower(),
+        )
+
+    def _report(self, stats, accepted, started, done=False):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        rate = stats["read"] / elapsed
+        if not done:
+            print(f" ... {stats['read']} rows read, {accepted} accepted ({rate:,.0f} rows/s)")
+            return
+        print(f" Imported {stats['imported']} of {stats['read']} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+        print(f" Skipped: {stats['duplicates']} duplicate(s), {stats['invalid']} invalid, "
+              f"{stats['other_user']} for other users")
+        for error in stats["errors"]:
+            print(f"   {error}")
+
+    # -------------------------------
+    # Readers: yield (line number, raw record) one at a time
+    # -------------------------------
+    def read_csv(self, path):
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            missing = {"amount", "date"} - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+            for record in reader:
+                yield reader.line_num, record
+
+    def read_ofx(self, path):
+        # SGML (OFX 1.x, unclosed tags) and XML (OFX 2.x) both parse as a stream of tags
+        fields, start = None, None
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line_number, line in enumerate(f, 1):
+                for closing, tag, value in OFX_TAG.findall(line):
+                    tag = tag.upper()
+                    if tag == "STMTTRN":
+                        if closing and fields is not None:
+                            yield start, self._ofx_record(fields)
+                            fields = None
+                        elif not closing:
+                            fields, start = {}, line_number
+                    elif fields is not None and not closing and value.strip():
+                        fields[tag] = value.strip()
+        if fields:
+            yield start, self._ofx_record(fields)
+
+    def _ofx_record(self, fields):
+        return {
+            # FITID is the bank's own transaction id: re-importing a statement skips known rows
+            "id": f"ofx-{fields['FITID']}" if fields.get("FITID") else "",
+            "amount": fields.get("TRNAMT"),
+            "date": fields.get("DTPOSTED"),
+            "note": " - ".join(v for v in (fields.get("NAME"), fields.get("MEMO")) if v),
+        }
+
+    def read_qif(self, path):
+        fields, start = {}, None
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.rstrip("\r\n")
+                if not line or line.startswith("!"):
+                    continue
+                if line.startswith("^"):
+                    if fields:
+                        yield start, self._qif_record(fields)
+                    fields, start = {}, None
+                    continue
+                start = start or line_number
+                fields.setdefault(line[0], line[1:].strip())
+        if fields:
+            yield start, self._qif_record(fields)
+
+    def _qif_record(self, fields):
+        # D date, T/U amount, L category, P payee, M memo
+        return {
+            "amount": fields.get("T", fields.get("U")),
+            "date": fields.get("D"),
+            "category": fields.get("L", ""),
+            "note": " - ".join(v for v in (fields.get("P"), fields.get("M")) if v),
+        }
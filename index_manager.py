@@ -0,0 +1,176 @@
+import calendar
+from bisect import bisect_left, insort
+from datetime import date
+
+
+def date_ordinal(value):
+    """Ordinal of a YYYY-M-D date string (days past the month end are clamped), or None."""
+    try:
+        year, month, day = (int(part) for part in str(value)[:10].split("-")[:3])
+        day = min(day, calendar.monthrange(year, month)[1])
+        return date(year, month, day).toordinal()
+    except (TypeError, ValueError, calendar.IllegalMonthError):
+        return None
+
+
+def normalize_category(name):
+    """Case/space-insensitive category key: "Rent", " rent " and "RENT" are one category."""
+    return str(name).strip().lower()
+
+
+def month_bounds(month):
+    """(first, last) ISO dates of a YYYY-MM month."""
+    year, mon = (int(part) for part in month.split("-")[:2])
+    last = calendar.monthrange(year, mon)[1]
+    return f"{year:04d}-{mon:02d}-01", f"{year:04d}-{mon:02d}-{last:02d}"
+
+
+class DateIndex:
+    """
+    One user's transactions sorted by date: a sorted list of
+    (date ordinal, transaction id) plus id -> transaction.
+    Range and month lookups are two bisects plus the matching rows.
+    """
+
+    def __init__(self, transactions=()):
+        self.by_id = {}
+        self.keys = []  # sorted (ordinal, id)
+        for t in transactions:
+            key = self._key(t)
+            self.by_id[key[1]] = t
+            if key[0] is not None:
+                self.keys.append(key)
+        self.keys.sort()
+
+    def _key(self, t):
+        return date_ordinal(t.get("date")), str(t.get("id"))
+
+    def add(self, t):
+        key = self._key(t)
+        self.by_id[key[1]] = t
+        if key[0] is not None:
+            insort(self.keys, key)
+
+    def remove(self, t):
+        key = self._key(t)
+        self.by_id.pop(key[1], None)
+        if key[0] is not None:
+            i = bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+
+    def replace(self, old, new):
+        self.remove(old)
+        self.add(new)
+
+    def ids_between(self, start=None, end=None):
+        """Ids with start <= date <= end (ISO strings, None = open), oldest first."""
+        lo = 0 if start is None else bisect_left(self.keys, (date_ordinal(start), ""))
+        hi = len(self.keys) if end is None else bisect_left(self.keys, (date_ordinal(end) + 1, ""))
+        return [tid for _, tid in self.keys[lo:hi]]
+
+    def between(self, start=None, end=None):
+        by_id = self.by_id
+        return [by_id[tid] for tid in self.ids_between(start, end)]
+
+    def in_month(self, month):
+        return self.between(*month_bounds(month))
+
+
+class CategoryIndex:
+    """
+    Interned, case-normalized category table plus an inverted index
+    normalized category -> {transaction id: transaction}, kept in ledger
+    order so a category filter touches only the matching rows.
+    """
+
+    def __init__(self, transactions=()):
+        self.names = {}  # normalized key -> display name (first spelling seen)
+        self.rows = {}  # normalized key -> {id: transaction}
+        self._strings = {}  # one shared str object per spelling
+        for t in transactions:
+            self.add(t)
+
+    def intern(self, name):
+        return self._strings.setdefault(name, name)
+
+    def add(self, t):
+        name = t.get("category", "")
+        if type(t) is dict and isinstance(name, str):
+            # share one string object per spelling instead of one per transaction
+            name = t["category"] = self.intern(name)
+        key = normalize_category(name)
+        self.names.setdefault(key, name)
+        self.rows.setdefault(key, {})[str(t.get("id"))] = t
+
+    def remove(self, t):
+        key = normalize_category(t.get("category", ""))
+        rows = self.rows.get(key)
+        if rows is not None:
+            rows.pop(str(t.get("id")), None)
+            if not rows:
+                del self.rows[key]
+                del self.names[key]
+
+    def replace(self, old, new):
+        tid = str(old.get("id"))
+        key = normalize_category(old.get("category", ""))
+        if str(new.get("id")) == tid and normalize_category(new.get("category", "")) == key:
+            # same category: update in place so results keep ledger order
+            if type(new) is dict and isinstance(new.get("category"), str):
+                new["category"] = self.intern(new["category"])
+            self.rows[key][tid] = new
+        else:
+            self.remove(old)
+            self.add(new)
+
+    def matching(self, categories):
+        keys = {normalize_category(c) for c in categories}
+        if len(keys) == 1:
+            return list(self.rows.get(keys.pop(), {}).values())
+        results = []  # several categories: ledger order within each category
+        for key in keys:
+            results.extend(self.rows.get(key, {}).values())
+        return results
+
+    def count(self, categories):
+        return sum(len(self.rows.get(normalize_category(c), ())) for c in set(categories))
+
+
+class IndexManager:
+    """
+    In-memory secondary indexes for logged-in users, built on login and kept
+    current by UserManager's add/edit/delete paths (they are not saved).
+    Columnar stores (TransactionStore) scan their own columns instead.
+    QueryEngine picks the most selective index for each query.
+    """
+
+    def __init__(self):
+        self.date_indexes = {}  # username -> DateIndex
+        self.category_indexes = {}  # username -> CategoryIndex
+
+    def attach(self, user):
+        username = user["username"]
+        transactions = user.get("transactions", [])
+        if isinstance(transactions, list):
+            self.date_indexes[username] = DateIndex(transactions)
+            self.category_indexes[username] = CategoryIndex(transactions)
+        else:
+            self.date_indexes.pop(username, None)
+            self.category_indexes.pop(username, None)
+
+    def _indexes(self, user):
+        username = user["username"]
+        return [i for i in (self.date_indexes.get(username), self.category_indexes.get(username)) if i is not None]
+
+    def on_add(self, user, transaction):
+        for index in self._indexes(user):
+            index.add(transaction)
+
+    def on_remove(self, user, transaction):
+        for index in self._indexes(user):
+            index.remove(transaction)
+
+    def on_edit(self, user, old, new):
+        for index in self._indexes(user):
+            index.replace(old, new)
@@ -0,0 +1,276 @@
+import json
+import os
+import sys
+import threading
+from contextlib import nullcontext
+
+from durability_manager import DurabilityManager
+from money import migrate_user
+from transaction_store import to_json
+
+
+def _skip(text, pos):
+    while pos < len(text) and text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+class JournalManager:
+    """
+    Append-only change log kept next to the JSON snapshot.
+
+    Every record is one JSON line:
+        {"op": "add",    "user": ..., "id": ..., "data": {transaction}}
+        {"op": "add_many", "user": ..., "data": [transactions]}
+        {"op": "edit",   "user": ..., "id": ..., "data": {changed fields}}
+        {"op": "delete", "user": ..., "id": ...}
+        {"op": "set",    "user": ..., "key": ..., "data": value}
+        {"op": "set_item", "user": ..., "key": ..., "data": {element}}
+        {"op": "delete_item", "user": ..., "key": ..., "id": element key}
+        {"op": "user",   "user": ..., "data": {whole user}}
+        {"op": "migrate", "user": ..., "data": currency}  (see money.migrate_user)
+
+    set_item and delete_item change one element of a list field, found by
+    its key in ITEM_KEYS (budgets by month, goals by id), so changes that
+    two sessions make to different elements are both kept.
+
+    Applying a record twice gives the same result, so a crash during
+    compaction never corrupts the data on the next replay. A line torn by
+    a crash mid-append is skipped (and reported on stderr); the records
+    other sessions appended after it still count.
+
+    `lock` returns the store lock shared with other sessions (see
+    LockManager); callers hold it around append_many and compact. The
+    background compaction only takes it to look at the pending file and,
+    at the end, to swap its result in: appends meanwhile go to the live
+    journal. A full rewrite (compact) wins over a running background
+    compaction, whose result is then dropped.
+    """
+
+    ITEM_KEYS = {"monthly_budgets": "month", "savings_goals": "id"}
+
+    def __init__(self, snapshot_path, compact_every=500, on_compact=None, durability=None, lock=None):
+        self.snapshot_path = snapshot_path
+        self.durability = durability or DurabilityManager()
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal"
+        self.pending_path = self.journal_path + ".compacting"
+        self.staging_path = f"{snapshot_path}.compacted.{os.getpid()}"
+        self.compact_every = compact_every
+        self.on_compact = on_compact  # called with the new snapshot after a background compaction
+        self.lock = lock or nullcontext
+        self._lock = threading.Lock()
+        self._thread = None
+        self._count = self._count_records(self.journal_path)
+
+    # -------------------------------
+    # Writing
+    # -------------------------------
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        lines = "".join(json.dumps(r, separators=(",", ":"), default=to_json) + "\n" for r in records)
+        with self._lock:
+            with open(self.journal_path, "a+b") as f:
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        lines = "\n" + lines  # after a torn line: start a line of our own
+                f.write(lines.encode("utf-8"))
+                self.durability.appended(f)
+            self._count += len(records)
+            should_compact = self._count >= self.compact_every
+        if should_compact:
+            self.compact_in_background()
+
+    # -------------------------------
+    # Reading
+    # -------------------------------
+    def replay(self, users):
+        """Apply pending and current journal records on top of users (in place)."""
+        applied = 0
+        by_name = {u["username"]: u for u in users}
+        for path in (self.pending_path, self.journal_path):
+            for record in self._read_records(path):
+                self.apply(users, record, by_name)
+                applied += 1
+        return applied
+
+    @staticmethod
+    def apply(users, record, by_name=None):
+        """Apply one record; by_name is an optional username -> user index kept in sync."""
+        op = record.get("op")
+        username = record.get("user")
+        if by_name is None:
+            by_name = {u["username"]: u for u in users}
+
+        if op == "user":
+            old = by_name.get(username)
+            if old is None:
+                users.append(record["data"])
+            else:
+                users[users.index(old)] = record["data"]
+            by_name[username] = record["data"]
+            return
+
+        user = by_name.get(username)
+        if user is None:
+            return
+
+        if op == "set":
+            user[record["key"]] = record["data"]
+            return
+        if op in ("set_item", "delete_item"):
+            field = JournalManager.ITEM_KEYS[record["key"]]
+            items = user.setdefault(record["key"], [])
+            wanted = record["data"].get(field) if op == "set_item" else record["id"]
+            index = next((i for i, item in enumerate(items) if item.get(field) == wanted), None)
+            if op == "delete_item":
+                if index is not None:
+                    del items[index]
+            elif index is None:
+                items.append(record["data"])
+            else:
+                items[index] = record["data"]
+            return
+        if op == "migrate":
+            # amounts to minor units; no-op for a user another session converted already
+            migrate_user(user, record["data"])
+            return
+
+        # Saved running totals no longer match once a transaction changes
+        user.pop("aggregates", None)
+        transactions = user.setdefault("transactions", [])
+        if op == "add_many":
+            known = {t.get("id") for t in transactions}
+            transactions.extend(t for t in record["data"] if t.get("id") not in known)
+            return
+        index = next((i for i, t in enumerate(transactions) if t.get("id") == record.get("id")), None)
+        if op == "add":
+            if index is None:
+                transactions.append(record["data"])
+            else:
+                transactions[index] = record["data"]
+        elif op == "edit" and index is not None:
+            transactions[index].update(record["data"])
+        elif op == "delete" and index is not None:
+            del transactions[index]
+
+    # -------------------------------
+    # Compaction
+    # -------------------------------
+    def compact_in_background(self):
+        """Move the journal aside and fold it into the snapshot on a worker thread."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # A leftover pending file means an earlier compaction was interrupted:
+            # finish that one first, the live journal keeps growing meanwhile.
+            if not os.path.exists(self.pending_path):
+                if not os.path.exists(self.journal_path):
+                    return
+                os.replace(self.journal_path, self.pending_path)
+                self._count = 0
+            self._thread = threading.Thread(target=self._compact, name="journal-compaction")
+            self._thread.start()
+
+    def compact(self, users):
+        """Write users as the new snapshot and drop every journal record (synchronous)."""
+        with self._lock:
+            self._write_snapshot(users)
+            for path in (self.pending_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._count = 0
+
+    def wait(self):
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _compact(self):
+        try:
+            with self.lock():
+                if not os.path.exists(self.pending_path):
+                    return  # already folded in by another session
+                started = self._identity()
+
+            users = self._load_snapshot()
+            by_name = {u["username"]: u for u in users}
+            for record in self._read_records(self.pending_path):
+                self.apply(users, record, by_name)
+            self._write_snapshot(users, self.staging_path)
+
+            with self.lock():
+                # A full rewrite or another session's compaction got there first
+                current = self._identity() if os.path.exists(self.pending_path) else None
+                if current != started:
+                    os.remove(self.staging_path)
+                    return
+                self.durability.replace(self.staging_path, self.snapshot_path)
+                os.remove(self.pending_path)
+            if self.on_compact:
+                self.on_compact(users)
+        except Exception as e:
+            print(f" Journal compaction failed: {e}")
+
+    def _write_snapshot(self, users, path=None):
+        with self.durability.atomic_open(path or self.snapshot_path) as f:
+            json.dump(users, f, indent=4, default=to_json)
+
+    # -------------------------------
+    # Helpers
+    # -------------------------------
+    def _load_snapshot(self):
+        # User by user rather than one json.load: each decode holds the GIL,
+        # and sessions appending meanwhile should only wait for one user
+        if not os.path.exists(self.snapshot_path):
+            return []
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        decoder = json.JSONDecoder()
+        users = []
+        pos = _skip(text, 0)
+        if text[pos:pos + 1] != "[":
+            return json.loads(text)  # raises the usual error
+        pos = _skip(text, pos + 1)
+        while pos < len(text) and text[pos] != "]":
+            user, end = decoder.raw_decode(text, pos)
+            users.append(user)
+            pos = _skip(text, end)
+            if text[pos:pos + 1] == ",":
+                pos = _skip(text, pos + 1)
+        return users
+
+    def _identity(self):
+        """Which snapshot and pending file are on disk (changes when either is replaced)."""
+        identity = []
+        for path in (self.snapshot_path, self.pending_path):
+            if os.path.exists(path):
+                st = os.stat(path)
+                identity.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            else:
+                identity.append(None)
+        return identity
+
+    def _read_records(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn by a crash mid-append: the lines around it are valid
+                    print(f" Skipping damaged journal line {number} of {path}", file=sys.stderr)
+                    continue
+                yield record
+
+    def _count_records(self, path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            return sum(1 for _ in f)
@@ -0,0 +1,431 @@
+"""
+Finance operations without any print() or input(): the menus, the command
+mode (command_manager.py) and the API server (api_server.py) all call these
+and only differ in how they read parameters and show results.
+
+Reads take a loaded user dict (the "ledger") and return result objects or
+Money values. Changes take a session, i.e. a UserManager whose current_user
+is the user to change (UserManager.session), because they are saved through
+it. Invalid parameters raise ServiceError (NotFound for unknown ids); its
+message is meant for the user.
+"""
+import datetime
+import uuid
+from decimal import Decimal
+
+import config
+from aggregate_manager import AggregateManager
+from money import Money, format_amount, minor_units
+from query_engine import Query
+
+
+class ServiceError(ValueError):
+    """Parameters an operation cannot work with (bad amount, date, ...)."""
+
+
+class NotFound(ServiceError):
+    """No transaction, budget or goal with the given id/month."""
+
+
+_aggregates = AggregateManager()
+
+
+# -------------------------------
+# Parameters
+# -------------------------------
+def currency(user):
+    return user.get("currency", config.CURRENCY)
+
+
+def parse_amount(user, value, positive=True):
+    """Minor units of an amount as typed ("12.5", 12.5, "1,200") in the user's currency."""
+    if value is None or isinstance(value, bool) or str(value).strip() == "":
+        raise ServiceError("Amount is required.")
+    try:
+        minor = Money.parse(value, currency(user)).minor
+    except ValueError:
+        raise ServiceError("Invalid amount.") from None
+    if positive and minor <= 0:
+        raise ServiceError("Amount must be positive.")
+    return minor
+
+
+def parse_date(value, name="date"):
+    try:
+        return datetime.date.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        raise ServiceError(f"Invalid {name}, use YYYY-MM-DD.") from None
+
+
+def parse_month(value):
+    try:
+        datetime.datetime.strptime(str(value), "%Y-%m")
+    except ValueError:
+        raise ServiceError("Invalid month format. Use YYYY-MM.") from None
+    return value
+
+
+def parse_type(value):
+    if value not in ("income", "expense"):
+        raise ServiceError("Type must be income or expense.")
+    return value
+
+
+def _money(user, value):
+    # stored amounts; anything unreadable counts as 0
+    try:
+        return Money(minor_units(value, currency(user)), currency(user))
+    except ValueError:
+        return Money.zero(currency(user))
+
+
+def transaction_to_json(user, t):
+    row = dict(t)
+    row["amount"] = format_amount(t["amount"], currency(user))
+    return row
+
+
+def to_json(value):
+    """Result objects, Money, and dicts/lists of them as plain JSON values."""
+    if hasattr(value, "to_json"):
+        return value.to_json()
+    if isinstance(value, Money):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    return value
+
+
+# -------------------------------
+# Results
+# -------------------------------
+class Totals:
+    """Income, expense and balance of a user, over everything or one month."""
+
+    def __init__(self, income, expense, count, month=None):
+        self.income = income
+        self.expense = expense
+        self.count = count
+        self.month = month
+
+    @property
+    def balance(self):
+        return self.income - self.expense
+
+    def to_json(self):
+        return {"month": self.month, "income": str(self.income), "expense": str(self.expense),
+                "balance": str(self.balance), "transactions": self.count}
+
+
+class BudgetStatus:
+    def __init__(self, month, budget, spent):
+        self.month = month
+        self.budget = budget
+        self.spent = spent
+
+    @property
+    def remaining(self):
+        return self.budget - self.spent
+
+    @property
+    def percent_used(self):
+        return self.spent / self.budget * 100 if self.budget.minor > 0 else Decimal(0)
+
+    def to_json(self):
+        return {"month": self.month, "budget": str(self.budget), "spent": str(self.spent),
+                "remaining": str(self.remaining), "percent_used": f"{self.percent_used:.2f}"}
+
+
+class GoalProgress:
+    def __init__(self, user, goal):
+        self.id = goal.get("id")
+        self.name = goal.get("name")
+        self.target = _money(user, goal.get("target_amount", 0))
+        self.saved = _money(user, goal.get("saved_amount", 0))
+        self.deadline = goal.get("deadline", "")
+
+    @property
+    def percent(self):
+        return self.saved / self.target * 100 if self.target.minor > 0 else Decimal(0)
+
+    @property
+    def reached(self):
+        return self.saved >= self.target
+
+    def to_json(self):
+        return {"id": self.id, "name": self.name, "target": str(self.target), "saved": str(self.saved),
+                "percent": f"{self.percent:.1f}", "reached": self.reached, "deadline": self.deadline}
+
+
+class Notification:
+    """kind: "budget", "goal_reached" or "goal_close"; details hold the amounts."""
+
+    def __init__(self, kind, message, **details):
+        self.kind = kind
+        self.message = message
+        self.details = details
+
+    def to_json(self):
+        return dict(kind=self.kind, message=self.message, **to_json(self.details))
+
+
+# -------------------------------
+# Reports (read only)
+# -------------------------------
+def summary(user):
+    """Running totals of a loaded user (see AggregateManager)."""
+    return _aggregates.get(user)
+
+
+def totals(user, month=None):
+    s = summary(user)
+    return Totals(s.total("income", month=month), s.total("expense", month=month), s.count(month=month), month)
+
+
+def category_breakdown(user):
+    """{category: {"income": Money, "expense": Money}}"""
+    return summary(user).by_category()
+
+
+def spending_trends(user):
+    """{month: expense Money}, by month."""
+    return summary(user).by_month("expense")
+
+
+def user_report(user, month=None):
+    """Everything the report menu shows for one user, as a dict of results."""
+    report = {
+        "username": user["username"],
+        "currency": currency(user),
+        "totals": totals(user),
+        "categories": category_breakdown(user),
+        "expense_by_month": spending_trends(user),
+        "notifications": notifications(user),
+    }
+    if month is not None:
+        report["month"] = totals(user, month)
+        budget = find_budget(user, month)
+        report["budget"] = budget_status(user, month) if budget is not None else None
+    return report
+
+
+# -------------------------------
+# Transactions
+# -------------------------------
+def search(session, query):
+    """Matching transactions of the session's user, produced lazily (see QueryEngine)."""
+    return session.query(query)
+
+
+def top_expenses(session, count=10, month=None):
+    query = Query().of_type("expense").order_by("amount", descending=True).page(count)
+    if month:
+        query = query.in_month(parse_month(month))
+    return list(session.query(query))
+
+
+def find_transaction(user, tid):
+    """Position of the transaction with id tid."""
+    for index, t in enumerate(user.get("transactions", [])):
+        if t.get("id") == tid:
+            return index
+    raise NotFound(f"No transaction with id {tid!r}.")
+
+
+def add_transaction(session, t_type, amount, category="", note="", date=None, tid=None):
+    user = session.current_user
+    if tid and any(t.get("id") == tid for t in user.get("transactions", [])):
+        raise ServiceError(f"A transaction with id {tid!r} already exists.")
+    transaction = {
+        "id": tid or str(uuid.uuid4()),
+        "type": parse_type(t_type),
+        "amount": parse_amount(user, amount),
+        "category": str(category).strip(),
+        "note": str(note).strip(),
+        "date": parse_date(date) if date else datetime.date.today().isoformat(),
+    }
+    session.add_transaction(transaction)
+    return transaction
+
+
+def edit_transaction(session, tid, changes):
+    """Change some of type, amount, category, note and date; returns the transaction."""
+    user = session.current_user
+    index = find_transaction(user, tid)
+    checked = {}
+    for field, value in changes.items():
+        if field == "type":
+            checked[field] = parse_type(value)
+        elif field == "amount":
+            checked[field] = parse_amount(user, value)
+        elif field == "date":
+            checked[field] = parse_date(value)
+        elif field in ("category", "note"):
+            checked[field] = str(value).strip()
+        else:
+            raise ServiceError(f"Cannot change {field!r}.")
+    if checked:
+        session.update_transaction(index, checked)
+    return user["transactions"][index]
+
+
+def delete_transaction(session, tid):
+    return session.delete_transaction(find_transaction(session.current_user, tid))
+
+
+# -------------------------------
+# Budgets
+# -------------------------------
+def find_budget(user, month):
+    return next((b for b in user.get("monthly_budgets", []) if b["month"] == month), None)
+
+
+def budgets(user):
+    return [(b["month"], _money(user, b["amount"])) for b in user.get("monthly_budgets", [])]
+
+
+def budget_status(user, month):
+    entry = find_budget(user, parse_month(month))
+    if entry is None:
+        raise NotFound("No budget set for this month.")
+    # running total, no scan
+    return BudgetStatus(month, _money(user, entry["amount"]), summary(user).total("expense", month=month))
+
+
+def set_budget(session, month, amount):
+    """Set or replace a month's budget; returns (amount as Money, whether one was replaced)."""
+    user = session.current_user
+    month = parse_month(month)
+    minor = parse_amount(user, amount)
+    with session.lock:
+        budgets = user.setdefault("monthly_budgets", [])
+        entry = find_budget(user, month)
+        replaced = entry is not None
+        if entry is None:
+            entry = {"month": month, "amount": minor}
+            budgets.append(entry)
+        else:
+            entry["amount"] = minor
+        session.save_item("monthly_budgets", entry)
+    return Money(minor, currency(user)), replaced
+
+
+# -------------------------------
+# Savings goals
+# -------------------------------
+def goals(user):
+    return [GoalProgress(user, g) for g in user.get("savings_goals", [])]
+
+
+def _find_goal(user, goal_id):
+    for goal in user.get("savings_goals", []):
+        if goal.get("id") == goal_id:
+            return goal
+    raise NotFound(f"No goal with id {goal_id!r}.")
+
+
+def add_goal(session, name, target, deadline=""):
+    user = session.current_user
+    name = str(name).strip()
+    if not name:
+        raise ServiceError("Name cannot be empty.")
+    try:
+        target = parse_amount(user, target)
+    except ServiceError:
+        raise ServiceError("Target must be an amount greater than 0.") from None
+    goal = {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "target_amount": target,
+        "saved_amount": 0,
+        "deadline": parse_date(deadline, "deadline") if deadline else "",
+        "created_at": datetime.datetime.now().isoformat(),
+    }
+    with session.lock:
+        user.setdefault("savings_goals", []).append(goal)
+        session.save_item("savings_goals", goal)
+    return GoalProgress(user, goal)
+
+
+def edit_goal(session, goal_id, name=None, target=None, deadline=None):
+    """Change the given fields (None keeps a field); nothing changes when one is invalid."""
+    user = session.current_user
+    goal = _find_goal(user, goal_id)
+    changes = {}
+    if name is not None:
+        if not str(name).strip():
+            raise ServiceError("Name cannot be empty.")
+        changes["name"] = str(name).strip()
+    if target is not None:
+        try:
+            changes["target_amount"] = parse_amount(user, target)
+        except ServiceError:
+            raise ServiceError("Target must be an amount greater than 0.") from None
+    if deadline is not None:
+        changes["deadline"] = parse_date(deadline, "deadline")
+    with session.lock:
+        goal.update(changes)
+        session.save_item("savings_goals", goal)
+    return GoalProgress(user, goal)
+
+
+def allocate_to_goal(session, goal_id, amount):
+    """
+    Record an expense in "Savings" and add it to the goal's saved amount.
+    Returns (amount allocated as Money, GoalProgress).
+    """
+    user = session.current_user
+    goal = _find_goal(user, goal_id)
+    minor = parse_amount(user, amount)
+    session.add_transaction({
+        "id": str(uuid.uuid4()),
+        "type": "expense",
+        "amount": minor,
+        "category": "Savings",
+        "note": f"Allocated to goal {goal['id']} - {goal['name']}",
+        "date": datetime.date.today().isoformat(),
+    })
+    with session.lock:
+        allocated = Money(minor, currency(user))
+        goal["saved_amount"] = (_money(user, goal.get("saved_amount", 0)) + allocated).minor
+        session.save_item("savings_goals", goal)
+    return allocated, GoalProgress(user, goal)
+
+
+def delete_goal(session, goal_id):
+    user = session.current_user
+    with session.lock:
+        goal = _find_goal(user, goal_id)
+        user["savings_goals"].remove(goal)
+        session.delete_item("savings_goals", goal["id"])
+    return GoalProgress(user, goal)
+
+
+# -------------------------------
+# Notifications
+# -------------------------------
+def notifications(user):
+    """Budgets at 90% or more, goals reached or at 80% or more."""
+    found = []
+    s = summary(user)
+    for b in user.get("monthly_budgets", []):
+        month = b["month"]
+        budget = _money(user, b["amount"])
+        spent = s.total("expense", month=month)
+        if spent >= budget * Decimal("0.9"):
+            found.append(Notification(
+                "budget", f"⚠️ You're close to your budget limit for {month} ({spent}/{budget})",
+                month=month, spent=spent, budget=budget,
+            ))
+    for g in user.get("savings_goals", []):
+        progress = GoalProgress(user, g)
+        if progress.reached:
+            found.append(Notification("goal_reached", f"🎉 Goal '{progress.name}' achieved!", goal=progress.name))
+        elif progress.saved >= progress.target * Decimal("0.8"):
+            found.append(Notification(
+                "goal_close", f" You're close to achieving your goal '{progress.name}' ({progress.saved}/{progress.target})",
+                goal=progress.name, saved=progress.saved, target=progress.target,
+            ))
+    return found
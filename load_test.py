@@ -0,0 +1,220 @@
+"""
+Load test for the API server (see api_server.py).
+
+    python load_test.py --spawn                      start a server in a temp directory, test it, stop it
+    python load_test.py --url http://127.0.0.1:8765  test a running server
+
+Every connection is kept alive and sends --pipeline requests before reading
+the answers, logged in as one of --users test users (load0, load1, ...,
+PIN 1234, registered when missing). The mix reads reports, searches and
+notifications and adds transactions (--write-ratio of the requests).
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+
+PIN = "1234"
+READS = [
+    # path, weight
+    ("/reports/dashboard", 30),
+    ("/transactions?sort=date&desc=1&limit=20", 25),
+    ("/notifications", 15),
+    ("/budgets/2025-01", 15),
+    ("/reports/categories", 10),
+    ("/transactions?type=expense&min=50&sort=amount&desc=1&limit=5", 5),
+]
+
+
+def _request(method, path, auth=None, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(data)}"]
+    if auth:
+        head.append(f"Authorization: Basic {auth}")
+    if data:
+        head.append("Content-Type: application/json")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by the server")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return status, body
+
+
+def _auth(username):
+    return base64.b64encode(f"{username}:{PIN}".encode()).decode()
+
+
+async def setup_users(host, port, users):
+    """Register the test users (existing ones are kept) and give each a budget."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(users):
+            name = f"load{i}"
+            writer.write(_request("POST", "/users", body={"username": name, "pin": PIN}))
+            writer.write(_request("PUT", "/budgets/2025-01", _auth(name), {"amount": "500"}))
+            for _ in range(2):
+                status, body = await _read_response(reader)
+                if status not in (200, 201, 409):
+                    raise RuntimeError(f"setup failed for {name}: {status} {body.decode()}")
+    finally:
+        writer.close()
+
+
+async def _connection(host, port, username, requests, pipeline, write_ratio, rnd, latencies, statuses):
+    auth = _auth(username)
+    paths = [p for p, _ in READS]
+    weights = [w for _, w in READS]
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        left = requests
+        while left > 0:
+            burst = []
+            for _ in range(min(pipeline, left)):
+                if rnd.random() < write_ratio:
+                    body = {"type": rnd.choice(["income", "expense"]), "amount": f"{rnd.randint(100, 20000) / 100:.2f}",
+                            "category": rnd.choice(["Food", "Rent", "Travel", "Salary"]), "note": "load test",
+                            "date": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"}
+                    burst.append(_request("POST", "/transactions", auth, body))
+                else:
+                    burst.append(_request("GET", rnd.choices(paths, weights)[0], auth))
+            sent = time.perf_counter()
+            writer.write(b"".join(burst))  # pipelined: all requests before any answer
+            await writer.drain()
+            for _ in burst:
+                status, _ = await _read_response(reader)
+                latencies.append(time.perf_counter() - sent)
+                statuses[status] = statuses.get(status, 0) + 1
+            left -= len(burst)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, connections=20, requests=10000, pipeline=4, users=10, write_ratio=0.2, seed=1):
+    await setup_users(host, port, users)
+    latencies, statuses = [], {}
+    rnd = random.Random(seed)
+    per_connection = [requests // connections + (i < requests % connections) for i in range(connections)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _connection(host, port, f"load{i % users}", n, pipeline, write_ratio,
+                    random.Random(rnd.random()), latencies, statuses)
+        for i, n in enumerate(per_connection)
+    ))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "latency_ms": {"p50": percentile(0.50), "p90": percentile(0.90), "p99": percentile(0.99),
+                       "max": percentile(1.0)},
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "connections": connections,
+        "pipeline": pipeline,
+        "users": users,
+        "write_ratio": write_ratio,
+    }
+
+
+# -------------------------------
+# Local server for --spawn
+# -------------------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(directory, port):
+    env = dict(os.environ, FIN_API_HOST="127.0.0.1", FIN_API_PORT=str(port))
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_server.py")
+    process = subprocess.Popen([sys.executable, script], cwd=directory, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("the API server exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("the API server did not start within 30s")
+
+
+def stop_server(process):
+    process.terminate()  # SIGTERM: pending saves are written before it exits
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for api_server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="server to test")
+    parser.add_argument("--spawn", action="store_true", help="start a fresh server in a temp directory")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=10000, help="total requests")
+    parser.add_argument("--pipeline", type=int, default=4, help="requests in flight per connection")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    process = directory = None
+    if args.spawn:
+        directory = tempfile.mkdtemp(prefix="fin-load-")
+        host, port = "127.0.0.1", _free_port()
+        process = spawn_server(directory, port)
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    try:
+        results = asyncio.run(run_load(host, port, args.connections, args.requests, args.pipeline,
+                                       args.users, args.write_ratio))
+    finally:
+        if process is not None:
+            stop_server(process)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{results['requests']} requests in {results['seconds']}s: {results['requests_per_second']:,.0f} req/s")
+    latency = results["latency_ms"]
+    print(f"latency ms: p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"statuses: {results['statuses']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+    return 0 if all(int(s) < 400 for s in results["statuses"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class LockManager:
+    """
+    Named locks shared by every process using the same data directory.
+
+    Each name is an exclusive lock on its own file in lock_dir (flock on
+    POSIX, msvcrt.locking on Windows), so sessions that lock different names
+    never wait for each other. Locks are re-entrant within a thread and
+    exclusive between threads of one process. Waiting longer than `timeout`
+    seconds raises TimeoutError.
+    """
+
+    def __init__(self, lock_dir, timeout=10.0):
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._guard = threading.Lock()
+        self._locks = {}  # name -> [threading.RLock, open lock file, depth]
+
+    @contextmanager
+    def locked(self, names):
+        """Hold every lock in names (taken in sorted order, so two sessions never deadlock)."""
+        held = []
+        try:
+            for name in sorted(set(names)):
+                self._acquire(name)
+                held.append(name)
+            yield
+        finally:
+            for name in reversed(held):
+                self._release(name)
+
+    def _acquire(self, name):
+        with self._guard:
+            entry = self._locks.setdefault(name, [threading.RLock(), None, 0])
+        if not entry[0].acquire(timeout=self.timeout):
+            raise TimeoutError(f"Timed out waiting for lock '{name}'")
+        try:
+            if entry[2] == 0:
+                entry[1] = self._lock_file(name)
+            entry[2] += 1
+        except BaseException:
+            entry[0].release()
+            raise
+
+    def _release(self, name):
+        entry = self._locks[name]
+        entry[2] -= 1
+        if entry[2] == 0:
+            f, entry[1] = entry[1], None
+            _unlock(f)
+            f.close()
+        entry[0].release()
+
+    def _lock_file(self, name):
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        f = open(os.path.join(self.lock_dir, f"{safe}.lock"), "a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _try_lock(f)
+                return f
+            except OSError:
+                if time.monotonic() >= deadline:
+                    f.close()
+                    raise TimeoutError(f"Timed out waiting for lock '{name}' (held by another session)")
+                time.sleep(0.01)
+
+
+def _try_lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,3 +1,6 @@
+import sys
+
+import command_manager
 from user_manager import UserManager
 from transaction_manager import TransactionManager
 from report_manager import ReportManager
@@ -17,55 +20,70 @@ def main_menu():
     bm = MonthlyBudgetManager(um)
     nm = NotificationManager(um)
 
-    while True:
-        print("\n=== PERSONAL FINANCE MANAGER ===")
-        print("1) Register new user")
-        print("2) Login")
-        print("3) Show current user")
-        print("4) View all users")
-        print("5) Switch user")
-        print("6) Transactions")
-        print("7) Reports")
-        print("8) Search & Filter")
-        print("9) Export to CSV")
-        print("10) Savings Goals")
-        print("11) Monthly Budget")
-        print("12) Notifications Center")
-        print("0) Exit")
-
-        choice = input("Choose an option: ").strip()
-
-        if choice == "1":
-            um.register_user()
-        elif choice == "2":
-            um.login()
-        elif choice == "3":
-            um.show_current_user()
-        elif choice == "4":
-            print("\nRegistered Users:")
-            for i, u in enumerate(um.users, 1):
-                print(f"{i}. {u['username']}")
-        elif choice == "5":
-            um.login()
-        elif choice == "6":
-            transaction_menu(tm)
-        elif choice == "7":
-            report_menu(rm)
-        elif choice == "8":
-            search_filter_menu(sf)
-        elif choice == "9":
-            um.data_manager.export_to_csv(um.users)
-        elif choice == "10":
-            savings_menu(sg)
-        elif choice == "11":
-            budget_menu(bm)
-        elif choice == "12":
-            nm.check_notifications()
-        elif choice == "0":
-            print("\nGoodbye! 👋")
-            break
-        else:
-            print("Invalid choice, try again.")
+    # Pending (deferred or queued) saves are written whatever ends the session
+    try:
+        while True:
+            um.data_manager.report_errors()  # failed background saves
+            um.refresh_stale()  # users saved meanwhile by another session
+            print("\n=== PERSONAL FINANCE MANAGER ===")
+            print("1) Register new user")
+            print("2) Login")
+            print("3) Show current user")
+            print("4) View all users")
+            print("5) Switch user")
+            print("6) Transactions")
+            print("7) Reports")
+            print("8) Search & Filter")
+            print("9) Export to CSV")
+            print("10) Savings Goals")
+            print("11) Monthly Budget")
+            print("12) Notifications Center")
+            print("13) Restore backup")
+            print("14) Reload data from disk")
+            print("0) Exit")
+
+            choice = input("Choose an option: ").strip()
+
+            if choice == "1":
+                um.register_user()
+            elif choice == "2":
+                um.login()
+            elif choice == "3":
+                um.show_current_user()
+            elif choice == "4":
+                print("\nRegistered Users:")
+                for i, u in enumerate(um.users, 1):
+                    print(f"{i}. {u['username']}")
+            elif choice == "5":
+                um.login()
+            elif choice == "6":
+                transaction_menu(tm)
+            elif choice == "7":
+                report_menu(rm)
+            elif choice == "8":
+                search_filter_menu(sf)
+            elif choice == "9":
+                um.flush()
+                um.data_manager.export_to_csv(um.users)
+            elif choice == "10":
+                savings_menu(sg)
+            elif choice == "11":
+                budget_menu(bm)
+            elif choice == "12":
+                nm.check_notifications()
+            elif choice == "13":
+                um.restore_backup()
+            elif choice == "14":
+                um.reload()
+            elif choice == "0":
+                print("\nGoodbye! 👋")
+                break
+            else:
+                print("Invalid choice, try again.")
+    except (EOFError, KeyboardInterrupt):
+        print("\nGoodbye! 👋")
+    finally:
+        um.close()
 
 
 def transaction_menu(tm):
@@ -75,6 +93,7 @@ def transaction_menu(tm):
         print("2) View all transactions")
         print("3) Edit transaction")
         print("4) Delete transaction")
+        print("5) Import from file (CSV/OFX/QIF)")
         print("0) Back")
 
         choice = input("Choose: ").strip()
@@ -87,6 +106,8 @@ def transaction_menu(tm):
             tm.edit_transaction()
         elif choice == "4":
             tm.delete_transaction()
+        elif choice == "5":
+            tm.import_transactions()
         elif choice == "0":
             break
         else:
@@ -101,6 +122,7 @@ def report_menu(rm):
         print("3) Category breakdown")
         print("4) Spending trends")
         print("5) ASCII charts")
+        print("6) Largest expenses")
         print("0) Back")
 
         choice = input("Choose: ").strip()
@@ -111,7 +133,8 @@ def report_menu(rm):
             "2": rm.monthly_report,         
             "3": rm.category_breakdown,      
             "4": rm.spending_trends,         
-            "5": rm.ascii_visualization     
+            "5": rm.ascii_visualization,
+            "6": rm.top_expenses
         }
 
         if choice in options:
@@ -131,6 +154,7 @@ def search_filter_menu(sf):
         print("2) Filter by category")
         print("3) Filter by amount range")
         print("4) Sort transactions")
+        print("5) Advanced search")
         print("0) Back")
 
         choice = input("Choose: ").strip()
@@ -143,6 +167,8 @@ def search_filter_menu(sf):
             sf.filter_by_amount()
         elif choice == "4":
             sf.sort_transactions()
+        elif choice == "5":
+            sf.advanced_search()
         elif choice == "0":
             break
         else:
@@ -195,4 +221,7 @@ def budget_menu(bm):
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # python main.py COMMAND ... : one command (or a batch file), JSON lines output
+        sys.exit(command_manager.main(sys.argv[1:]))
     main_menu()
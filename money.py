@@ -0,0 +1,171 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+
+# Digits after the decimal point per ISO 4217 code (anything else has 2)
+MINOR_DIGITS = {"JPY": 0, "KRW": 0, "VND": 0, "ISK": 0, "BHD": 3, "KWD": 3, "OMR": 3, "TND": 3, "JOD": 3}
+
+
+def minor_digits(currency):
+    return MINOR_DIGITS.get(currency, 2)
+
+
+class Money:
+    """
+    An exact amount: integer minor units (cents) plus an ISO currency code.
+
+    Amounts are stored as those integers everywhere (transactions, budgets,
+    goals, running totals), so adding and comparing is plain int arithmetic;
+    text is only parsed on input (parse) and produced for display (str).
+    Mixing currencies raises ValueError.
+    """
+
+    __slots__ = ("minor", "currency")
+
+    def __init__(self, minor, currency):
+        self.minor = minor
+        self.currency = currency
+
+    @classmethod
+    def parse(cls, value, currency):
+        """Money from user input or an old float/string amount ("12.5", 12.5, "1,200")."""
+        try:
+            amount = Decimal(str(value).replace(",", "").strip())
+        except (InvalidOperation, ValueError, TypeError):
+            raise ValueError(f"invalid amount {value!r}") from None
+        if not amount.is_finite():
+            raise ValueError(f"invalid amount {value!r}")
+        return cls(int(amount.scaleb(minor_digits(currency)).to_integral_value(ROUND_HALF_UP)), currency)
+
+    @classmethod
+    def zero(cls, currency):
+        return cls(0, currency)
+
+    def to_decimal(self):
+        return Decimal(self.minor).scaleb(-minor_digits(self.currency))
+
+    # -------------------------------
+    # Arithmetic
+    # -------------------------------
+    def _check(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        if other.currency != self.currency:
+            raise ValueError(f"cannot mix {self.currency} and {other.currency}")
+        return other.minor
+
+    def __add__(self, other):
+        minor = self._check(other)
+        return minor if minor is NotImplemented else Money(self.minor + minor, self.currency)
+
+    def __sub__(self, other):
+        minor = self._check(other)
+        return minor if minor is NotImplemented else Money(self.minor - minor, self.currency)
+
+    def __neg__(self):
+        return Money(-self.minor, self.currency)
+
+    def __mul__(self, factor):
+        """Scale by an int or Decimal factor, rounded half up to whole minor units."""
+        if isinstance(factor, int):
+            return Money(self.minor * factor, self.currency)
+        if isinstance(factor, Decimal):
+            return Money(int((self.minor * factor).to_integral_value(ROUND_HALF_UP)), self.currency)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """Ratio of two amounts as a Decimal (budget used, goal progress)."""
+        minor = self._check(other)
+        return minor if minor is NotImplemented else Decimal(self.minor) / Decimal(minor)
+
+    # -------------------------------
+    # Comparison
+    # -------------------------------
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.minor == other.minor and self.currency == other.currency
+
+    def __lt__(self, other):
+        minor = self._check(other)
+        return minor if minor is NotImplemented else self.minor < minor
+
+    def __le__(self, other):
+        minor = self._check(other)
+        return minor if minor is NotImplemented else self.minor <= minor
+
+    def __gt__(self, other):
+        minor = self._check(other)
+        return minor if minor is NotImplemented else self.minor > minor
+
+    def __ge__(self, other):
+        minor = self._check(other)
+        return minor if minor is NotImplemented else self.minor >= minor
+
+    def __hash__(self):
+        return hash((self.minor, self.currency))
+
+    def __bool__(self):
+        return self.minor != 0
+
+    # -------------------------------
+    # Display
+    # -------------------------------
+    def __str__(self):
+        return str(self.to_decimal())
+
+    def __format__(self, spec):
+        # "{:.2f}" and friends work as they did on Decimal totals
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+    def __repr__(self):
+        return f"Money({self}, {self.currency!r})"
+
+
+# -------------------------------
+# Stored amounts (and data saved before they were minor units)
+# -------------------------------
+def minor_units(value, currency):
+    """Integer minor units of a stored amount: ints already are, older floats/strings are parsed."""
+    if type(value) is int:
+        return value
+    return Money.parse(value, currency).minor
+
+
+def format_amount(value, currency):
+    """Display text of a stored amount (shown as it is when it is not an amount at all)."""
+    try:
+        return str(Money(minor_units(value, currency), currency))
+    except ValueError:
+        return str(value)
+
+
+def migrate_user(user, currency):
+    """
+    Convert a fully loaded user from float/string amounts to minor units, in
+    place. user["currency"] marks converted users, so this runs once per user.
+    Values that are not amounts at all are left as they are.
+    Returns True when the user was converted (and has to be saved).
+    """
+    if "currency" in user or "transactions" not in user:
+        return False
+    user["currency"] = currency
+
+    def convert(item, key):
+        if key in item:
+            try:
+                item[key] = minor_units(item[key], currency)
+            except ValueError:
+                pass
+
+    for t in user["transactions"]:
+        convert(t, "amount")
+    for b in user.get("monthly_budgets", []):
+        convert(b, "amount")
+    for g in user.get("savings_goals", []):
+        convert(g, "target_amount")
+        convert(g, "saved_amount")
+    # saved running totals were kept in the old units
+    user.pop("aggregates", None)
+    return True
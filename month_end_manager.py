@@ -0,0 +1,159 @@
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+import config
+import ledger_service
+from data_manager import DataManager
+
+
+# In every worker process (set by _init_worker): the session's users, and the
+# worker's own DataManager when some of them are stubs still to be loaded
+_users = None
+_data_manager = None
+
+
+def _init_worker(users, has_stubs):
+    global _users, _data_manager
+    _users = users
+    if has_stubs:
+        # its own files, connections and locks: nothing opened by the parent is shared
+        with redirect_stdout(sys.stderr):
+            _data_manager = DataManager()
+            _data_manager.load_data()
+
+
+def _run_shard(indexes, job, month):
+    return [(i, _summarize(_data_manager, _users[i], job, month)) for i in indexes]
+
+
+def _summarize(data_manager, user, job, month):
+    if data_manager is not None and data_manager.backend.is_stub(user):
+        user = data_manager.load_user(dict(user))  # a copy: the session keeps its stub
+    return job(user, month)
+
+
+def month_end_summary(user, month):
+    """Dashboard totals, the month's totals and budget status, and notifications of one user."""
+    budget = ledger_service.find_budget(user, month)
+    return {
+        "username": user["username"],
+        "currency": ledger_service.currency(user),
+        "dashboard": ledger_service.totals(user).to_json(),
+        "month": ledger_service.totals(user, month).to_json(),
+        "budget": ledger_service.budget_status(user, month).to_json() if budget is not None else None,
+        "notifications": ledger_service.to_json(ledger_service.notifications(user)),
+    }
+
+
+def shard_users(users, shards):
+    """
+    Split user positions into `shards` lists of about the same number of
+    transactions (largest users first, each to the lightest shard so far).
+    """
+    buckets = [[] for _ in range(max(1, min(shards, len(users))))]
+    sizes = [0] * len(buckets)
+    for i in sorted(range(len(users)), key=lambda i: -len(users[i].get("transactions", []))):
+        lightest = sizes.index(min(sizes))
+        buckets[lightest].append(i)
+        sizes[lightest] += len(users[i].get("transactions", [])) + 1
+    return [sorted(b) for b in buckets if b]
+
+
+class MonthEndManager:
+    """
+    Month-end batch job: the dashboard, budget status and notifications of
+    every user, computed by a pool of worker processes and written to one
+    JSON file (config.MONTH_END_PATH).
+
+    Users are split into shards (balanced by transaction count where it is
+    known) and a task is only a list of user positions; only the small
+    per-user summaries travel back. Users the session has loaded are seen
+    by the forked workers through copy-on-write memory instead of being
+    pickled; users the storage loads on login (sharded, sqlite, binary,
+    lazy json) stay stubs in the session and each worker reads its own
+    shard's users through its own DataManager, so the parsing runs in
+    parallel too. Where fork is not available the user list is pickled
+    once per worker. With one worker everything runs in this process.
+
+    `python main.py report-all` runs ledger_service.user_report on the
+    same pool (see reports).
+    """
+
+    SHARDS_PER_WORKER = 4  # smaller tasks even out slow shards
+
+    def __init__(self, user_manager):
+        self.user_manager = user_manager
+
+    def run(self, month=None, workers=None, path=None):
+        """Run the job; returns the totals and timings (also written to the file)."""
+        month = ledger_service.parse_month(month) if month else datetime.date.today().strftime("%Y-%m")
+        workers = self._workers(workers)
+        path = path or config.MONTH_END_PATH.format(month=month)
+
+        self._settle()
+        started = time.perf_counter()
+        users = list(self.user_manager.users)
+        results = self._summaries(users, month_end_summary, month, workers)
+        seconds = time.perf_counter() - started
+
+        transactions = sum(r["dashboard"]["transactions"] for r in results)
+        stats = {
+            "month": month,
+            "users": len(users),
+            "transactions": transactions,
+            "over_budget": sum(1 for r in results if r["budget"] and Decimal(r["budget"]["remaining"]) < 0),
+            "notifications": sum(len(r["notifications"]) for r in results),
+            "workers": workers,
+            "seconds": round(seconds, 3),
+            "users_per_second": round(len(users) / seconds, 1) if seconds > 0 else None,
+            "transactions_per_second": round(transactions / seconds) if seconds > 0 else None,
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.user_manager.data_manager.durability.atomic_open(path) as f:
+            json.dump({"stats": stats, "users": results}, f, ensure_ascii=False, indent=1)
+        stats["path"] = path
+        return stats
+
+    def reports(self, month=None, workers=None):
+        """ledger_service.user_report of every user: {username: report} in user order."""
+        self._settle()
+        users = list(self.user_manager.users)
+        results = self._summaries(users, ledger_service.user_report, month, self._workers(workers))
+        return {user["username"]: report for user, report in zip(users, results)}
+
+    # Workers read what is saved, and no write is half-way (or still queued)
+    # on the background writer's thread when the pool forks
+    def _settle(self):
+        self.user_manager.flush()
+        self.user_manager.data_manager.drain()
+
+    def _workers(self, workers):
+        return workers or config.MONTH_END_WORKERS or os.cpu_count() or 1
+
+    def _summaries(self, users, job, month, workers):
+        # job(user, month) runs in the workers: a module-level function, so it pickles by name
+        data_manager = self.user_manager.data_manager
+        if workers <= 1 or len(users) <= 1:
+            return [_summarize(data_manager, u, job, month) for u in users]
+
+        shards = shard_users(users, workers * self.SHARDS_PER_WORKER)
+        has_stubs = any(data_manager.backend.is_stub(u) for u in users)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        results = [None] * len(users)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(users, has_stubs)) as pool:
+            for shard in pool.map(_run_shard, shards, [job] * len(shards), [month] * len(shards)):
+                for i, summary in shard:
+                    results[i] = summary
+        return results
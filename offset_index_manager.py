@@ -0,0 +1,150 @@
+import json
+import os
+
+from durability_manager import DurabilityManager
+from transaction_store import to_json
+
+
+class OffsetIndexManager:
+    """
+    Byte-offset index for users.json, saved next to it as users.idx.
+
+    The index lists every user's username, PIN, (start, end) byte range in
+    the snapshot and version, plus the snapshot's size and mtime so a stale
+    index is never trusted. Startup only reads the index; a user's slice of
+    the snapshot is parsed when that user logs in.
+
+    The snapshot keeps the usual json.dump(users, indent=4) layout, so it
+    stays readable by every other mode and by older versions.
+    """
+
+    def __init__(self, snapshot_path, durability=None):
+        self.snapshot_path = snapshot_path
+        self.durability = durability or DurabilityManager()
+        self.index_path = os.path.splitext(snapshot_path)[0] + ".idx"
+        self.offsets = {}  # username -> (start, end) in the current snapshot
+        self.snapshot_stat = None  # (size, mtime_ns) of the snapshot the offsets belong to
+
+    # -------------------------------
+    # Reading
+    # -------------------------------
+    def load_directory(self):
+        """
+        [{"username", "pin", "version"}, ...] for every user in the snapshot,
+        without parsing transactions. Builds (and saves) the index when it is
+        missing or out of date; returns None if the snapshot cannot be indexed.
+        """
+        entries = self._read_index()
+        if entries is None:
+            entries = self._scan_snapshot()
+            if entries is None:
+                return None
+            self._write_index(entries)
+        self._set_offsets(entries)
+        # indexes written before versions existed have four fields
+        return [{"username": e[0], "pin": e[1], "version": e[4] if len(e) > 4 else 0} for e in entries]
+
+    def read_user(self, username):
+        if self._stat() != self.snapshot_stat:
+            self.load_directory()  # rewritten by another session since
+        start, end = self.offsets[username]
+        with open(self.snapshot_path, "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(end - start))
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if (index.get("size"), index.get("mtime_ns")) != self._stat():
+            return None  # snapshot written by something else since
+        return index.get("users")
+
+    def _scan_snapshot(self):
+        # One-off full pass for a snapshot saved without an index
+        with open(self.snapshot_path, "rb") as f:
+            data = f.read()
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        if len(text) != len(data):
+            return None  # non-ASCII text: character offsets are not byte offsets
+
+        decoder = json.JSONDecoder()
+        entries = []
+        pos = self._skip(text, 0)
+        if pos >= len(text) or text[pos] != "[":
+            return None
+        pos = self._skip(text, pos + 1)
+        try:
+            while pos < len(text) and text[pos] != "]":
+                user, end = decoder.raw_decode(text, pos)
+                entries.append([user["username"], user.get("pin"), pos, end, user.get("version", 0)])
+                pos = self._skip(text, end)
+                if pos < len(text) and text[pos] == ",":
+                    pos = self._skip(text, pos + 1)
+        except (ValueError, KeyError, TypeError):
+            return None
+        return entries
+
+    def _skip(self, text, pos):
+        while pos < len(text) and text[pos] in " \t\r\n":
+            pos += 1
+        return pos
+
+    def _set_offsets(self, entries):
+        self.offsets = {e[0]: (e[2], e[3]) for e in entries}
+        self.snapshot_stat = self._stat()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    # -------------------------------
+    # Writing
+    # -------------------------------
+    def write_snapshot(self, users, is_stub):
+        """
+        Write users to the snapshot (tmp file + rename) and refresh the index.
+        Stubs (never loaded) are copied byte for byte from the old snapshot.
+        """
+        entries = []
+        old = open(self.snapshot_path, "rb") if any(is_stub(u) for u in users) else None
+        try:
+            with self.durability.atomic_open(self.snapshot_path, "wb") as f:
+                if not users:
+                    f.write(b"[]")
+                else:
+                    f.write(b"[\n")
+                for i, user in enumerate(users):
+                    f.write(b"    " if i == 0 else b",\n    ")
+                    if is_stub(user):
+                        start, end = self.offsets[user["username"]]
+                        old.seek(start)
+                        chunk = old.read(end - start)
+                    else:
+                        # same layout as json.dump(users, indent=4): every line one level deeper
+                        text = json.dumps(user, indent=4, default=to_json)
+                        chunk = text.replace("\n", "\n    ").encode("utf-8")
+                    start = f.tell()
+                    f.write(chunk)
+                    entries.append([user["username"], user.get("pin"), start, start + len(chunk), user.get("version", 0)])
+                if users:
+                    f.write(b"\n]")
+        finally:
+            if old is not None:
+                old.close()
+        self._set_offsets(entries)
+        self._write_index(entries)
+
+    def _write_index(self, entries):
+        size, mtime_ns = self._stat()
+        index = {"size": size, "mtime_ns": mtime_ns, "users": entries}
+        with self.durability.atomic_open(self.index_path) as f:
+            json.dump(index, f)
@@ -0,0 +1,229 @@
+import heapq
+from itertools import islice
+
+from index_manager import date_ordinal, month_bounds, normalize_category
+from transaction_store import TransactionStore, TransactionView
+
+
+FILTERS = ("start", "end", "categories", "min_amount", "max_amount", "t_type", "note")
+SORT_FIELDS = ("date", "amount", "category", "type", "note")
+
+
+class Query:
+    """
+    A transaction search. Every method returns a new Query, so queries can
+    be built up step by step and reused:
+
+        Query().in_month("2025-01").of_type("expense").note_contains("lunch")
+               .order_by("amount", descending=True).page(10)
+
+    Dates are inclusive ISO strings, amounts integer minor units (see
+    money.Money); categories and note text match case-insensitively.
+    Without order_by, rows come in the order of the access path the
+    planner picked (see QueryEngine).
+    """
+
+    def __init__(self, start=None, end=None, categories=None, min_amount=None, max_amount=None,
+                 t_type=None, note=None, order=None, descending=False, limit=None, offset=0):
+        if order is not None and order not in SORT_FIELDS:
+            raise ValueError(f"cannot sort by {order!r} (use one of {', '.join(SORT_FIELDS)})")
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError("limit and offset cannot be negative")
+        self.start = start
+        self.end = end
+        self.categories = list(categories) if categories is not None else None
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.t_type = t_type
+        self.note = note
+        self.order = order
+        self.descending = descending
+        self.limit = limit
+        self.offset = offset
+
+    def _with(self, **changes):
+        fields = dict(vars(self))
+        fields.update(changes)
+        return Query(**fields)
+
+    # -------------------------------
+    # Building
+    # -------------------------------
+    def between(self, start=None, end=None):
+        return self._with(start=start, end=end)
+
+    def in_month(self, month):
+        return self.between(*month_bounds(month))
+
+    def in_categories(self, categories):
+        return self._with(categories=categories)
+
+    def amount_between(self, min_amount=None, max_amount=None):
+        return self._with(min_amount=min_amount, max_amount=max_amount)
+
+    def of_type(self, t_type):
+        return self._with(t_type=t_type)
+
+    def note_contains(self, text):
+        return self._with(note=text)
+
+    def order_by(self, field, descending=False):
+        return self._with(order=field, descending=descending)
+
+    def page(self, limit=None, offset=0):
+        return self._with(limit=limit, offset=offset)
+
+    # -------------------------------
+    # Evaluation
+    # -------------------------------
+    def filters(self):
+        """The filters as query_transactions keyword arguments (unset ones left out)."""
+        return {name: getattr(self, name) for name in FILTERS if getattr(self, name) is not None}
+
+    def predicate(self):
+        """Function transaction -> bool applying every filter."""
+        start, end, t_type = self.start, self.end, self.t_type
+        min_amount, max_amount = self.min_amount, self.max_amount
+        categories = {normalize_category(c) for c in self.categories} if self.categories is not None else None
+        note = self.note.lower() if self.note is not None else None
+
+        def matches(t):
+            day = t.get("date", "")
+            return (
+                (start is None or day >= start)
+                and (end is None or day <= end)
+                and (categories is None or normalize_category(t.get("category", "")) in categories)
+                and (min_amount is None or t.get("amount", 0) >= min_amount)
+                and (max_amount is None or t.get("amount", 0) <= max_amount)
+                and (t_type is None or t.get("type") == t_type)
+                and (note is None or note in str(t.get("note", "")).lower())
+            )
+
+        return matches
+
+    def sort_key(self):
+        field = self.order
+        if field == "amount":
+            return lambda t: t.get("amount", 0) if type(t.get("amount", 0)) is int else 0
+        if field == "category":
+            return lambda t: normalize_category(t.get("category", ""))
+        return lambda t: str(t.get(field, ""))
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items() if v not in (None, False, 0))
+        return f"Query({fields})"
+
+
+class QueryResult:
+    """
+    Rows of one QueryEngine.run, produced while iterating: filtering stops
+    as soon as the page is full (sorting reads every candidate first, and
+    keeps only offset + limit of them). Iterate it once, before changing
+    the user's transactions; `plan` names the access path used.
+    """
+
+    def __init__(self, rows, plan):
+        self.plan = plan
+        self._rows = rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def fetch(self, n):
+        """The next n rows (fewer at the end)."""
+        return list(islice(self, n))
+
+
+class QueryEngine:
+    """
+    Runs Queries over one loaded user, picking the cheapest access path:
+
+        "date index"      DateIndex range (two bisects) when a date bound is given
+        "category index"  CategoryIndex rows of the wanted categories
+                          (of the two, the one matching fewer rows is used)
+        "sql"             backends with query_pushdown (SQLite): the whole query,
+                          order and page included, runs in the database
+        "column scan"     columnar TransactionStore: vectorized scan of its arrays,
+                          ordered by the amount/date columns when asked
+        "scan"            every transaction, tested one by one
+
+    The filters an index does not cover are applied to its rows only.
+    """
+
+    def __init__(self, indexes, data_manager, flush=None):
+        self.indexes = indexes  # IndexManager
+        self.data_manager = data_manager
+        self.flush = flush  # writes pending changes before the backend is asked
+
+    def plan(self, user, query):
+        """Name of the access path run() takes for query."""
+        return self._plan(user, query)[0]
+
+    def _plan(self, user, query):
+        username = user["username"]
+        date_index = self.indexes.date_indexes.get(username)
+        category_index = self.indexes.category_indexes.get(username)
+        bounds = (query.start, query.end)
+        options = []  # (rows to test, plan, candidates)
+        if (date_index is not None and any(b is not None for b in bounds)
+                and all(b is None or date_ordinal(b) is not None for b in bounds)):
+            ids = date_index.ids_between(*bounds)
+            options.append((len(ids), "date index", lambda: (date_index.by_id[tid] for tid in ids)))
+        if category_index is not None and query.categories is not None:
+            options.append((category_index.count(query.categories), "category index",
+                            lambda: iter(category_index.matching(query.categories))))
+        if options:
+            _, plan, candidates = min(options, key=lambda option: option[0])
+            return plan, candidates
+        if self.data_manager.backend.query_pushdown:
+            return "sql", None
+        transactions = user.get("transactions", [])
+        if isinstance(transactions, TransactionStore):
+            return "column scan", None
+        return "scan", lambda: iter(transactions)
+
+    def run(self, user, query):
+        plan, candidates = self._plan(user, query)
+        if plan == "sql":
+            rows = self._sql(user, query)
+        elif plan == "column scan":
+            rows = self._column_scan(user["transactions"], query)
+        else:
+            matches = query.predicate()
+            rows = self._order_and_page((t for t in candidates() if matches(t)), query)
+        return QueryResult(rows, plan)
+
+    def _sql(self, user, query):
+        if self.flush is not None:
+            self.flush()  # the database must see pending changes
+        yield from self.data_manager.query_transactions(
+            user, order=query.order, descending=query.descending, limit=query.limit, offset=query.offset,
+            **query.filters()
+        )
+
+    def _column_scan(self, store, query):
+        rows = store.rows_matching(**query.filters())
+        if query.order is not None:
+            ordered = store.sort_rows(rows, query.order, query.descending)
+            if ordered is not None:
+                yield from self._page((TransactionView(store, r) for r in ordered), query)
+                return
+        yield from self._order_and_page((TransactionView(store, r) for r in rows), query)
+
+    def _order_and_page(self, rows, query):
+        if query.order is not None:
+            key = query.sort_key()
+            if query.limit is not None:
+                # top-k: same rows as sorting everything, without keeping it all
+                pick = heapq.nlargest if query.descending else heapq.nsmallest
+                rows = pick(query.offset + query.limit, rows, key=key)
+            else:
+                rows = sorted(rows, key=key, reverse=query.descending)
+        yield from self._page(rows, query)
+
+    def _page(self, rows, query):
+        stop = query.offset + query.limit if query.limit is not None else None
+        return islice(rows, query.offset, stop)
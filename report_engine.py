@@ -0,0 +1,202 @@
+from datetime import date
+
+from index_manager import normalize_category
+from money import Money, minor_units
+from transaction_store import MISSING, TYPE_NAMES, TransactionStore
+
+
+def amount_minor(value, currency):
+    """Minor units of a transaction amount; values that are not amounts count as 0."""
+    try:
+        return minor_units(value, currency)
+    except ValueError:
+        return 0
+
+
+def month_of(date_str):
+    return date_str[:7] if len(date_str) >= 7 else "unknown"
+
+
+class ReportSummary:
+    """
+    Every report total grouped by (month, category, type), built in one pass.
+
+    Totals by type, by month and by category are derived from these few
+    cells instead of rescanning the transactions. Amounts are summed as
+    integer minor units and handed out as Money in the user's currency.
+
+    Roll-ups per (month, type) and per type are kept next to the cells, so
+    the dashboard and budget checks are dictionary lookups, and add() can
+    keep the whole summary up to date one transaction at a time.
+
+    Categories are grouped case-insensitively ("Rent" and "rent" are one
+    cell) and shown with the first spelling seen.
+    """
+
+    def __init__(self, currency):
+        self.currency = currency
+        self.names = {}  # normalized category -> display name
+        self.cents = {}  # (month, normalized category, type) -> int minor units
+        self.counts = {}  # (month, category, type) -> number of transactions
+        # (month, None, type) and (None, None, type) -> [minor units, count]
+        self.rollups = {}
+
+    @classmethod
+    def from_transactions(cls, transactions, currency):
+        summary = cls(currency)
+        if isinstance(transactions, TransactionStore):
+            summary._add_store(transactions)
+        else:
+            summary._add_list(transactions)
+        return summary
+
+    # -------------------------------
+    # Building
+    # -------------------------------
+    def add(self, t, sign=1):
+        """Add (sign=1) or remove (sign=-1) one transaction."""
+        key = (month_of(t.get("date", "")), self._category_key(t.get("category", "Uncategorized")),
+               t.get("type", "expense"))
+        self._add_cell(key, sign * amount_minor(t.get("amount", 0), self.currency), sign)
+
+    def _category_key(self, name):
+        key = normalize_category(name)
+        self.names.setdefault(key, name)
+        return key
+
+    def _add_cell(self, key, cents, count):
+        for rollup_key in ((key[0], None, key[2]), (None, None, key[2])):
+            rollup = self.rollups.get(rollup_key)
+            if rollup is None:
+                rollup = self.rollups[rollup_key] = [0, 0]
+            rollup[0] += cents
+            rollup[1] += count
+            if not rollup[1]:
+                del self.rollups[rollup_key]
+
+        self.cents[key] = self.cents.get(key, 0) + cents
+        n = self.counts.get(key, 0) + count
+        if n:
+            self.counts[key] = n
+        else:
+            # last transaction of the cell removed
+            self.counts.pop(key, None)
+            self.cents.pop(key, None)
+
+    def _add_list(self, transactions):
+        # Same as add() per row, inlined: this loop is the whole cost of a report
+        cents_by_key = {}
+        counts = {}
+        odd = []
+        category_keys = {}  # raw spelling -> normalized key, so each spelling is normalized once
+        for t in transactions:
+            d = t.get("date", "")
+            category = t.get("category", "Uncategorized")
+            category_key = category_keys.get(category)
+            if category_key is None:
+                category_key = category_keys[category] = self._category_key(category)
+            key = (d[:7] if len(d) >= 7 else "unknown", category_key, t.get("type", "expense"))
+            value = t.get("amount", 0)
+            if type(value) is int:
+                cents_by_key[key] = cents_by_key.get(key, 0) + value
+                counts[key] = counts.get(key, 0) + 1
+                continue
+            odd.append(t)
+        for key, cents in cents_by_key.items():
+            self._add_cell(key, cents, counts[key])
+        for t in odd:
+            self.add(t)
+
+    def _add_store(self, store):
+        # Columnar path: group on the integer columns, resolve names once per group
+        odd_ids = {
+            tid for tid, odd in store.extra.items()
+            if odd.keys() & {"amount", "date", "type", "category", MISSING}
+        }
+        groups = {}
+        counts = {}
+        odd_rows = []
+        dates, types, cats, amounts = store.dates, store.types, store.category_ids, store.amounts
+        for row in range(len(store)):
+            if odd_ids and store.get_field(row, "id") in odd_ids:
+                odd_rows.append(row)
+                continue
+            key = (dates[row], cats[row], types[row])
+            groups[key] = groups.get(key, 0) + amounts[row]
+            counts[key] = counts.get(key, 0) + 1
+
+        # Category ids are interned in first-seen order, which keeps the breakdown order stable
+        months = {}
+        category_keys = [self._category_key(name) for name in store.category_names]
+        for (ordinal, cid, flag), cents in sorted(groups.items(), key=lambda item: item[0][1]):
+            month = months.get(ordinal)
+            if month is None:
+                month = months[ordinal] = date.fromordinal(ordinal).isoformat()[:7]
+            self._add_cell((month, category_keys[cid], TYPE_NAMES[flag]), cents, counts[(ordinal, cid, flag)])
+        for row in odd_rows:
+            self.add(store[row])
+
+    # -------------------------------
+    # Reading
+    # -------------------------------
+    def _value(self, keys):
+        return Money(sum(self.cents[k] for k in keys), self.currency)
+
+    def _keys(self, month=None, category=None, t_type=None):
+        if category is not None:
+            category = normalize_category(category)
+        return [
+            k for k in self.counts
+            if (month is None or k[0] == month)
+            and (category is None or k[1] == category)
+            and (t_type is None or k[2] == t_type)
+        ]
+
+    def total(self, t_type=None, month=None, category=None):
+        if t_type is not None and category is None:
+            rollup = self.rollups.get((month, None, t_type))
+            return Money(rollup[0] if rollup else 0, self.currency)
+        return self._value(self._keys(month, category, t_type))
+
+    def count(self, t_type=None, month=None, category=None):
+        if t_type is not None and category is None:
+            rollup = self.rollups.get((month, None, t_type))
+            return rollup[1] if rollup else 0
+        return sum(self.counts[k] for k in self._keys(month, category, t_type))
+
+    def by_month(self, t_type=None):
+        """{month: total}, sorted by month."""
+        grouped = {}
+        for k in self._keys(t_type=t_type):
+            grouped.setdefault(k[0], []).append(k)
+        return {m: self._value(keys) for m, keys in sorted(grouped.items())}
+
+    def by_category(self):
+        """{category: {"income": total, "expense": total}} in first-seen order."""
+        grouped = {}
+        for k in self.counts:
+            grouped.setdefault(k[1], {}).setdefault(k[2], []).append(k)
+        return {
+            self.names.get(cat, cat): {
+                "income": self._value(types.get("income", [])),
+                "expense": self._value(types.get("expense", [])),
+            }
+            for cat, types in grouped.items()
+        }
+
+    # -------------------------------
+    # Persistence (stored with the user as plain JSON)
+    # -------------------------------
+    def to_json(self):
+        return {
+            "count": sum(self.counts.values()),
+            "currency": self.currency,
+            "cells": [[k[0], self.names.get(k[1], k[1]), k[2], self.cents[k], self.counts[k]] for k in self.counts],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        summary = cls(data["currency"])
+        for month, category, t_type, cents, count in data.get("cells", []):
+            summary._add_cell((month, summary._category_key(category), t_type), cents, count)
+        return summary
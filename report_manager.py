@@ -1,6 +1,6 @@
-import datetime
-from collections import defaultdict
-from decimal import Decimal, InvalidOperation
+import ledger_service
+from ledger_service import ServiceError
+from money import Money, format_amount
 
 class ReportManager:
     def __init__(self, user_manager):
@@ -13,15 +13,9 @@ class ReportManager:
             return []
         return self.user_manager.current_user.get("transactions", [])
 
-    # internal helper: safe Decimal conversion
-    def _to_decimal(self, value):
-        """
-        Convert value to Decimal safely. value may be int/float/str.
-        """
-        try:
-            return Decimal(str(value))
-        except (InvalidOperation, ValueError, TypeError):
-            return Decimal("0")
+    # Helper: the logged-in user (results come from ledger_service, only printed here)
+    def _user(self):
+        return self.user_manager.current_user
 
     #  Dashboard summary
     def dashboard_summary(self):
@@ -30,14 +24,12 @@ class ReportManager:
             print(" No transactions found.")
             return
 
-        total_income = sum(self._to_decimal(t["amount"]) for t in transactions if t["type"] == "income")
-        total_expense = sum(self._to_decimal(t["amount"]) for t in transactions if t["type"] == "expense")
-        balance = total_income - total_expense
+        totals = ledger_service.totals(self._user())
 
         print("\n===  DASHBOARD SUMMARY ===")
-        print(f"Total Income:  {total_income:.2f}")
-        print(f"Total Expense: {total_expense:.2f}")
-        print(f"Net Balance:   {balance:.2f}")
+        print(f"Total Income:  {totals.income}")
+        print(f"Total Expense: {totals.expense}")
+        print(f"Net Balance:   {totals.balance}")
         print("============================")
 
     #  Monthly reports
@@ -49,24 +41,19 @@ class ReportManager:
 
         month = input("Enter month (YYYY-MM): ").strip()
         try:
-            datetime.datetime.strptime(month, "%Y-%m")
-        except ValueError:
-            print(" Invalid month format.")
+            totals = ledger_service.totals(self._user(), ledger_service.parse_month(month))
+        except ServiceError as e:
+            print(f" {e}")
             return
 
-        filtered = [t for t in transactions if t.get("date", "").startswith(month)]
-        if not filtered:
+        if not totals.count:
             print("No transactions for this month.")
             return
 
-        income = sum(self._to_decimal(t["amount"]) for t in filtered if t["type"] == "income")
-        expense = sum(self._to_decimal(t["amount"]) for t in filtered if t["type"] == "expense")
-        balance = income - expense
-
         print(f"\n===  MONTHLY REPORT ({month}) ===")
-        print(f"Total Income:  {income:.2f}")
-        print(f"Total Expense: {expense:.2f}")
-        print(f"Net Balance:   {balance:.2f}")
+        print(f"Total Income:  {totals.income}")
+        print(f"Total Expense: {totals.expense}")
+        print(f"Net Balance:   {totals.balance}")
         print("===============================")
 
     #  Category breakdown
@@ -76,15 +63,11 @@ class ReportManager:
             print(" No transactions found.")
             return
 
-        categories = defaultdict(lambda: {"income": Decimal("0"), "expense": Decimal("0")})
-        for t in transactions:
-            cat = t.get("category", "Uncategorized")
-            ttype = t.get("type", "expense")
-            categories[cat][ttype] += self._to_decimal(t.get("amount", 0))
+        categories = ledger_service.category_breakdown(self._user())
 
         print("\n===  CATEGORY BREAKDOWN ===")
         for category, data in categories.items():
-            print(f"{category}: Income = {data['income']:.2f}, Expense = {data['expense']:.2f}")
+            print(f"{category}: Income = {data['income']}, Expense = {data['expense']}")
         print("=============================")
 
     def spending_trends(self):
@@ -93,18 +76,36 @@ class ReportManager:
             print(" No transactions found.")
             return
 
-        monthly_expense = defaultdict(Decimal)
-        for t in transactions:
-            date = t.get("date", "")
-            month = date[:7] if len(date) >= 7 else "unknown"
-            if t.get("type") == "expense":
-                monthly_expense[month] += self._to_decimal(t.get("amount", 0))
+        monthly_expense = ledger_service.spending_trends(self._user())
 
         print("\n===  SPENDING TRENDS (by month) ===")
-        for month, total in sorted(monthly_expense.items()):
-            print(f"{month}: {total:.2f}")
+        for month, total in monthly_expense.items():
+            print(f"{month}: {total}")
         print("=====================================")
 
+    #  Largest expenses (whole history or one month)
+    def top_expenses(self, count=10):
+        transactions = self._get_transactions()
+        if not transactions:
+            print(" No transactions found.")
+            return
+
+        month = input("Enter month (YYYY-MM) or leave empty for all: ").strip()
+        try:
+            rows = ledger_service.top_expenses(self.user_manager, count, month or None)
+        except ServiceError as e:
+            print(f" {e}")
+            return
+        if not rows:
+            print("No expenses found.")
+            return
+
+        currency = self.user_manager.currency()
+        print(f"\n===  LARGEST EXPENSES ({month or 'all time'}) ===")
+        for i, t in enumerate(rows, start=1):
+            print(f"{i}. {format_amount(t['amount'], currency)} | {t['category']} | {t['date']} | {t['note']}")
+        print("===============================")
+
     def ascii_visualization(self):
         """
         Display ASCII-based charts showing:
@@ -116,41 +117,39 @@ class ReportManager:
             print(" No transactions found.")
             return
 
+        totals = ledger_service.totals(self._user())
+        currency = ledger_service.currency(self._user())
+
         # --- Income vs Expense Summary ---
-        total_income = sum(self._to_decimal(t["amount"]) for t in transactions if t["type"] == "income")
-        total_expense = sum(self._to_decimal(t["amount"]) for t in transactions if t["type"] == "expense")
+        total_income = totals.income
+        total_expense = totals.expense
 
         print("\n=== ASCII VISUALIZATION: Income vs Expense ===")
         bar_width = 40
-        max_val = max(total_income, total_expense, Decimal("1"))
+        max_val = max(total_income, total_expense, Money(1, currency))
 
         def make_bar(value):
             length = int((value / max_val) * bar_width)
             return "#" * length + " " * (bar_width - length)
 
-        print(f"Income : {make_bar(total_income)} ({total_income:.2f})")
-        print(f"Expense: {make_bar(total_expense)} ({total_expense:.2f})")
+        print(f"Income : {make_bar(total_income)} ({total_income})")
+        print(f"Expense: {make_bar(total_expense)} ({total_expense})")
 
         # --- Monthly Expense Trend ---
-        monthly = defaultdict(Decimal)
-        for t in transactions:
-            if t.get("type") == "expense":
-                date = t.get("date", "")
-                month = date[:7] if len(date) >= 7 else "unknown"
-                monthly[month] += self._to_decimal(t.get("amount", 0))
+        monthly = ledger_service.spending_trends(self._user())
 
         if monthly:
             print("\n=== Monthly Expense Trend (YYYY-MM) ===")
-            # sort months ascending
-            items = sorted(monthly.items())
+            # months come sorted ascending
+            items = list(monthly.items())
             # find max monthly expense for scaling
             max_month = max(v for _, v in items)
-            max_month = max_month if max_month > 0 else Decimal("1")
+            max_month = max_month if max_month.minor > 0 else Money(1, currency)
             # print each month with small bars (max width 30)
             for mon, val in items:
                 length = int((val / max_month) * 30)
                 bar = "*" * length
-                print(f"{mon}: {bar} ({val:.2f})")
+                print(f"{mon}: {bar} ({val})")
         else:
             print("\nNo expense transactions to show monthly trend.")
         print("============================================\n")
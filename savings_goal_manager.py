@@ -1,6 +1,5 @@
-import uuid
-from decimal import Decimal, InvalidOperation
-from datetime import datetime
+import ledger_service
+from ledger_service import ServiceError
 
 
 class SavingsGoalManager:
@@ -12,28 +11,31 @@ class SavingsGoalManager:
     # -------------------------------
     # Helper methods
     # -------------------------------
-    def _now_iso(self):
-        return datetime.now().isoformat()
-
-    def _to_decimal(self, value):
-        try:
-            return Decimal(str(value))
-        except (InvalidOperation, ValueError, TypeError):
-            return Decimal("0")
-
     def _ensure_goals_list(self):
         """Ensure current user has 'savings_goals' list."""
         u = self.user_manager.current_user
         if u is None:
             print("Please login first.")
             return False
-        if "savings_goals" not in u:
-            u["savings_goals"] = []
+        with self.user_manager.lock:
+            if "savings_goals" not in u:
+                u["savings_goals"] = []
         return True
 
-    def _save_users(self):
-        """Proxy save to UserManager."""
-        self.user_manager.save()
+    def _choose_goal(self, prompt):
+        """Show the goals and ask for one; returns its id, or None."""
+        goals = self.user_manager.current_user.get("savings_goals", [])
+        self.view_goals()
+        choice = input(prompt).strip()
+        if not choice.isdigit():
+            print("Invalid input.")
+            return None
+
+        idx = int(choice) - 1
+        if idx < 0 or idx >= len(goals):
+            print("Invalid number.")
+            return None
+        return goals[idx]["id"]
 
     # -------------------------------
     # CRUD operations
@@ -49,54 +51,29 @@ class SavingsGoalManager:
             return
 
         amt = input("Target amount: ").strip()
+        deadline = input("Deadline (YYYY-MM-DD) [optional]: ").strip()
         try:
-            target = self._to_decimal(amt)
-            if target <= 0:
-                print("Target must be greater than 0.")
-                return
-        except Exception:
-            print("Invalid amount.")
+            goal = ledger_service.add_goal(self.user_manager, name, amt, deadline)
+        except ServiceError as e:
+            print(e)
             return
-
-        deadline = input("Deadline (YYYY-MM-DD) [optional]: ").strip()
-        if deadline:
-            try:
-                datetime.strptime(deadline, "%Y-%m-%d")
-            except ValueError:
-                print("Invalid deadline format. Use YYYY-MM-DD or leave empty.")
-                return
-
-        goal = {
-            "id": str(uuid.uuid4()),
-            "name": name,
-            "target_amount": str(target),
-            "saved_amount": "0",
-            "deadline": deadline,
-            "created_at": self._now_iso()
-        }
-
-        self.user_manager.current_user["savings_goals"].append(goal)
-        self._save_users()
-        print(f"Goal '{name}' added successfully (target {target:.2f}).")
+        print(f"Goal '{name}' added successfully (target {goal.target}).")
 
     def view_goals(self):
         """List all goals with progress."""
         if not self._ensure_goals_list():
             return
 
-        goals = self.user_manager.current_user.get("savings_goals", [])
+        goals = ledger_service.goals(self.user_manager.current_user)
         if not goals:
             print("No savings goals found.")
             return
 
         print("\n=== Savings Goals ===")
         for i, g in enumerate(goals, start=1):
-            target = self._to_decimal(g.get("target_amount", "0"))
-            saved = self._to_decimal(g.get("saved_amount", "0"))
-            pct = (saved / target * 100) if target > 0 else Decimal("0")
-            status = "✅ Reached" if saved >= target else "🔸 In progress"
-            deadline = f" | Deadline: {g['deadline']}" if g.get("deadline") else ""
-            print(f"{i}. {g['name']} — saved: {saved:.2f} / {target:.2f} ({pct:.1f}%) {status}{deadline}")
+            status = "✅ Reached" if g.reached else "🔸 In progress"
+            deadline = f" | Deadline: {g.deadline}" if g.deadline else ""
+            print(f"{i}. {g.name} — saved: {g.saved} / {g.target} ({g.percent:.1f}%) {status}{deadline}")
         print("=====================\n")
 
     def delete_goal(self):
@@ -104,25 +81,16 @@ class SavingsGoalManager:
         if not self._ensure_goals_list():
             return
 
-        goals = self.user_manager.current_user.get("savings_goals", [])
-        if not goals:
+        if not self.user_manager.current_user.get("savings_goals"):
             print("No goals to delete.")
             return
 
-        self.view_goals()
-        choice = input("Enter goal number to delete: ").strip()
-        if not choice.isdigit():
-            print("Invalid input.")
+        goal_id = self._choose_goal("Enter goal number to delete: ")
+        if goal_id is None:
             return
 
-        idx = int(choice) - 1
-        if idx < 0 or idx >= len(goals):
-            print("Invalid number.")
-            return
-
-        g = goals.pop(idx)
-        self._save_users()
-        print(f"🗑️ Deleted goal '{g['name']}'.")
+        g = ledger_service.delete_goal(self.user_manager, goal_id)
+        print(f"🗑️ Deleted goal '{g.name}'.")
 
     def add_saved_amount(self):
         """
@@ -133,48 +101,21 @@ class SavingsGoalManager:
         if not self._ensure_goals_list():
             return
 
-        goals = self.user_manager.current_user.get("savings_goals", [])
-        if not goals:
+        if not self.user_manager.current_user.get("savings_goals"):
             print("No goals found.")
             return
 
-        self.view_goals()
-        choice = input("Choose goal number to allocate to: ").strip()
-        if not choice.isdigit():
-            print("Invalid input.")
-            return
-
-        idx = int(choice) - 1
-        if idx < 0 or idx >= len(goals):
-            print("Invalid number.")
+        goal_id = self._choose_goal("Choose goal number to allocate to: ")
+        if goal_id is None:
             return
 
         amt_str = input("Amount to allocate: ").strip()
         try:
-            amt = self._to_decimal(amt_str)
-            if amt <= 0:
-                print("Amount must be positive.")
-                return
-        except Exception:
-            print("Invalid amount.")
+            amount, g = ledger_service.allocate_to_goal(self.user_manager, goal_id, amt_str)
+        except ServiceError as e:
+            print(e)
             return
-
-        transaction = {
-            "id": str(uuid.uuid4()),
-            "type": "expense",
-            "amount": float(amt),
-            "category": "Savings",
-            "note": f"Allocated to goal {goals[idx]['id']} - {goals[idx]['name']}",
-            "date": datetime.now().date().isoformat()
-        }
-
-        self.user_manager.current_user.setdefault("transactions", []).append(transaction)
-
-        existing_saved = self._to_decimal(goals[idx].get("saved_amount", "0"))
-        goals[idx]["saved_amount"] = str(existing_saved + amt)
-
-        self._save_users()
-        print(f" Allocated {amt:.2f} to goal '{goals[idx]['name']}'. Transaction recorded.")
+        print(f" Allocated {amount} to goal '{g.name}'. Transaction recorded.")
 
     def edit_goal(self):
         """Edit name, target amount, or deadline of a goal."""
@@ -186,40 +127,21 @@ class SavingsGoalManager:
             print("No goals found.")
             return
 
-        self.view_goals()
-        choice = input("Choose goal number to edit: ").strip()
-        if not choice.isdigit():
-            print("Invalid input.")
-            return
-
-        idx = int(choice) - 1
-        if idx < 0 or idx >= len(goals):
-            print("Invalid number.")
+        goal_id = self._choose_goal("Choose goal number to edit: ")
+        if goal_id is None:
             return
 
-        g = goals[idx]
+        g = next(g for g in ledger_service.goals(self.user_manager.current_user) if g.id == goal_id)
         print("Press Enter to keep current value.")
-        new_name = input(f"Name ({g['name']}): ").strip()
-        new_target = input(f"Target ({g['target_amount']}): ").strip()
-        new_deadline = input(f"Deadline ({g.get('deadline', '')}) [YYYY-MM-DD]: ").strip()
-
-        if new_name:
-            g["name"] = new_name
-        if new_target:
-            try:
-                t = self._to_decimal(new_target)
-                if t > 0:
-                    g["target_amount"] = str(t)
-                else:
-                    print("Target must be > 0. Keeping old value.")
-            except Exception:
-                print("Invalid target. Keeping old value.")
-        if new_deadline:
-            try:
-                datetime.strptime(new_deadline, "%Y-%m-%d")
-                g["deadline"] = new_deadline
-            except ValueError:
-                print("Invalid date format. Keeping old value.")
-
-        self._save_users()
+        new_name = input(f"Name ({g.name}): ").strip()
+        new_target = input(f"Target ({g.target}): ").strip()
+        new_deadline = input(f"Deadline ({g.deadline}) [YYYY-MM-DD]: ").strip()
+
+        # each field on its own: an invalid one keeps its old value, the others still change
+        for field, value in (("name", new_name), ("target", new_target), ("deadline", new_deadline)):
+            if value:
+                try:
+                    ledger_service.edit_goal(self.user_manager, goal_id, **{field: value})
+                except ServiceError as e:
+                    print(f"{e} Keeping old value.")
         print(" Goal updated successfully.")
@@ -1,5 +1,10 @@
 from datetime import datetime
 
+import ledger_service
+from ledger_service import ServiceError
+from money import format_amount
+from query_engine import SORT_FIELDS, Query
+
 class SearchFilterManager:
     def __init__(self, user_manager):
         self.user_manager = user_manager
@@ -28,12 +33,10 @@ class SearchFilterManager:
             print(" Invalid date format.")
             return
 
-        results = [
-            t for t in transactions
-            if start <= datetime.strptime(t["date"], "%Y-%m-%d") <= end
-        ]
+        query = Query().between(start.date().isoformat(), end.date().isoformat())
+        results = ledger_service.search(self.user_manager, query)
 
-        self._display_results(results)
+        self._display_results(list(results))
 
     # 2️2 Filter by category
     def filter_by_category(self):
@@ -43,9 +46,9 @@ class SearchFilterManager:
             return
 
         category = input("Enter category to filter by: ").strip().lower()
-        results = [t for t in transactions if t["category"].lower() == category]
+        results = ledger_service.search(self.user_manager, Query().in_categories([category]))
 
-        self._display_results(results)
+        self._display_results(list(results))
 
     # 3️3 Filter by amount range
     def filter_by_amount(self):
@@ -54,19 +57,17 @@ class SearchFilterManager:
             print("No transactions found.")
             return
 
+        user = self.user_manager.current_user
         try:
-            min_amount = float(input("Enter minimum amount: ").strip())
-            max_amount = float(input("Enter maximum amount: ").strip())
-        except ValueError:
+            min_amount = ledger_service.parse_amount(user, input("Enter minimum amount: "), positive=False)
+            max_amount = ledger_service.parse_amount(user, input("Enter maximum amount: "), positive=False)
+        except ServiceError:
             print("Invalid amount input.")
             return
 
-        results = [
-            t for t in transactions
-            if min_amount <= t["amount"] <= max_amount
-        ]
+        results = ledger_service.search(self.user_manager, Query().amount_between(min_amount, max_amount))
 
-        self._display_results(results)
+        self._display_results(list(results))
 
     # 4️4 Sort results
     def sort_transactions(self):
@@ -82,19 +83,81 @@ class SearchFilterManager:
         print("4. Amount (lowest first)")
         choice = input("Choose sorting option: ").strip()
 
-        if choice == "1":
-            results = sorted(transactions, key=lambda x: x["date"], reverse=True)
-        elif choice == "2":
-            results = sorted(transactions, key=lambda x: x["date"])
-        elif choice == "3":
-            results = sorted(transactions, key=lambda x: x["amount"], reverse=True)
-        elif choice == "4":
-            results = sorted(transactions, key=lambda x: x["amount"])
-        else:
+        orders = {"1": ("date", True), "2": ("date", False), "3": ("amount", True), "4": ("amount", False)}
+        if choice not in orders:
             print(" Invalid choice.")
             return
 
-        self._display_results(results)
+        results = ledger_service.search(self.user_manager, Query().order_by(*orders[choice]))
+        self._display_results(list(results))
+
+    # 5️5 Any mix of the filters above plus note text, sorted and shown a page at a time
+    def advanced_search(self):
+        transactions = self._get_transactions()
+        if not transactions:
+            print("No transactions found.")
+            return
+
+        print("Press Enter to skip a criterion.")
+        query = Query()
+        try:
+            start = input("Start date (YYYY-MM-DD): ").strip()
+            end = input("End date (YYYY-MM-DD): ").strip()
+            for value in (start, end):
+                if value:
+                    datetime.strptime(value, "%Y-%m-%d")
+            if start or end:
+                query = query.between(start or None, end or None)
+
+            categories = [c.strip() for c in input("Categories (comma-separated): ").split(",") if c.strip()]
+            if categories:
+                query = query.in_categories(categories)
+
+            user = self.user_manager.current_user
+            low = input("Minimum amount: ").strip()
+            high = input("Maximum amount: ").strip()
+            if low or high:
+                query = query.amount_between(ledger_service.parse_amount(user, low, positive=False) if low else None,
+                                             ledger_service.parse_amount(user, high, positive=False) if high else None)
+        except ValueError as e:
+            print(f" Invalid input: {e}")
+            return
+
+        t_type = input("Type (income/expense): ").strip().lower()
+        if t_type:
+            if t_type not in ("income", "expense"):
+                print(" Invalid type.")
+                return
+            query = query.of_type(t_type)
+
+        note = input("Note contains: ").strip()
+        if note:
+            query = query.note_contains(note)
+
+        order = input(f"Sort by ({'/'.join(SORT_FIELDS)}, prefix '-' for descending): ").strip().lower()
+        if order:
+            if order.lstrip("-") not in SORT_FIELDS:
+                print(" Invalid sort field.")
+                return
+            query = query.order_by(order.lstrip("-"), descending=order.startswith("-"))
+
+        page_size = input("Results per page [20]: ").strip()
+        page_size = int(page_size) if page_size.isdigit() and int(page_size) > 0 else 20
+
+        results = ledger_service.search(self.user_manager, query)
+        shown = 0
+        while True:
+            rows = results.fetch(page_size)
+            if not rows:
+                if not shown:
+                    print("No matching transactions found.")
+                break
+            self._print_rows(rows, first=shown + 1)
+            shown += len(rows)
+            if len(rows) < page_size or input("Enter for the next page, q to stop: ").strip().lower() == "q":
+                break
+        if shown:
+            print(f"Shown: {shown} transaction(s).")
 
     # Helper: display formatted results
     def _display_results(self, results):
@@ -102,11 +165,16 @@ class SearchFilterManager:
             print("No matching transactions found.")
             return
 
+        self._print_rows(results)
+        print(f"Total found: {len(results)} transaction(s).")
+
+    def _print_rows(self, rows, first=1):
         print("\n===  SEARCH RESULTS ===")
-        for i, t in enumerate(results, start=1):
-            print(f"{i}. [{t['type'].upper()}] {t['amount']} | {t['category']} | {t['date']} | {t['note']}")
+        currency = self.user_manager.currency()
+        for i, t in enumerate(rows, start=first):
+            amount = format_amount(t["amount"], currency)
+            print(f"{i}. [{t['type'].upper()}] {amount} | {t['category']} | {t['date']} | {t['note']}")
         print("=========================")
-        print(f"Total found: {len(results)} transaction(s).")
 
 
         
\ No newline at end of file
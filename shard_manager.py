@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import re
+
+from durability_manager import DurabilityManager
+from transaction_store import to_json
+
+
+class ShardManager:
+    """
+    One JSON file per user plus a small index.json of usernames.
+
+    The index maps username -> {"pin", "file", "version"} so the user list
+    and login check never touch anyone's transactions; a user's shard is
+    read on login and only rewritten when that user changes.
+    """
+
+    def __init__(self, shard_dir, durability=None):
+        self.shard_dir = shard_dir
+        self.durability = durability or DurabilityManager()
+        self.index_path = os.path.join(shard_dir, "index.json")
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    # -------------------------------
+    # Index
+    # -------------------------------
+    def load_index(self):
+        if not self.exists():
+            return {}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_index(self, users):
+        index = {u["username"]: self._index_entry(u) for u in users}
+        self._write_atomic(self.index_path, index)
+        return index
+
+    def update_index(self, users):
+        """Re-read the index and update the entries of users (others are kept as stored)."""
+        index = self.load_index()
+        for user in users:
+            index[user["username"]] = self._index_entry(user)
+        self._write_atomic(self.index_path, index)
+        return index
+
+    def _index_entry(self, user):
+        return {"pin": user["pin"], "file": self._file_name(user["username"]), "version": user.get("version", 0)}
+
+    # -------------------------------
+    # Shards
+    # -------------------------------
+    def load_user(self, username):
+        with open(self._shard_path(username), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_user(self, user):
+        self._write_atomic(self._shard_path(user["username"]), user)
+
+    def delete_user(self, username):
+        path = self._shard_path(username)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # -------------------------------
+    # Migration from the single users.json
+    # -------------------------------
+    def migrate(self, users):
+        """Write every user to its own shard, then the index (last, so a crash leaves no index)."""
+        for user in users:
+            self.save_user(user)
+        return self.save_index(users)
+
+    # -------------------------------
+    # Helpers
+    # -------------------------------
+    def _file_name(self, username):
+        # Usernames are free text: keep a readable part and add a hash so names never collide
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", username)[:40]
+        digest = hashlib.sha1(username.encode("utf-8")).hexdigest()[:8]
+        return f"{safe}-{digest}.json"
+
+    def _shard_path(self, username):
+        return os.path.join(self.shard_dir, self._file_name(username))
+
+    def lock_name(self, username):
+        return "user-" + os.path.splitext(self._file_name(username))[0]
+
+    def _write_atomic(self, path, value):
+        with self.durability.atomic_open(path) as f:
+            json.dump(value, f, indent=4, default=to_json)
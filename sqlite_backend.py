@@ -0,0 +1,441 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from index_manager import normalize_category
+from money import migrate_user, minor_digits
+from storage_backend import StorageBackend
+from transaction_store import to_json
+
+
+# Ids are unique per user, not per database: imports derive ids from the bank's
+# (ofx-FITID) and `add --id` takes any id, so two users can hold the same one
+TRANSACTIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+    id       TEXT NOT NULL,
+    username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    type     TEXT NOT NULL,
+    amount   REAL NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    note     TEXT NOT NULL DEFAULT '',
+    date     TEXT NOT NULL DEFAULT '',
+    extra    TEXT NOT NULL DEFAULT '{{}}',
+    UNIQUE (username, id)
+)"""
+GOALS_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id            TEXT NOT NULL,
+    username      TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    position      INTEGER NOT NULL,
+    name          TEXT NOT NULL,
+    target_amount TEXT NOT NULL,
+    saved_amount  TEXT NOT NULL,
+    deadline      TEXT NOT NULL DEFAULT '',
+    created_at    TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (username, id)
+)"""
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions(username, date)",
+    "DROP INDEX IF EXISTS idx_transactions_user_category",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_category_key ON transactions(username, lower(trim(category)))",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_amount ON transactions(username, amount)",
+    "CREATE INDEX IF NOT EXISTS idx_savings_goals_user ON savings_goals(username, position)",
+]
+SCHEMA = ";\n".join([
+    """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    pin      TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    extra    TEXT NOT NULL DEFAULT '{}'
+)""",
+    TRANSACTIONS_TABLE.format(name="transactions"),
+    """
+CREATE TABLE IF NOT EXISTS monthly_budgets (
+    username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    month    TEXT NOT NULL,
+    amount   TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (username, month)
+)""",
+    GOALS_TABLE.format(name="savings_goals"),
+] + INDEXES) + ";"
+
+# PRAGMA user_version: 1 = amounts are integer minor units of the user's currency,
+# 2 = transaction and goal ids unique per user
+SCHEMA_VERSION = 2
+
+TRANSACTION_FIELDS = ("id", "type", "amount", "category", "note", "date")
+GOAL_FIELDS = ("id", "name", "target_amount", "saved_amount", "deadline", "created_at")
+USER_FIELDS = ("username", "pin", "transactions", "monthly_budgets", "savings_goals")
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Local SQLite database (WAL mode) with one indexed table per list.
+
+    Users are loaded lazily on login; every save or change runs in a single
+    SQL transaction, and query_transactions pushes its filters, order and
+    paging into SQL.
+
+    Amounts are integer minor units (see money.Money); databases written
+    before that are converted in SQL when first opened.
+    """
+
+    # fsync policy -> PRAGMA synchronous (WAL: NORMAL syncs at checkpoints)
+    SYNCHRONOUS = {"always": "FULL", "group": "NORMAL", "interval": "NORMAL", "none": "OFF"}
+
+    partial_saves = True
+    query_pushdown = True
+
+    # sort field -> ORDER BY expression (ties keep ledger order)
+    ORDER_COLUMNS = {"date": "date", "amount": "amount", "category": "lower(trim(category))", "type": "type", "note": "note"}
+
+    def __init__(self, file_path, db_path=None, durability=None, locks=None, currency="USD"):
+        super().__init__(file_path, durability, locks)
+        self.db_path = db_path or os.path.splitext(file_path)[0] + ".db"
+        self.currency = currency  # of amounts saved before they were minor units
+        self.conn = sqlite3.connect(self.db_path, timeout=self.locks.timeout, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[self.durability.mode]}")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._upgrade()
+
+    def _upgrade(self):
+        # BEGIN IMMEDIATE first: another session opening the same database must not convert twice
+        with self.locked([]):
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                self._convert_amounts()
+            if version < 2:
+                self._rekey_by_user()
+            if version < SCHEMA_VERSION:
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _convert_amounts(self):
+        scale = 10 ** minor_digits(self.currency)
+        self.conn.execute(
+            "UPDATE transactions SET amount = ROUND(amount * ?) WHERE typeof(amount) IN ('real', 'integer')",
+            (scale,),
+        )
+        self.conn.execute("UPDATE monthly_budgets SET amount = CAST(ROUND(CAST(amount AS REAL) * ?) AS INTEGER)", (scale,))
+        self.conn.execute(
+            "UPDATE savings_goals SET target_amount = CAST(ROUND(CAST(target_amount AS REAL) * ?) AS INTEGER), "
+            "saved_amount = CAST(ROUND(CAST(saved_amount AS REAL) * ?) AS INTEGER)",
+            (scale, scale),
+        )
+        # running totals in users.extra were kept in the old units
+        self.conn.execute(
+            "UPDATE users SET extra = json_remove(json_set(extra, '$.currency', ?), '$.aggregates') "
+            "WHERE json_extract(extra, '$.currency') IS NULL",
+            (self.currency,),
+        )
+
+    def _rekey_by_user(self):
+        # SQLite cannot change a UNIQUE constraint in place: copy into a new table
+        for table, definition in (("transactions", TRANSACTIONS_TABLE), ("savings_goals", GOALS_TABLE)):
+            columns = ", ".join(r["name"] for r in self.conn.execute(f"PRAGMA table_info({table})"))
+            self.conn.execute(definition.format(name=f"{table}_new"))
+            self.conn.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+            self.conn.execute(f"DROP TABLE {table}")
+            self.conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        for statement in INDEXES:
+            self.conn.execute(statement)
+
+    # -------------------------------
+    # Loading
+    # -------------------------------
+    def load_users(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        if count == 0 and os.path.exists(self.file_path):
+            self.migrate()
+
+        rows = self.conn.execute("SELECT username, pin FROM users ORDER BY position").fetchall()
+        if rows:
+            print(" Data loaded successfully.")
+        else:
+            print("No saved data found ")
+        return [{"username": r["username"], "pin": r["pin"]} for r in rows]
+
+    def migrate(self):
+        """Import the single users.json into the database (the old file is kept as *.migrated)."""
+        users = self._read_legacy_file()
+        for user in users:
+            migrate_user(user, self.currency)
+        self.save_users(users)
+        os.replace(self.file_path, self.file_path + ".migrated")
+        print(f" Migrated {len(users)} user(s) to {self.db_path}")
+
+    def load_user(self, user):
+        if self.is_stub(user):
+            user.update(self.full_user(user))
+        return user
+
+    def full_user(self, user):
+        if not self.is_stub(user):
+            return user
+        username = user["username"]
+        row = self.conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        full = json.loads(row["extra"])
+        full.update({"username": row["username"], "pin": row["pin"]})
+        full["transactions"] = [
+            self._row_to_transaction(r)
+            for r in self.conn.execute("SELECT * FROM transactions WHERE username = ? ORDER BY seq", (username,))
+        ]
+        budgets = self.conn.execute(
+            "SELECT month, amount FROM monthly_budgets WHERE username = ? ORDER BY position", (username,)
+        ).fetchall()
+        if budgets:
+            full["monthly_budgets"] = [{"month": r["month"], "amount": _minor(r["amount"])} for r in budgets]
+        goals = self.conn.execute(
+            "SELECT * FROM savings_goals WHERE username = ? ORDER BY position", (username,)
+        ).fetchall()
+        if goals:
+            full["savings_goals"] = [
+                {f: _minor(r[f]) if f.endswith("_amount") else r[f] for f in GOAL_FIELDS} for r in goals
+            ]
+        return full
+
+    # -------------------------------
+    # Saving
+    # -------------------------------
+    def save_users(self, users, changed=None):
+        with self.conn:
+            for position, user in enumerate(users):
+                if self.is_stub(user):
+                    self.conn.execute(
+                        "UPDATE users SET position = ? WHERE username = ?", (position, user["username"])
+                    )
+                elif changed is None or user["username"] in changed:
+                    self._write_user(user, position)
+
+    def save_changes(self, users, records):
+        # one SQL transaction for the whole batch
+        changed = set()
+        with self.conn:
+            for record in records:
+                self._apply_change(users, record)
+                changed.add(record["user"])
+            # keep the running totals and the version stored in users.extra in step with the rows
+            for user in users:
+                if user["username"] in changed and not self.is_stub(user):
+                    self._write_user_row(user, None)
+
+    def _apply_change(self, users, record):
+        username = record["user"]
+        op = record["op"]
+        if op == "user":
+            position = next(i for i, u in enumerate(users) if u["username"] == username)
+            self._write_user(record["data"], position)
+        elif op == "add":
+            self._insert_transaction(username, record["data"])
+        elif op == "add_many":
+            self._insert_transactions(username, record["data"])
+        elif op == "edit":
+            self._update_transaction(username, record["id"], record["data"])
+        elif op == "delete":
+            self.conn.execute("DELETE FROM transactions WHERE username = ? AND id = ?", (username, record["id"]))
+        elif op == "set" and record["key"] == "monthly_budgets":
+            self._write_budgets(username, record["data"] or [])
+        elif op == "set" and record["key"] == "savings_goals":
+            self._write_goals(username, record["data"] or [])
+        elif op == "set_item" and record["key"] == "monthly_budgets":
+            self._put_budget(username, record["data"])
+        elif op == "set_item" and record["key"] == "savings_goals":
+            self._put_goal(username, record["data"])
+        elif op == "delete_item" and record["key"] == "monthly_budgets":
+            self.conn.execute("DELETE FROM monthly_budgets WHERE username = ? AND month = ?", (username, record["id"]))
+        elif op == "delete_item" and record["key"] == "savings_goals":
+            self.conn.execute("DELETE FROM savings_goals WHERE username = ? AND id = ?", (username, record["id"]))
+        elif op == "set":
+            user = next(u for u in users if u["username"] == username)
+            self._write_user_row(user, None)
+
+    def _write_user(self, user, position):
+        username = user["username"]
+        self._write_user_row(user, position)
+        self.conn.execute("DELETE FROM transactions WHERE username = ?", (username,))
+        self._insert_transactions(username, user.get("transactions", []))
+        self._write_budgets(username, user.get("monthly_budgets", []))
+        self._write_goals(username, user.get("savings_goals", []))
+
+    def _write_user_row(self, user, position):
+        extra = json.dumps({k: v for k, v in user.items() if k not in USER_FIELDS}, default=to_json)
+        if position is None:
+            self.conn.execute(
+                "UPDATE users SET pin = ?, extra = ? WHERE username = ?", (user["pin"], extra, user["username"])
+            )
+            return
+        self.conn.execute(
+            "INSERT INTO users (username, pin, position, extra) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET pin = excluded.pin, position = excluded.position, extra = excluded.extra",
+            (user["username"], user["pin"], position, extra),
+        )
+
+    INSERT_TRANSACTION = (
+        "INSERT OR REPLACE INTO transactions (id, username, type, amount, category, note, date, extra) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    def _insert_transaction(self, username, t):
+        self.conn.execute(self.INSERT_TRANSACTION, self._transaction_params(username, t))
+
+    def _insert_transactions(self, username, transactions):
+        self.conn.executemany(self.INSERT_TRANSACTION, (self._transaction_params(username, t) for t in transactions))
+
+    def _transaction_params(self, username, t):
+        extra = json.dumps({k: v for k, v in t.items() if k not in TRANSACTION_FIELDS})
+        return (t["id"], username, t["type"], t["amount"], t.get("category", ""), t.get("note", ""),
+                t.get("date", ""), extra)
+
+    def _update_transaction(self, username, transaction_id, changes):
+        columns = [f for f in TRANSACTION_FIELDS if f in changes and f != "id"]
+        if not columns:
+            return
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        self.conn.execute(
+            f"UPDATE transactions SET {assignments} WHERE username = ? AND id = ?",
+            [changes[c] for c in columns] + [username, transaction_id],
+        )
+
+    def _write_budgets(self, username, budgets):
+        self.conn.execute("DELETE FROM monthly_budgets WHERE username = ?", (username,))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO monthly_budgets (username, month, amount, position) VALUES (?, ?, ?, ?)",
+            [(username, b["month"], b["amount"], i) for i, b in enumerate(budgets)],
+        )
+
+    def _write_goals(self, username, goals):
+        self.conn.execute("DELETE FROM savings_goals WHERE username = ?", (username,))
+        self.conn.executemany(
+            "INSERT INTO savings_goals (id, username, position, name, target_amount, saved_amount, deadline, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (g["id"], username, i, g["name"], g["target_amount"], g.get("saved_amount", 0),
+                 g.get("deadline", ""), g.get("created_at", ""))
+                for i, g in enumerate(goals)
+            ],
+        )
+
+    # One element, added at the end or changed in place
+    def _put_budget(self, username, budget):
+        self.conn.execute(
+            "INSERT INTO monthly_budgets (username, month, amount, position) "
+            "VALUES (?, ?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM monthly_budgets WHERE username = ?)) "
+            "ON CONFLICT(username, month) DO UPDATE SET amount = excluded.amount",
+            (username, budget["month"], budget["amount"], username),
+        )
+
+    def _put_goal(self, username, g):
+        self.conn.execute(
+            "INSERT INTO savings_goals (id, username, position, name, target_amount, saved_amount, deadline, created_at) "
+            "VALUES (?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM savings_goals WHERE username = ?), ?, ?, ?, ?, ?) "
+            "ON CONFLICT(username, id) DO UPDATE SET name = excluded.name, target_amount = excluded.target_amount, "
+            "saved_amount = excluded.saved_amount, deadline = excluded.deadline, created_at = excluded.created_at",
+            (g["id"], username, username, g["name"], g["target_amount"], g.get("saved_amount", 0),
+             g.get("deadline", ""), g.get("created_at", "")),
+        )
+
+    # -------------------------------
+    # Several sessions at once
+    # -------------------------------
+    @contextmanager
+    def locked(self, usernames):
+        # SQLite locks the database itself: BEGIN IMMEDIATE takes the write lock
+        # up front, so stored versions cannot change before this session writes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            raise
+        if self.conn.in_transaction:
+            self.conn.commit()
+
+    def stored_users(self):
+        rows = self.conn.execute(
+            "SELECT username, pin, json_extract(extra, '$.version') AS version FROM users ORDER BY position"
+        )
+        return [{"username": r["username"], "pin": r["pin"], "version": r["version"] or 0} for r in rows]
+
+    # -------------------------------
+    # Queries (filters run in SQL on the indexes)
+    # -------------------------------
+    def query_transactions(self, user, **filters):
+        sql, params = self._select_transactions(user, **filters)
+        return [self._row_to_transaction(r) for r in self.conn.execute(sql, params)]
+
+    def iter_transactions(self, user, batch_size=5000, **filters):
+        # Own cursor, fetched in batches: memory stays flat for any ledger size
+        sql, params = self._select_transactions(user, **filters)
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for r in rows:
+                    yield self._row_to_transaction(r)
+        finally:
+            cursor.close()
+
+    def _select_transactions(self, user, start=None, end=None, categories=None, min_amount=None,
+                             max_amount=None, t_type=None, note=None, order=None, descending=False,
+                             limit=None, offset=0):
+        clauses = ["username = ?"]
+        params = [user["username"]]
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(end)
+        if categories is not None:
+            categories = [normalize_category(c) for c in categories]
+            clauses.append(f"lower(trim(category)) IN ({', '.join('?' for _ in categories)})")
+            params.extend(categories)
+        if min_amount is not None:
+            clauses.append("amount >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            clauses.append("amount <= ?")
+            params.append(max_amount)
+        if t_type is not None:
+            clauses.append("type = ?")
+            params.append(t_type)
+        if note is not None:
+            clauses.append("instr(lower(note), ?) > 0")
+            params.append(note.lower())
+
+        order_by = "seq"
+        if order is not None:
+            order_by = f"{self.ORDER_COLUMNS[order]}{' DESC' if descending else ''}, seq"
+        sql = f"SELECT * FROM transactions WHERE {' AND '.join(clauses)} ORDER BY {order_by}"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset])
+        return sql, params
+
+    def _row_to_transaction(self, row):
+        t = {f: row[f] for f in TRANSACTION_FIELDS}
+        t["amount"] = _minor(t["amount"])
+        t.update(json.loads(row["extra"]))
+        return t
+
+    def close(self):
+        self.conn.close()
+
+
+def _minor(value):
+    # Minor units come back as 1250.0 from REAL columns and as '1250' from TEXT ones
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is str and value.lstrip("-").isdigit():
+        return int(value)
+    return value
@@ -0,0 +1,359 @@
+import json
+import os
+
+from binary_snapshot_manager import BinarySnapshotManager
+from durability_manager import DurabilityManager
+from index_manager import normalize_category
+from journal_manager import JournalManager
+from lock_manager import LockManager
+from offset_index_manager import OffsetIndexManager
+from shard_manager import ShardManager
+from transaction_store import TransactionStore, to_json
+
+
+STORE_LOCK = "users"
+
+
+class StorageBackend:
+    """
+    Interface between DataManager and the place users are stored.
+
+    Users are plain dicts ({"username", "pin", "transactions", ...}).
+    Lazy backends may return stubs (no "transactions" key) from load_users
+    and fill them in load_user. Changes arrive either as full saves or as
+    single journal-style records (see JournalManager for the record format).
+
+    Backends with partial_saves also accept stubs in save_users for users
+    that did not change: those keep what is already stored. Backends with
+    query_pushdown run whole queries in query_transactions, ordering and
+    paging included (see QueryEngine).
+
+    Several sessions (processes) may share the store: writers hold
+    locked(usernames) while they read stored_users and save (see
+    DataManager._merge_users).
+    """
+
+    partial_saves = False
+    query_pushdown = False
+
+    def __init__(self, file_path, durability=None, locks=None):
+        self.file_path = file_path
+        self.durability = durability or DurabilityManager()
+        self.locks = locks or LockManager(os.path.join(os.path.dirname(file_path), "locks"))
+
+    # Load every user (or stubs). Returns [] when nothing is saved yet;
+    # raises when the saved data cannot be read (DataManager then recovers from a backup).
+    def load_users(self):
+        raise NotImplementedError
+
+    # Replace damaged saved data with users recovered from a backup
+    def recover(self, users):
+        self.save_users(users)
+
+    def is_stub(self, user):
+        return "transactions" not in user
+
+    # Fill a stub in place; no-op for backends that load everything up front
+    def load_user(self, user):
+        return user
+
+    # Full copy of a user without changing what is loaded in memory
+    def full_user(self, user):
+        return user
+
+    # changed: usernames modified since the last save (None = all)
+    def save_users(self, users, changed=None):
+        raise NotImplementedError
+
+    def save_change(self, users, record):
+        self.save_changes(users, [record])
+
+    # Several records at once (deferred saves): one write for all of them
+    def save_changes(self, users, records):
+        self.save_users(users, changed={r["user"] for r in records})
+
+    # -------------------------------
+    # Several sessions at once
+    # -------------------------------
+    # Lock held while the given users are read back and written
+    # (single-file backends: one lock for the whole store)
+    def locked(self, usernames):
+        return self.locks.locked([STORE_LOCK])
+
+    # Users as stored right now, in stored order: stubs carrying their "version",
+    # or full users for backends that load everything. Call while locked.
+    def stored_users(self):
+        raise NotImplementedError
+
+    def query_transactions(self, user, start=None, end=None, categories=None,
+                           min_amount=None, max_amount=None, t_type=None, note=None):
+        """
+        Transactions of a loaded user matching every given filter.
+        start/end are inclusive ISO dates, categories is a list compared
+        case-insensitively, amounts are minor units and note is a
+        case-insensitive substring. Backends with an index override this.
+        """
+        transactions = user.get("transactions", [])
+        if isinstance(transactions, TransactionStore):
+            return transactions.query(start=start, end=end, categories=categories, min_amount=min_amount,
+                                      max_amount=max_amount, t_type=t_type, note=note)
+
+        if categories is not None:
+            categories = {normalize_category(c) for c in categories}
+        if note is not None:
+            note = note.lower()
+        results = []
+        for t in transactions:
+            date = t.get("date", "")
+            if start is not None and date < start:
+                continue
+            if end is not None and date > end:
+                continue
+            if categories is not None and normalize_category(t.get("category", "")) not in categories:
+                continue
+            if min_amount is not None and t.get("amount", 0) < min_amount:
+                continue
+            if max_amount is not None and t.get("amount", 0) > max_amount:
+                continue
+            if t_type is not None and t.get("type") != t_type:
+                continue
+            if note is not None and note not in str(t.get("note", "")).lower():
+                continue
+            results.append(t)
+        return results
+
+    def iter_transactions(self, user, batch_size=5000, **filters):
+        """
+        Stream the matching transactions of any user (loaded or not) without
+        keeping them in memory; used by exports. See query_transactions for filters.
+        """
+        yield from self.query_transactions(self.full_user(user), **filters)
+
+    # Finish background work before exit
+    def close(self):
+        pass
+
+    # Used by backends that migrate from the single users.json file
+    def _read_legacy_file(self):
+        if not os.path.exists(self.file_path):
+            return None
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+class JsonBackend(StorageBackend):
+    """
+    users.json rewritten on every save, or snapshot + journal when journal=True.
+
+    lazy=True (not with the journal, whose compaction rewrites the snapshot
+    on its own) reads only the user directory from the offset index at
+    startup and parses a user's part of the file on login.
+    """
+
+    def __init__(self, file_path, journal=False, compact_every=500, on_compact=None, lazy=False,
+                 durability=None, locks=None):
+        super().__init__(file_path, durability, locks)
+        self.journal = None
+        self.offsets = None
+        if journal:
+            self.journal = JournalManager(
+                file_path, compact_every=compact_every, on_compact=on_compact, durability=self.durability,
+                lock=lambda: self.locks.locked([STORE_LOCK]),
+            )
+        elif lazy:
+            self.offsets = OffsetIndexManager(file_path, durability=self.durability)
+        # stubs are copied from the current snapshot
+        self.partial_saves = self.offsets is not None
+
+    def load_users(self):
+        if self.offsets is not None and os.path.exists(self.file_path):
+            # Stubs from the index; falls back to a full load if the file cannot be indexed
+            directory = self.offsets.load_directory()
+            if directory is not None:
+                print(" Data loaded successfully.")
+                return directory
+
+        data = []
+        if not os.path.exists(self.file_path):
+            print("No saved data found ")
+        else:
+            data = self._read_file()
+            print(" Data loaded successfully.")
+
+        # Journal mode: replay changes made since the last snapshot
+        if self.journal:
+            applied = self.journal.replay(data)
+            if applied:
+                print(f" Replayed {applied} journal record(s).")
+        return data
+
+    def _read_file(self):
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def stored_users(self):
+        users = []
+        if self.offsets is not None and os.path.exists(self.file_path):
+            directory = self.offsets.load_directory()
+            if directory is not None:
+                return directory
+        if os.path.exists(self.file_path):
+            users = self._read_file()
+        if self.journal:
+            self.journal.replay(users)
+        return users
+
+    def load_user(self, user):
+        if self.is_stub(user) and self.offsets is not None:
+            user.update(self.offsets.read_user(user["username"]))
+        return user
+
+    def full_user(self, user):
+        if self.is_stub(user) and self.offsets is not None:
+            return self.offsets.read_user(user["username"])
+        return user
+
+    def save_users(self, users, changed=None):
+        if self.journal:
+            self.journal.compact(users)
+        elif self.offsets is not None:
+            self.offsets.write_snapshot(users, self.is_stub)
+        else:
+            with self.durability.atomic_open(self.file_path) as f:
+                json.dump(users, f, indent=4, default=to_json)
+
+    def recover(self, users):
+        # keep the damaged file for inspection
+        if os.path.exists(self.file_path):
+            os.replace(self.file_path, self.file_path + ".corrupt")
+        if self.journal:
+            # changes journaled after the backup was taken still apply on top of it
+            self.journal.replay(users)
+        self.save_users(users)
+
+    def save_changes(self, users, records):
+        if self.journal:
+            self.journal.append_many(records)
+        else:
+            self.save_users(users, changed={r["user"] for r in records})
+
+    def close(self):
+        if self.journal:
+            self.journal.wait()
+
+
+class ShardedBackend(StorageBackend):
+    """One file per user plus an index; only changed users are rewritten."""
+
+    partial_saves = True
+
+    def __init__(self, file_path, durability=None, locks=None):
+        super().__init__(file_path, durability, locks)
+        self.shards = ShardManager(os.path.join(os.path.dirname(file_path), "users"), durability=self.durability)
+
+    def load_users(self):
+        if not self.shards.exists() and os.path.exists(self.file_path):
+            self.migrate()
+
+        index = self.shards.load_index()
+        if index:
+            print(" Data loaded successfully.")
+        else:
+            print("No saved data found ")
+        # Stubs: no "transactions" key until the user is loaded
+        return [{"username": name, "pin": entry["pin"]} for name, entry in index.items()]
+
+    def migrate(self):
+        """Split the single users.json into per-user shards (the old file is kept as *.migrated)."""
+        users = self._read_legacy_file()
+        self.shards.migrate(users)
+        os.replace(self.file_path, self.file_path + ".migrated")
+        print(f" Migrated {len(users)} user(s) to per-user files in {self.shards.shard_dir}")
+
+    def load_user(self, user):
+        if self.is_stub(user):
+            user.update(self.shards.load_user(user["username"]))
+        return user
+
+    def full_user(self, user):
+        if self.is_stub(user):
+            return self.shards.load_user(user["username"])
+        return user
+
+    def save_users(self, users, changed=None):
+        written = []
+        for user in users:
+            if self.is_stub(user):
+                continue  # never loaded, so never changed
+            if changed is None or user["username"] in changed:
+                self.shards.save_user(user)
+                written.append(user)
+        # The index is shared by every session: update only the written entries
+        if written:
+            with self.locks.locked(["index"]):
+                self.shards.update_index(written)
+
+    # One lock per user: sessions saving different users never wait for each other
+    def locked(self, usernames):
+        return self.locks.locked([self.shards.lock_name(name) for name in usernames])
+
+    def stored_users(self):
+        index = self.shards.load_index()
+        return [
+            {"username": name, "pin": entry["pin"], "version": entry.get("version", 0)}
+            for name, entry in index.items()
+        ]
+
+
+class BinaryBackend(StorageBackend):
+    """Compact binary snapshot (see BinarySnapshotManager); users are decoded on login."""
+
+    partial_saves = True
+
+    def __init__(self, file_path, binary_path=None, durability=None, locks=None):
+        super().__init__(file_path, durability, locks)
+        self.snapshot = BinarySnapshotManager(
+            binary_path or os.path.splitext(file_path)[0] + ".bin", durability=self.durability
+        )
+
+    def load_users(self):
+        if not self.snapshot.exists() and os.path.exists(self.file_path):
+            self.migrate()
+        if not self.snapshot.exists():
+            print("No saved data found ")
+            return []
+        users = self.snapshot.load_directory()
+        print(" Data loaded successfully.")
+        return users
+
+    def migrate(self):
+        """Convert the single users.json into the binary snapshot (the old file is kept as *.migrated)."""
+        users = self._read_legacy_file()
+        self.snapshot.write_snapshot(users)
+        os.replace(self.file_path, self.file_path + ".migrated")
+        print(f" Migrated {len(users)} user(s) to {self.snapshot.path}")
+
+    def load_user(self, user):
+        if self.is_stub(user):
+            user.update(self.snapshot.read_user(user["username"]))
+        return user
+
+    def full_user(self, user):
+        if self.is_stub(user):
+            return self.snapshot.read_user(user["username"])
+        return user
+
+    def save_users(self, users, changed=None):
+        self.snapshot.write_snapshot(users, self.is_stub)
+
+    def stored_users(self):
+        return self.snapshot.load_directory() if self.snapshot.exists() else []
+
+    def recover(self, users):
+        self.snapshot.close()
+        if self.snapshot.exists():
+            os.replace(self.snapshot.path, self.snapshot.path + ".corrupt")
+        self.snapshot.write_snapshot(users)
+
+    def close(self):
+        self.snapshot.close()
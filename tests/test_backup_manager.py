@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup_manager import BackupManager  # noqa: E402
+from durability_manager import DurabilityManager  # noqa: E402
+from lock_manager import LockManager  # noqa: E402
+
+
+def _user(name, count, amount=100):
+    return {
+        "username": name,
+        "pin": "1234",
+        "transactions": [{"id": f"T{i}", "type": "expense", "amount": amount, "category": "Food", "note": "",
+                          "date": "2025-01-01"} for i in range(count)],
+    }
+
+
+class BackupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.backup_dir = os.path.join(self.directory, "backup")
+        self.locks = LockManager(os.path.join(self.directory, "locks"), timeout=2.0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _manager(self, **options):
+        return BackupManager(self.backup_dir, durability=DurabilityManager("none"),
+                             lock=lambda: self.locks.locked(["backups"]), **options)
+
+    def _objects(self, manager):
+        return {name for prefix in os.listdir(manager.objects_dir)
+                for name in os.listdir(os.path.join(manager.objects_dir, prefix))}
+
+
+class GarbageCollectionTest(BackupTestCase):
+    def _age(self, manager, seconds):
+        past = time.time() - seconds
+        for prefix in os.listdir(manager.objects_dir):
+            folder = os.path.join(manager.objects_dir, prefix)
+            for name in os.listdir(folder):
+                os.utime(os.path.join(folder, name), (past, past))
+
+    def test_unreferenced_objects_are_kept_for_the_grace_period(self):
+        manager = self._manager(keep_last=1, keep_days=0, gc_grace=3600)
+        manager.create_backup([_user("alice", 3, amount=100)])
+        old = self._objects(manager)
+        manager.create_backup([_user("alice", 3, amount=200)])
+        self.assertTrue(old <= self._objects(manager))
+
+        self._age(manager, 7200)
+        manager.create_backup([_user("alice", 3, amount=300)])
+        entry = manager._read_manifest(manager.list_backups()[-1])["users"]["alice"]
+        self.assertEqual(self._objects(manager), {entry["header"], *entry["chunks"]})
+
+    def test_reused_object_survives_a_concurrent_prune(self):
+        # Session A finds the object already stored; session B prunes before A's manifest exists
+        a = self._manager(keep_last=1, keep_days=0, gc_grace=3600)
+        b = self._manager(keep_last=1, keep_days=0, gc_grace=3600)
+        a.create_backup([_user("alice", 3, amount=100)])
+        b.create_backup([_user("alice", 3, amount=200)])
+        self._age(a, 7200)
+        header = a._store_object({"username": "alice", "pin": "1234"})
+        b.create_backup([_user("alice", 3, amount=300)])
+        self.assertIn(header, self._objects(a))
+
+    def test_prune_waits_for_a_backup_being_written(self):
+        a = self._manager(keep_last=1, keep_days=0, gc_grace=0)
+        b = self._manager(keep_last=1, keep_days=0, gc_grace=0)
+        a.create_backup([_user("alice", 3, amount=100)])
+        writing, finish = threading.Event(), threading.Event()
+
+        def slow_user(user):
+            writing.set()
+            finish.wait(5)
+            return user
+        thread = threading.Thread(target=a.create_backup, args=([_user("alice", 3, amount=100)],),
+                                  kwargs={"resolve_user": slow_user})
+        thread.start()
+        self.assertTrue(writing.wait(5))
+        pruning = threading.Thread(target=b.create_backup, args=([_user("alice", 3, amount=200)],))
+        pruning.start()
+        time.sleep(0.1)
+        finish.set()
+        thread.join()
+        pruning.join()
+        self.assertIsNotNone(a.restore(a.list_backups()[-1]))
+
+
+class ChunkingTest(BackupTestCase):
+    def _chunks(self, manager):
+        return manager._read_manifest(manager._manifest_ids()[-1])["users"]["alice"]["chunks"]
+
+    def test_inserting_early_only_changes_the_local_chunk(self):
+        manager = self._manager(chunk_size=16)
+        user = _user("alice", 2000)
+        manager.create_backup([user])
+        before = self._chunks(manager)
+        self.assertGreater(len(before), 50)
+
+        user["transactions"].insert(10, dict(user["transactions"][0], id="NEW"))
+        del user["transactions"][500]
+        manager.create_backup([user])
+        after = self._chunks(manager)
+        self.assertLessEqual(len(set(after) - set(before)), 2)
+        self.assertEqual(manager.restore()[0]["transactions"], user["transactions"])
+
+    def test_chunks_are_bounded(self):
+        manager = self._manager(chunk_size=1000)
+        manager.create_backup([_user("alice", 5000)])
+        for digest in self._chunks(manager):
+            self.assertLessEqual(len(manager._load_object(digest)), 1000 * BackupManager.MAX_CHUNK_FACTOR)
+
+
+class LegacyBackupTest(BackupTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(self.backup_dir)
+        self.legacy = [_user("alice", 2)]
+        with open(os.path.join(self.backup_dir, "backup_20250101_120000.json"), "w", encoding="utf-8") as f:
+            json.dump(self.legacy, f)
+
+    def test_full_copies_are_listed_and_restored(self):
+        manager = self._manager()
+        manager.create_backup([_user("alice", 5)])
+        backups = manager.list_backups()
+        self.assertEqual(backups[0], "backup_20250101_120000")
+        self.assertEqual(manager.restore("backup_20250101_120000"), self.legacy)
+        self.assertEqual(manager.restore(datetime(2025, 6, 1)), self.legacy)
+        self.assertEqual(len(manager.restore()[0]["transactions"]), 5)
+
+    def test_retention_keeps_full_copies(self):
+        manager = self._manager(keep_last=1, keep_days=0)
+        manager.create_backup([_user("alice", 5)])
+        manager.create_backup([_user("alice", 6)])
+        self.assertEqual(len(manager.list_backups()), 2)
+        self.assertEqual(manager.restore_latest_valid()[0], manager.list_backups()[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from binary_snapshot_manager import BinarySnapshotManager, decode_user, encode_user  # noqa: E402
+from durability_manager import DurabilityManager  # noqa: E402
+from transaction_store import TransactionStore  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _plain(n, amount, **fields):
+    t = {"id": str(uuid.UUID(int=n)), "type": "expense", "amount": amount, "category": "Food", "note": "lunch",
+         "date": "2025-01-15"}
+    t.update(fields)
+    return t
+
+
+def _users():
+    return [
+        {
+            "username": "alice",
+            "pin": "1234",
+            "currency": "USD",
+            "transactions": [
+                _plain(1, 1250),
+                _plain(2, 99, type="income", category="Salary", note=""),
+                _plain(3, 10, note="café ☕", category="Épicerie"),
+                dict(_plain(4, 5), id="bank-42"),  # odd rows from here on
+                _plain(5, 12.5),
+                _plain(6, 2 ** 70),
+                _plain(7, 7, date="2025-13-01"),
+                _plain(8, 7, date=None),
+                _plain(9, 7, type="transfer"),
+                dict(_plain(10, 7), memo="extra key"),
+                {"note": "fields in another order", **_plain(11, 7)},
+                {"id": str(uuid.UUID(int=12)), "type": "income", "amount": 3, "date": "2025-02-01"},
+            ],
+            "monthly_budgets": [{"month": "2025-01", "amount": 30000}],
+            "savings_goals": [{"id": "G1", "name": "Car", "target_amount": 100000, "saved_amount": 10}],
+            "version": 3,
+        },
+        {
+            # saved before amounts were minor units: float amounts
+            "username": "bob",
+            "pin": "0000",
+            "transactions": [_plain(20, 12.5), _plain(21, 0.1 + 0.2), _plain(22, 3), _plain(23, -4.25)],
+        },
+        {"username": "carol", "pin": "1111", "currency": "JPY", "transactions": []},
+        {"username": "dave", "pin": "2222"},  # no transactions key at all
+    ]
+
+
+class BlockTest(unittest.TestCase):
+    def test_users_round_trip(self):
+        for user in _users():
+            with self.subTest(user=user["username"]):
+                decoded = decode_user(encode_user(user))
+                self.assertEqual(decoded, user)
+                self.assertEqual(list(decoded), list(user))  # key order kept
+                for t, original in zip(decoded.get("transactions", []), user.get("transactions", [])):
+                    self.assertEqual(list(t), list(original))
+                    self.assertIs(type(t["amount"]), type(original["amount"]))
+
+    def test_columnar_transactions_are_written_as_rows(self):
+        user = _users()[0]
+        columnar = dict(user, transactions=TransactionStore(user["transactions"]))
+        self.assertEqual(decode_user(encode_user(columnar)), user)
+
+    def test_every_row_odd(self):
+        user = {"username": "eve", "pin": "1", "currency": "USD", "transactions": [_plain(1, 1.5), _plain(2, 2.5)]}
+        self.assertEqual(decode_user(encode_user(user)), user)
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "users.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _snapshot(self):
+        return BinarySnapshotManager(self.path, durability=DurabilityManager("none"))
+
+    def test_directory_and_lazy_users(self):
+        snapshot = self._snapshot()
+        snapshot.write_snapshot(_users())
+        snapshot.close()
+
+        snapshot = self._snapshot()
+        stubs = snapshot.load_directory()
+        self.assertEqual([(s["username"], s["pin"], s["version"]) for s in stubs],
+                         [("alice", "1234", 3), ("bob", "0000", 0), ("carol", "1111", 0), ("dave", "2222", 0)])
+        self.assertEqual(snapshot.read_user("bob"), _users()[1])
+        self.assertEqual(snapshot.read_all(), _users())
+        snapshot.close()
+
+    def test_stubs_are_copied_on_save(self):
+        snapshot = self._snapshot()
+        snapshot.write_snapshot(_users())
+        stubs = snapshot.load_directory()
+        carol = snapshot.read_user("carol")
+        carol["transactions"].append(_plain(30, 500))
+        users = [stubs[0], stubs[1], carol, stubs[3]]
+        snapshot.write_snapshot(users, is_stub=lambda u: "transactions" not in u and u["username"] != "dave")
+
+        expected = _users()
+        expected[2] = carol
+        expected[3] = stubs[3]  # saved as given
+        self.assertEqual(snapshot.read_all(), expected)
+        snapshot.close()
+
+    def test_empty_snapshot(self):
+        snapshot = self._snapshot()
+        snapshot.write_snapshot([])
+        self.assertEqual(snapshot.read_all(), [])
+        snapshot.close()
+
+
+class ConverterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _convert(self, command, source, target):
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "binary_snapshot_manager.py"), command,
+                                 source, target], capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_to_binary_and_back(self):
+        source = os.path.join(self.directory, "users.json")
+        binary = os.path.join(self.directory, "users.bin")
+        target = os.path.join(self.directory, "again.json")
+        with open(source, "w", encoding="utf-8") as f:
+            json.dump(_users(), f, indent=4)
+
+        self._convert("to-binary", source, binary)
+        self._convert("to-json", binary, target)
+        with open(target, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), _users())
+
+        # and once more: converting the result again changes nothing
+        self._convert("to-binary", target, binary)
+        with open(binary, "rb") as f:
+            first = f.read()
+        self._convert("to-json", binary, target)
+        self._convert("to-binary", target, binary)
+        with open(binary, "rb") as f:
+            self.assertEqual(f.read(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
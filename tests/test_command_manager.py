@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CommandTestCase(unittest.TestCase):
+    """Runs `python main.py COMMAND ...` in a fresh data directory."""
+
+    storage_mode = "json"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.env = dict(os.environ, FIN_STORAGE_MODE=self.storage_mode, FIN_PIN="1234")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def command(self, *argv):
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), *argv], cwd=self.directory,
+                                env=self.env, capture_output=True, text=True, timeout=60)
+        return [json.loads(line) for line in result.stdout.splitlines()][-1]
+
+
+class DuplicateIdTest(CommandTestCase):
+    def _add(self, amount):
+        return self.command("add", "--user", "alice", "--type", "expense", "--amount", amount, "--id", "X")
+
+    def test_add_rejects_an_existing_id(self):
+        for mode in ("json", "journal", "sqlite"):
+            with self.subTest(mode=mode):
+                self.env["FIN_STORAGE_MODE"] = mode
+                self.env["FIN_SQLITE_PATH"] = os.path.join(self.directory, f"{mode}.db")
+                shutil.rmtree(os.path.join(self.directory, "data"), ignore_errors=True)
+                self.assertTrue(self.command("register", "--user", "alice")["ok"])
+
+                self.assertTrue(self._add("10")["ok"])
+                second = self._add("20")
+                self.assertFalse(second["ok"])
+                self.assertIn("already exists", second["error"])
+
+                listed = self.command("list", "--user", "alice")["result"]
+                self.assertEqual([(t["id"], t["amount"]) for t in listed["transactions"]], [("X", "10.00")])
+
+
+class ImportDuplicatesTest(CommandTestCase):
+    QIF = "!Type:Bank\nD01/15/2025\nT-4.50\nPCoffee Shop\n^\nD01/15/2025\nT-4.50\nPCoffee Shop\n^\n"
+
+    def _import(self, text):
+        path = os.path.join(self.directory, "statement.qif")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        result = self.command("import", "--user", "alice", path)["result"]
+        return result["read"], result["imported"], result["duplicates"]
+
+    def test_identical_rows_of_one_file_are_all_imported(self):
+        self.command("register", "--user", "alice")
+        self.assertEqual(self._import(self.QIF), (2, 2, 0))
+
+    def test_reimport_skips_only_rows_already_in_the_ledger(self):
+        self.command("register", "--user", "alice")
+        self._import(self.QIF)
+        self.assertEqual(self._import(self.QIF), (2, 0, 2))
+        third = "D01/15/2025\nT-4.50\nPCoffee Shop\n^\n"
+        self.assertEqual(self._import(self.QIF + third), (3, 1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
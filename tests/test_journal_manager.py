@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stderr
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from durability_manager import DurabilityManager  # noqa: E402
+from journal_manager import JournalManager  # noqa: E402
+from lock_manager import LockManager  # noqa: E402
+
+
+def _add(name, tid):
+    return {"op": "add", "user": name, "id": tid,
+            "data": {"id": tid, "type": "expense", "amount": 100, "category": "Food", "note": "",
+                     "date": "2025-01-01"}}
+
+
+class BackgroundCompactionTest(unittest.TestCase):
+    """The background compaction is paused half-way, after reading the snapshot."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.directory, "users.json")
+        with open(self.snapshot, "w", encoding="utf-8") as f:
+            json.dump([{"username": "alice", "pin": "1234", "transactions": []}], f)
+        self.locks = LockManager(os.path.join(self.directory, "locks"), timeout=2.0)
+        self.journal = JournalManager(self.snapshot, compact_every=2, durability=DurabilityManager("none"),
+                                      lock=lambda: self.locks.locked(["users"]))
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+        load_snapshot = self.journal._load_snapshot
+
+        def paused_load():
+            users = load_snapshot()
+            self.paused.set()
+            self.resume.wait(5)
+            return users
+        self.journal._load_snapshot = paused_load
+
+    def tearDown(self):
+        self.resume.set()
+        self.journal.wait()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _append(self, *records):
+        with self.locks.locked(["users"]):
+            self.journal.append_many(list(records))
+
+    def _stored(self):
+        with open(self.snapshot, "r", encoding="utf-8") as f:
+            users = json.load(f)
+        self.journal.replay(users)
+        return [t["id"] for t in users[0]["transactions"]]
+
+    def test_appends_do_not_wait_for_the_compaction(self):
+        self._append(_add("alice", "T1"), _add("alice", "T2"))
+        self.assertTrue(self.paused.wait(5))
+        self._append(_add("alice", "T3"))  # would time out if the store lock were held
+        self.resume.set()
+        self.journal.wait()
+        self.assertFalse(os.path.exists(self.journal.pending_path))
+        self.assertEqual(self._stored(), ["T1", "T2", "T3"])
+
+    def test_full_rewrite_wins_over_the_compaction(self):
+        self._append(_add("alice", "T1"), _add("alice", "T2"))
+        self.assertTrue(self.paused.wait(5))
+        with self.locks.locked(["users"]):
+            self.journal.compact([{"username": "alice", "pin": "1234", "transactions": [_add("alice", "T9")["data"]]}])
+        self.resume.set()
+        self.journal.wait()
+        self.assertEqual(self._stored(), ["T9"])
+        self.assertFalse(os.path.exists(self.journal.staging_path))
+
+
+class TornLineTest(unittest.TestCase):
+    """A session crashed half-way through appending a record."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.directory, "users.json")
+        with open(self.snapshot, "w", encoding="utf-8") as f:
+            json.dump([{"username": "alice", "pin": "1234", "transactions": []}], f)
+        self.journal = JournalManager(self.snapshot, durability=DurabilityManager("none"))
+        self.journal.append(_add("alice", "T1"))
+        with open(self.journal.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(_add("alice", "TORN"))[:30])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _replay(self):
+        with open(self.snapshot, "r", encoding="utf-8") as f:
+            users = json.load(f)
+        errors = StringIO()
+        with redirect_stderr(errors):
+            self.journal.replay(users)
+        return [t["id"] for t in users[0]["transactions"]], errors.getvalue()
+
+    def test_later_appends_are_replayed(self):
+        self.journal.append(_add("alice", "T2"))
+        self.journal.append(_add("alice", "T3"))
+        ids, errors = self._replay()
+        self.assertEqual(ids, ["T1", "T2", "T3"])
+        self.assertIn("Skipping damaged journal line 2", errors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ADD_EXPENSE = "1\nalice\n1234\n2\nalice\n1234\n6\n1\nexpense\n12.50\nFood\nlunch\n2025-01-15\n"
+
+
+class MenuExitTest(unittest.TestCase):
+    """Deferred and queued saves are written however the menu ends."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _run(self, stdin):
+        env = dict(os.environ, FIN_SAVE_DELAY_MS="60000", FIN_BACKGROUND_WRITES="1", FIN_STORAGE_MODE="json")
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], input=stdin, cwd=self.directory, env=env,
+                       capture_output=True, text=True, timeout=60)
+        with open(os.path.join(self.directory, "data", "users.json"), "r", encoding="utf-8") as f:
+            users = json.load(f)
+        return [t["amount"] for u in users for t in u["transactions"]]
+
+    def test_end_of_input_saves_pending_changes(self):
+        self.assertEqual(self._run(ADD_EXPENSE), [1250])
+
+    def test_exit_option_saves_pending_changes(self):
+        self.assertEqual(self._run(ADD_EXPENSE + "0\n0\n"), [1250])
+
+
+class EditMenuTest(unittest.TestCase):
+    """The edit flow reports what it changed."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _edit(self, fields):
+        env = dict(os.environ, FIN_SAVE_DELAY_MS="0", FIN_STORAGE_MODE="json")
+        stdin = ADD_EXPENSE + "3\n1\n" + "\n".join(fields) + "\n"
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], input=stdin, cwd=self.directory,
+                                env=env, capture_output=True, text=True, timeout=60)
+        return result.stdout.split("--- Edit Transaction ---")[1]
+
+    def test_nothing_changed(self):
+        for fields in (["", "", "", "", ""], ["expense", "12.5", "Food", "lunch", ""], ["", "abc", "", "", ""]):
+            with self.subTest(fields=fields):
+                output = self._edit(fields)
+                self.assertIn("No changes made.", output)
+                self.assertNotIn("updated successfully", output)
+
+    def test_changes_are_shown(self):
+        output = self._edit(["", "20", "", "dinner", "bad date"])
+        self.assertIn("Keeping old value.", output)
+        self.assertIn("Transaction updated successfully!", output)
+        self.assertIn("[EXPENSE] 20.00 | Food | 2025-01-15 | dinner", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from durability_manager import DurabilityManager  # noqa: E402
+from journal_manager import JournalManager  # noqa: E402
+from money import Money, format_amount, migrate_user, minor_units  # noqa: E402
+
+
+class ParseTest(unittest.TestCase):
+    def test_text_and_old_float_amounts(self):
+        cases = [
+            ("12.5", "USD", 1250),
+            ("1,200", "USD", 120000),
+            (" 7.1 ", "USD", 710),
+            ("-12", "USD", -1200),
+            (12.5, "USD", 1250),
+            (0.1 + 0.2, "USD", 30),
+            ("1,200", "JPY", 1200),
+            ("1200.4", "JPY", 1200),
+            ("1.2345", "KWD", 1235),
+            ("3", "KWD", 3000),
+            ("9.99", "XYZ", 999),  # unknown codes have 2 digits
+        ]
+        for value, currency, minor in cases:
+            with self.subTest(value=value, currency=currency):
+                self.assertEqual(Money.parse(value, currency), Money(minor, currency))
+
+    def test_rounding_is_half_up_away_from_zero(self):
+        self.assertEqual(Money.parse("0.005", "USD").minor, 1)
+        self.assertEqual(Money.parse("0.0049", "USD").minor, 0)
+        self.assertEqual(Money.parse("-0.005", "USD").minor, -1)
+        self.assertEqual(Money.parse(2.675, "USD").minor, 268)  # the float's text, not its binary value
+        self.assertEqual(Money.parse("0.5", "JPY").minor, 1)
+
+    def test_invalid_amounts(self):
+        for value in ("", "abc", "1.2.3", None, "inf", "NaN", "1e"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    Money.parse(value, "USD")
+
+    def test_display(self):
+        self.assertEqual(str(Money(120000, "USD")), "1200.00")
+        self.assertEqual(str(Money(1200, "JPY")), "1200")
+        self.assertEqual(str(Money(1235, "KWD")), "1.235")
+        self.assertEqual(f"{Money(5, 'USD'):.2f}", "0.05")
+        self.assertEqual(format_amount("n/a", "USD"), "n/a")
+
+
+class ArithmeticTest(unittest.TestCase):
+    def test_exact_sums_and_scaling(self):
+        total = Money.zero("USD")
+        for _ in range(10):
+            total = total + Money.parse("0.1", "USD")
+        self.assertEqual(total, Money(100, "USD"))
+        self.assertEqual(Money(1000, "USD") * Decimal("0.333"), Money(333, "USD"))
+        self.assertEqual(Money(250, "USD") / Money(1000, "USD"), Decimal("0.25"))
+
+    def test_currencies_do_not_mix(self):
+        with self.assertRaises(ValueError):
+            Money(1, "USD") + Money(1, "EUR")
+        with self.assertRaises(ValueError):
+            Money(1, "USD") < Money(1, "JPY")
+
+
+def _old_user():
+    # As saved before amounts were minor units
+    return {
+        "username": "alice",
+        "pin": "1234",
+        "transactions": [
+            {"id": "T1", "type": "expense", "amount": 12.5, "category": "Food", "note": "", "date": "2025-01-01"},
+            {"id": "T2", "type": "income", "amount": "1,200", "category": "Salary", "note": "", "date": "2025-01-02"},
+            {"id": "T3", "type": "expense", "amount": "oops", "category": "Food", "note": "", "date": "2025-01-03"},
+        ],
+        "monthly_budgets": [{"month": "2025-01", "amount": 300.0}],
+        "savings_goals": [{"id": "G1", "name": "Car", "target_amount": "1000", "saved_amount": 0.1}],
+        "aggregates": {"stale": True},
+    }
+
+
+class MigrateTest(unittest.TestCase):
+    def test_user_is_converted_once(self):
+        user = _old_user()
+        self.assertTrue(migrate_user(user, "USD"))
+        self.assertEqual([t["amount"] for t in user["transactions"]], [1250, 120000, "oops"])
+        self.assertEqual(user["monthly_budgets"][0]["amount"], 30000)
+        self.assertEqual((user["savings_goals"][0]["target_amount"], user["savings_goals"][0]["saved_amount"]),
+                         (100000, 10))
+        self.assertEqual(user["currency"], "USD")
+        self.assertNotIn("aggregates", user)
+
+        self.assertFalse(migrate_user(user, "EUR"))
+        self.assertEqual(user["transactions"][0]["amount"], 1250)
+        self.assertEqual(user["currency"], "USD")
+
+    def test_minor_units_keep_ints(self):
+        self.assertEqual(minor_units(1250, "USD"), 1250)
+        self.assertEqual(minor_units(12.5, "USD"), 1250)
+
+    def test_journal_round_trip(self):
+        directory = tempfile.mkdtemp()
+        try:
+            snapshot = os.path.join(directory, "users.json")
+            with open(snapshot, "w", encoding="utf-8") as f:
+                json.dump([_old_user()], f)
+            journal = JournalManager(snapshot, durability=DurabilityManager("none"))
+            journal.append({"op": "migrate", "user": "alice", "data": "JPY"})
+            journal.append({"op": "add", "user": "alice", "id": "T4",
+                            "data": {"id": "T4", "type": "expense", "amount": 500, "category": "Food",
+                                     "note": "", "date": "2025-01-04"}})
+            # a second session converting again (to another currency) changes nothing
+            journal.append({"op": "migrate", "user": "alice", "data": "USD"})
+
+            def replayed():
+                with open(snapshot, "r", encoding="utf-8") as f:
+                    users = json.load(f)
+                journal.replay(users)
+                return users[0]
+
+            user = replayed()
+            self.assertEqual(user["currency"], "JPY")
+            self.assertEqual([t["amount"] for t in user["transactions"]], [13, 1200, "oops", 500])
+            self.assertEqual(user["monthly_budgets"][0]["amount"], 300)
+
+            journal.compact([user])
+            self.assertEqual(replayed(), user)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
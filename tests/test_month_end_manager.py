@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# An earlier session saved every user; this one changes half of them, with the
+# changes still waiting in the deferred saves and the writer queue when the job
+# starts. The rest stay stubs (in the modes that load on login), read by the workers.
+MONTH_END = textwrap.dedent("""
+    import json, sys, time
+    sys.path.insert(0, {root!r})
+    import ledger_service
+    from month_end_manager import MonthEndManager
+    from user_manager import UserManager
+
+    def add(session, user, count):
+        session.set_current_user(user)
+        for i in range(count):
+            t_type = "income" if i % 3 == 0 else "expense"
+            ledger_service.add_transaction(session, t_type, f"{{i + 1}}.25", "Food", "", f"2025-0{{i % 3 + 1}}-10")
+
+    first = UserManager()
+    for n in range(6):
+        add(first, first.create_user(f"user{{n}}", "1234"), n * 4)
+    first.close()
+
+    session = UserManager()
+    # a slow disk: the queued write is still running when the job starts
+    write_changes = session.data_manager._write_changes
+    def slow_write_changes(*args):
+        time.sleep(0.2)
+        return write_changes(*args)
+    session.data_manager._write_changes = slow_write_changes
+    for user in list(session.users)[::2]:
+        add(session, user, 3)
+
+    stats = MonthEndManager(session).run("2025-02", workers=2, path="month_end.json")
+    with open("month_end.json", "r", encoding="utf-8") as f:
+        results = json.load(f)["users"]
+
+    expected = []
+    for user in list(session.users):
+        user = session.set_current_user(user)
+        expected.append({{
+            "username": user["username"],
+            "dashboard": ledger_service.totals(user).to_json(),
+            "month": ledger_service.totals(user, "2025-02").to_json(),
+        }})
+    session.close()
+    print(json.dumps({{
+        "transactions": stats["transactions"],
+        "results": [{{k: r[k] for k in ("username", "dashboard", "month")}} for r in results],
+        "expected": expected,
+    }}))
+""")
+
+
+class MonthEndTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_totals_match_the_ledger(self):
+        for mode in ("json", "journal", "sharded", "sqlite", "binary"):
+            with self.subTest(mode=mode):
+                shutil.rmtree(os.path.join(self.directory, "data"), ignore_errors=True)
+                env = dict(os.environ, FIN_STORAGE_MODE=mode, FIN_SAVE_DELAY_MS="60000", FIN_BACKGROUND_WRITES="1",
+                           FIN_SQLITE_PATH=os.path.join(self.directory, f"{mode}.db"))
+                result = subprocess.run([sys.executable, "-c", MONTH_END.format(root=ROOT)], cwd=self.directory,
+                                        env=env, capture_output=True, text=True, timeout=120)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                state = json.loads(result.stdout.splitlines()[-1])
+                self.assertEqual(state["results"], state["expected"])
+                self.assertEqual(state["transactions"], sum(range(0, 24, 4)) + 3 * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager  # noqa: E402
+from index_manager import IndexManager  # noqa: E402
+from query_engine import Query, QueryEngine  # noqa: E402
+from transaction_store import TransactionStore  # noqa: E402
+
+CATEGORIES = ["Food", "food ", "Rent", "Travel", "Salary", "Misc"]
+NOTES = ["lunch with bob", "Dinner", "rent", "", "LUNCH", "taxi home"]
+
+
+def _transactions(count=600, seed=7):
+    # Unique dates and amounts, so orders by them have no ties to break differently
+    rnd = random.Random(seed)
+    first = datetime.date(2020, 1, 1)
+    days = rnd.sample(range(2000), count)
+    amounts = rnd.sample(range(1, 100000), count)
+    rows = []
+    for i in range(count):
+        category = "Rare" if i % 100 == 0 else rnd.choice(CATEGORIES)
+        rows.append({
+            "id": f"t{i:04d}",
+            "type": rnd.choice(["income", "expense"]),
+            "amount": amounts[i],
+            "category": category,
+            "note": rnd.choice(NOTES),
+            "date": (first + datetime.timedelta(days=days[i])).isoformat(),
+        })
+    return rows
+
+
+def _user(transactions):
+    return {"username": "alice", "pin": "1234", "currency": "USD", "transactions": transactions}
+
+
+class QueryEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.rows = _transactions()
+
+        def data_manager(mode):
+            folder = os.path.join(cls.directory, mode)
+            return DataManager(os.path.join(folder, "users.json"), os.path.join(folder, "backup"), storage_mode=mode)
+
+        # engine, user: lists with indexes, a columnar store, and the sqlite backend
+        cls.json_data = data_manager("json")
+        indexes = IndexManager()
+        listed = _user([dict(t) for t in cls.rows])
+        indexes.attach(listed)
+        columnar_indexes = IndexManager()
+        columnar = _user(TransactionStore([dict(t) for t in cls.rows]))
+        columnar_indexes.attach(columnar)  # none: the store scans its own columns
+
+        cls.sqlite_data = data_manager("sqlite")
+        cls.sqlite_data.save_data([_user([dict(t) for t in cls.rows])])
+        cls.sqlite_data.drain()
+        stub = cls.sqlite_data.load_data()[0]
+
+        cls.engines = {
+            "list": (QueryEngine(indexes, cls.json_data), listed),
+            "columnar": (QueryEngine(columnar_indexes, cls.json_data), columnar),
+            "sqlite": (QueryEngine(IndexManager(), cls.sqlite_data), stub),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.json_data.close()
+        cls.sqlite_data.close()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def _run(self, name, query):
+        engine, user = self.engines[name]
+        result = engine.run(user, query)
+        return result.plan, [dict(t) for t in result]
+
+    def _expected(self, query):
+        rows = [t for t in self.rows if query.predicate()(t)]
+        if query.order is not None:
+            rows = sorted(rows, key=query.sort_key(), reverse=query.descending)
+        stop = query.offset + query.limit if query.limit is not None else None
+        return rows[query.offset:stop]
+
+    # -------------------------------
+    # Plans
+    # -------------------------------
+    def test_plan_choice(self):
+        cases = [
+            (Query(), "list", "scan"),
+            (Query(start="2021-01-01", end="2021-01-31"), "list", "date index"),
+            (Query(categories=["rare"]), "list", "category index"),
+            # both indexes apply: the one with fewer candidate rows wins
+            (Query(start="2020-01-01", end="2025-12-31", categories=["rare"]), "list", "category index"),
+            (Query(start="2021-01-01", end="2021-01-10", categories=["food"]), "list", "date index"),
+            (Query(note="lunch"), "columnar", "column scan"),
+            (Query(start="2021-01-01", categories=["rare"]), "columnar", "column scan"),
+            (Query(categories=["rare"]).order_by("amount"), "sqlite", "sql"),
+        ]
+        for query, name, plan in cases:
+            with self.subTest(query=query, engine=name):
+                engine, user = self.engines[name]
+                self.assertEqual(engine.plan(user, query), plan)
+                self.assertEqual(self._run(name, query)[0], plan)
+
+    # -------------------------------
+    # Same rows whatever the plan
+    # -------------------------------
+    def test_every_plan_returns_the_same_rows(self):
+        rnd = random.Random(11)
+        for _ in range(150):
+            fields = {}
+            if rnd.random() < 0.5:
+                fields["start"], fields["end"] = sorted(
+                    (datetime.date(2020, 1, 1) + datetime.timedelta(days=rnd.randint(0, 2000))).isoformat()
+                    for _ in range(2))
+            if rnd.random() < 0.4:
+                fields["categories"] = rnd.sample(["food", "rent", "TRAVEL", "rare", "nope"], rnd.randint(1, 2))
+            if rnd.random() < 0.3:
+                fields["min_amount"] = rnd.randint(0, 60000)
+            if rnd.random() < 0.3:
+                fields["max_amount"] = rnd.randint(40000, 100000)
+            if rnd.random() < 0.3:
+                fields["t_type"] = rnd.choice(["income", "expense"])
+            if rnd.random() < 0.3:
+                fields["note"] = rnd.choice(["lunch", "NER", "x"])
+            query = Query(**fields)
+            if rnd.random() < 0.7:
+                query = query.order_by(rnd.choice(["date", "amount"]), rnd.random() < 0.5)
+            if rnd.random() < 0.5:
+                query = query.page(rnd.randint(0, 40), rnd.randint(0, 30))
+
+            expected = self._expected(query)
+            for name in self.engines:
+                with self.subTest(query=query, engine=name):
+                    plan, rows = self._run(name, query)
+                    if query.order is not None:
+                        self.assertEqual([t["id"] for t in rows], [t["id"] for t in expected])
+                    elif query.limit is None and not query.offset:
+                        self.assertEqual(sorted(t["id"] for t in rows), sorted(t["id"] for t in expected))
+                    else:
+                        # unordered page: any rows of the right count that match
+                        self.assertEqual(len(rows), len(expected))
+                        self.assertTrue(all(query.predicate()(t) for t in rows))
+
+    # -------------------------------
+    # Paging
+    # -------------------------------
+    def test_offset_pages_add_up_to_the_whole_result(self):
+        query = Query(t_type="expense").order_by("amount", descending=True)
+        whole = [t["id"] for t in self._expected(query)]
+        for name in self.engines:
+            with self.subTest(engine=name):
+                paged = []
+                for offset in range(0, len(whole) + 25, 25):
+                    paged.extend(t["id"] for t in self._run(name, query.page(25, offset))[1])
+                self.assertEqual(paged, whole)
+
+    def test_fetch_continues_where_it_stopped(self):
+        query = Query(start="2021-01-01").order_by("date")
+        whole = [t["id"] for t in self._expected(query)]
+        for name in self.engines:
+            with self.subTest(engine=name):
+                engine, user = self.engines[name]
+                result = engine.run(user, query)
+                fetched = []
+                while True:
+                    batch = result.fetch(40)
+                    fetched.extend(t["id"] for t in batch)
+                    if len(batch) < 40:
+                        break
+                self.assertEqual(fetched, whole)
+                self.assertEqual(result.fetch(10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
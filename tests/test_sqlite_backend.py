@@ -0,0 +1,86 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_backend import SqliteBackend  # noqa: E402
+
+
+def _user(name, amount):
+    return {
+        "username": name,
+        "pin": "1234",
+        "currency": "USD",
+        "transactions": [{"id": "T1", "type": "expense", "amount": amount, "category": "Food", "note": "",
+                          "date": "2025-01-01"}],
+        "savings_goals": [{"id": "G1", "name": "Car", "target_amount": 1000, "saved_amount": 0, "deadline": "",
+                           "created_at": ""}],
+    }
+
+
+class SharedIdTest(unittest.TestCase):
+    """Two users holding the same transaction id (e.g. one OFX file imported by both)."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.backend = self._open()
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _open(self):
+        return SqliteBackend(os.path.join(self.directory, "users.json"))
+
+    def _amounts(self, name):
+        user = self.backend.full_user({"username": name, "pin": "1234"})
+        return [(t["id"], t["amount"]) for t in user["transactions"]]
+
+    def test_both_users_keep_their_rows(self):
+        self.backend.save_users([_user("alice", 1000), _user("bob", 2000)])
+        self.assertEqual(self._amounts("alice"), [("T1", 1000)])
+        self.assertEqual(self._amounts("bob"), [("T1", 2000)])
+        alice = self.backend.full_user({"username": "alice", "pin": "1234"})
+        self.assertEqual([g["id"] for g in alice["savings_goals"]], ["G1"])
+
+    def test_add_edit_and_delete_touch_only_their_user(self):
+        users = [_user("alice", 1000), _user("bob", 2000)]
+        users[0]["transactions"] = []
+        self.backend.save_users(users)
+        self.backend.save_changes(users, [{"op": "add", "user": "alice", "data": _user("alice", 1000)["transactions"][0]}])
+        self.backend.save_changes(users, [{"op": "edit", "user": "bob", "id": "T1", "data": {"amount": 2500}}])
+        self.assertEqual(self._amounts("alice"), [("T1", 1000)])
+        self.assertEqual(self._amounts("bob"), [("T1", 2500)])
+        self.backend.save_changes(users, [{"op": "delete", "user": "alice", "id": "T1"}])
+        self.assertEqual(self._amounts("alice"), [])
+        self.assertEqual(self._amounts("bob"), [("T1", 2500)])
+
+    def test_databases_with_global_ids_are_rekeyed(self):
+        self.backend.save_users([_user("alice", 1000)])
+        self.backend.close()
+        # as written before ids were per user
+        conn = sqlite3.connect(os.path.join(self.directory, "users.db"))
+        with conn:
+            conn.execute("ALTER TABLE transactions RENAME TO t_old")
+            conn.execute("CREATE TABLE transactions (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, "
+                         "username TEXT NOT NULL, type TEXT NOT NULL, amount REAL NOT NULL, category TEXT NOT NULL "
+                         "DEFAULT '', note TEXT NOT NULL DEFAULT '', date TEXT NOT NULL DEFAULT '', extra TEXT NOT "
+                         "NULL DEFAULT '{}')")
+            conn.execute("INSERT INTO transactions SELECT * FROM t_old")
+            conn.execute("DROP TABLE t_old")
+            conn.execute("PRAGMA user_version = 1")
+        conn.close()
+
+        self.backend = self._open()
+        self.assertEqual(self._amounts("alice"), [("T1", 1000)])
+        self.backend.save_users([_user("alice", 1000), _user("bob", 2000)])
+        self.assertEqual(self._amounts("alice"), [("T1", 1000)])
+        self.assertEqual(self._amounts("bob"), [("T1", 2000)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import sys
+import unittest
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transaction_store  # noqa: E402
+from transaction_store import TransactionStore, TransactionView  # noqa: E402
+
+
+def _plain(tid, amount, day="2025-01-15", t_type="expense", category="Food", note="lunch"):
+    return {"id": tid, "type": t_type, "amount": amount, "category": category, "note": note, "date": day}
+
+
+ODD = [
+    _plain(str(uuid.UUID(int=1)), 1250),
+    _plain("bank-42", 300),  # id that is not a UUID
+    _plain(str(uuid.UUID(int=3)).upper(), 10),  # UUID, but not in its canonical text
+    _plain(str(uuid.UUID(int=4)), 12.5),  # old float amount
+    _plain(str(uuid.UUID(int=5)), 2 ** 70),  # too large for the column
+    _plain(str(uuid.UUID(int=6)), 99, day="2025-13-01"),  # not a date
+    _plain(str(uuid.UUID(int=7)), 99, day="2025-1-5"),  # a date, but not ISO text
+    _plain(str(uuid.UUID(int=8)), 99, t_type="transfer"),
+    _plain(str(uuid.UUID(int=9)), 99, category=None, note=7),
+    dict(_plain(str(uuid.UUID(int=10)), 99), memo="extra key", tags=["a", "b"]),
+    {"id": str(uuid.UUID(int=11)), "type": "income", "amount": 5, "date": "2025-02-01"},  # no category, note
+]
+
+
+class RoundTripTest(unittest.TestCase):
+    def test_odd_fields_read_back_unchanged(self):
+        store = TransactionStore(ODD)
+        self.assertEqual(store.to_list(), ODD)
+        self.assertEqual([dict(view) for view in store], ODD)
+        self.assertEqual(len(store), len(ODD))
+        self.assertNotIn("note", store[-1])
+        with self.assertRaises(KeyError):
+            store[-1]["category"]
+
+    def test_plain_rows_use_the_columns_only(self):
+        store = TransactionStore([_plain(str(uuid.UUID(int=i)), i) for i in range(5)])
+        self.assertEqual(store.extra, {})
+        self.assertEqual(store.odd_ids, {})
+        self.assertEqual(list(store.amounts), [0, 1, 2, 3, 4])
+
+    def test_list_interface(self):
+        store = TransactionStore(ODD)
+        self.assertEqual(store[-2]["memo"], "extra key")
+        self.assertEqual([t["id"] for t in store[1:3]], [ODD[1]["id"], ODD[2]["id"]])
+        with self.assertRaises(IndexError):
+            store[len(ODD)]
+        self.assertEqual(store.pop(1), ODD[1])
+        self.assertEqual(store.to_list(), ODD[:1] + ODD[2:])
+
+
+class ChangeTest(unittest.TestCase):
+    def setUp(self):
+        self.store = TransactionStore(ODD)
+        self.expected = [dict(t) for t in ODD]
+
+    def _check(self):
+        self.assertEqual(self.store.to_list(), self.expected)
+
+    def test_delete_keeps_later_rows_and_their_odd_fields(self):
+        for index in (1, 0, 4, -1, 2):
+            del self.store[index]
+            del self.expected[index]
+            self._check()
+
+    def test_update_through_a_view(self):
+        view = self.store[3]  # float amount kept in `extra`
+        view["amount"] = 700
+        view["note"] = "fixed"
+        self.expected[3].update(amount=700, note="fixed")
+        self._check()
+        self.assertNotIn("amount", self.store.extra.get(view["id"], {}))
+
+        odd = self.store[5]
+        odd["date"] = "2025-03-01"  # back to a plain date
+        odd["category"] = 42  # not a string: goes to `extra`
+        self.expected[5].update(date="2025-03-01", category=42)
+        self._check()
+
+        missing = self.store[10]
+        missing["note"] = "now set"
+        missing["memo"] = "new key"
+        self.expected[10].update(note="now set", memo="new key")
+        self._check()
+
+    def test_rekey_through_a_view(self):
+        view = self.store[1]
+        view["id"] = "bank-43"
+        self.expected[1]["id"] = "bank-43"
+        self._check()
+        self.store[9]["id"] = str(uuid.UUID(int=99))
+        self.expected[9]["id"] = str(uuid.UUID(int=99))
+        self._check()
+
+    def test_replace_and_append(self):
+        self.store[0] = ODD[9]
+        self.expected[0] = ODD[9]
+        self.store.append(_plain("tail", 1))
+        self.expected.append(_plain("tail", 1))
+        self._check()
+
+    def test_fields_cannot_be_deleted(self):
+        with self.assertRaises(TypeError):
+            del self.store[0]["note"]
+
+
+class ScanTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = [_plain(str(uuid.UUID(int=i)), i * 100, day=f"2025-{i % 12 + 1:02d}-10",
+                            t_type=("income", "expense")[i % 2], category=("Food", "food ", "Rent")[i % 3],
+                            note=("Lunch", "rent", "")[i % 3]) for i in range(60)]
+        self.store = TransactionStore(self.rows)
+
+    def _scans(self, **filters):
+        with_numpy = self.store.rows_matching(**filters)
+        saved, transaction_store.numpy = transaction_store.numpy, None
+        try:
+            plain = self.store.rows_matching(**filters)
+        finally:
+            transaction_store.numpy = saved
+        self.assertEqual(with_numpy, plain)
+        return plain
+
+    def test_scans_match_the_rows(self):
+        cases = [
+            ({"start": "2025-03-01", "end": "2025-05-31"}, lambda t: "2025-03-01" <= t["date"] <= "2025-05-31"),
+            ({"end": "2025-02-31"}, lambda t: t["date"] <= "2025-02-28"),
+            ({"categories": ["FOOD"]}, lambda t: t["category"].strip().lower() == "food"),
+            ({"min_amount": 1000, "max_amount": 2000}, lambda t: 1000 <= t["amount"] <= 2000),
+            ({"t_type": "income", "note": "lun"}, lambda t: t["type"] == "income" and "lun" in t["note"].lower()),
+        ]
+        for filters, matches in cases:
+            with self.subTest(filters=filters):
+                expected = [i for i, t in enumerate(self.rows) if matches(t)]
+                self.assertEqual(self._scans(**filters), expected)
+
+    def test_totals_and_sorting(self):
+        self.assertEqual(self.store.total_cents(), sum(t["amount"] for t in self.rows))
+        self.assertEqual(self.store.total_cents(t_type="expense"),
+                         sum(t["amount"] for t in self.rows if t["type"] == "expense"))
+        rows = self.store.sort_rows(range(len(self.rows)), "amount", descending=True)
+        self.assertEqual(rows, sorted(range(len(self.rows)), key=lambda r: -self.rows[r]["amount"]))
+        self.assertIsNone(self.store.sort_rows(rows, "note"))
+        self.assertIsNone(TransactionStore(ODD).sort_rows([0, 1], "amount"))  # odd amounts are not in the column
+
+    def test_views_are_mappings(self):
+        view = self.store[0]
+        self.assertIsInstance(view, TransactionView)
+        self.assertEqual(set(view), set(self.rows[0]))
+        self.assertEqual(view.get("missing", "default"), "default")
+
+
+if __name__ == "__main__":
+    unittest.main()
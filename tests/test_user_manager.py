@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Two sessions loaded from the same data change budgets and goals of one user
+TWO_SESSIONS = textwrap.dedent("""
+    import json, sys
+    sys.path.insert(0, {root!r})
+    import ledger_service
+    from user_manager import UserManager
+
+    first = UserManager()
+    first.create_user("alice", "1234")
+    first.flush()
+    first.data_manager.drain()
+    second = UserManager()
+    for session in (first, second):
+        session.set_current_user(session.find_user("alice"))
+
+    ledger_service.set_budget(first, "2025-01", "100")
+    kept = ledger_service.add_goal(first, "Car", "1000").id
+    dropped = ledger_service.add_goal(first, "Bike", "300").id
+    first.flush()
+    first.data_manager.drain()
+
+    ledger_service.set_budget(second, "2025-02", "200")
+    ledger_service.add_goal(second, "Trip", "500")
+    second.flush()
+    second.data_manager.drain()
+
+    ledger_service.allocate_to_goal(first, kept, "10")
+    ledger_service.delete_goal(first, dropped)
+    first.close()
+    second.close()
+
+    third = UserManager()
+    user = third.set_current_user(third.find_user("alice"))
+    print(json.dumps({{
+        "budgets": sorted(b["month"] for b in user.get("monthly_budgets", [])),
+        "goals": sorted((g["name"], g["saved_amount"]) for g in user.get("savings_goals", [])),
+    }}))
+    third.close()
+""")
+
+# Threads of one session (the API server's workers) register the same name
+SAME_NAME = textwrap.dedent("""
+    import json, sys, threading, time
+    sys.path.insert(0, {root!r})
+    from user_manager import UserManager
+
+    class SlowDict(dict):
+        # widens the window between the check for the name and the add
+        def __contains__(self, key):
+            found = dict.__contains__(self, key)
+            if not found:
+                time.sleep(0.01)
+            return found
+
+    session = UserManager()
+    session.users_by_name = SlowDict(session.users_by_name)
+
+    created, errors = [], []
+    def register():
+        try:
+            created.append(session.create_user("alice", "1234"))
+        except ValueError as e:
+            errors.append(str(e))
+    threads = [threading.Thread(target=register) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    session.close()
+
+    stored = UserManager()
+    print(json.dumps({{
+        "created": len(created),
+        "errors": errors,
+        "users": [u["username"] for u in stored.users],
+    }}))
+    stored.close()
+""")
+
+
+class ConcurrentSessionsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_budgets_and_goals_of_both_sessions_are_kept(self):
+        for mode in ("json", "journal", "sharded", "sqlite", "binary"):
+            with self.subTest(mode=mode):
+                shutil.rmtree(os.path.join(self.directory, "data"), ignore_errors=True)
+                env = dict(os.environ, FIN_STORAGE_MODE=mode, FIN_SAVE_DELAY_MS="0",
+                           FIN_SQLITE_PATH=os.path.join(self.directory, f"{mode}.db"))
+                result = subprocess.run([sys.executable, "-c", TWO_SESSIONS.format(root=ROOT)], cwd=self.directory,
+                                        env=env, capture_output=True, text=True, timeout=60)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                state = json.loads(result.stdout.splitlines()[-1])
+                self.assertEqual(state["budgets"], ["2025-01", "2025-02"])
+                self.assertEqual(state["goals"], [["Car", 1000], ["Trip", 0]])
+
+
+class SameNameTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_one_thread_gets_the_name(self):
+        env = dict(os.environ, FIN_SAVE_DELAY_MS="0")
+        result = subprocess.run([sys.executable, "-c", SAME_NAME.format(root=ROOT)], cwd=self.directory,
+                                env=env, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        state = json.loads(result.stdout.splitlines()[-1])
+        self.assertEqual(state["created"], 1)
+        self.assertEqual(state["errors"], ["Username already exists."] * 7)
+        self.assertEqual(state["users"], ["alice"])
+
+
+if __name__ == "__main__":
+    unittest.main()
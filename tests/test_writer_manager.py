@@ -0,0 +1,44 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Queues a save behind a slow job and ends without DataManager.close()
+SAVE_AND_EXIT = textwrap.dedent("""
+    import sys, time
+    sys.path.insert(0, {root!r})
+    from data_manager import DataManager
+
+    data_manager = DataManager()
+    data_manager.writer.submit("waiting", time.sleep, 0.3)
+    data_manager.save_data([{{"username": "alice", "pin": "1234", "transactions": []}}], {{"alice"}})
+    assert data_manager.writer.pending() == 2
+""")
+
+
+class ExitWithoutCloseTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_queued_save_is_written_at_exit(self):
+        env = dict(os.environ, FIN_BACKGROUND_WRITES="1", FIN_STORAGE_MODE="json")
+        result = subprocess.run([sys.executable, "-c", SAVE_AND_EXIT.format(root=ROOT)], cwd=self.directory,
+                                env=env, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        with open(os.path.join(self.directory, "data", "users.json"), "r", encoding="utf-8") as f:
+            self.assertEqual([u["username"] for u in json.load(f)], ["alice"])
+        self.assertTrue(os.listdir(os.path.join(self.directory, "data", "backup", "manifests")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
-import datetime
-import uuid
+import config
+import ledger_service
+from import_manager import ImportManager
+from ledger_service import ServiceError
+from money import format_amount
 
 class TransactionManager:
     def __init__(self, user_manager):
@@ -16,30 +19,22 @@ class TransactionManager:
             print(" Invalid type.")
             return
 
+        amount = input("Enter amount: ")
         try:
-            amount = float(input("Enter amount: "))
-        except ValueError:
-            print(" Invalid amount.")
+            ledger_service.parse_amount(self.user_manager.current_user, amount)
+        except ServiceError as e:
+            print(f" {e}")
             return
 
         category = input("Enter category (e.g. Food, Salary, Rent): ").strip()
         note = input("Enter note (optional): ").strip()
         date_str = input("Enter date (YYYY-MM-DD) or leave empty for today: ").strip()
-        date = date_str if date_str else datetime.date.today().isoformat()
 
-        transaction = {
-            "id": str(uuid.uuid4()), 
-            "type": t_type,
-            "amount": amount,
-            "category": category,
-            "note": note,
-            "date": date
-        }
-
-        self.user_manager.current_user["transactions"].append(transaction)
-        # self.user_manager.save_users()
-        
-        self.user_manager.save()  # Save after adding transaction
+        try:
+            ledger_service.add_transaction(self.user_manager, t_type, amount, category, note, date_str or None)
+        except ServiceError as e:
+            print(f" {e}")
+            return
 
 
         print(f" {t_type.capitalize()} added successfully!")
@@ -57,8 +52,10 @@ class TransactionManager:
 
         print(f"\n Transactions for {self.user_manager.current_user['username']}:")
         print("-" * 60)
+        currency = self.user_manager.currency()
         for i, t in enumerate(transactions, start=1):
-            print(f"{i}. [{t['type'].upper()}] {t['amount']} | {t['category']} | {t['date']} | {t['note']}")
+            amount = format_amount(t["amount"], currency)
+            print(f"{i}. [{t['type'].upper()}] {amount} | {t['category']} | {t['date']} | {t['note']}")
         print("-" * 60)
 
     # Edit transaction
@@ -84,31 +81,30 @@ class TransactionManager:
         print("\n--- Edit Transaction ---")
         print("Press Enter to keep current value.")
         new_type = input(f"Type ({transaction['type']}): ").strip().lower()
-        new_amount = input(f"Amount ({transaction['amount']}): ").strip()
+        currency = self.user_manager.currency()
+        new_amount = input(f"Amount ({format_amount(transaction['amount'], currency)}): ").strip()
         new_category = input(f"Category ({transaction['category']}): ").strip()
         new_note = input(f"Note ({transaction['note']}): ").strip()
         new_date = input(f"Date ({transaction['date']}): ").strip()
 
-        if new_type in ["income", "expense"]:
-            transaction["type"] = new_type
-        if new_amount:
-            try:
-                transaction["amount"] = float(new_amount)
-            except ValueError:
-                print(" Invalid amount, keeping old value.")
-        if new_category:
-            transaction["category"] = new_category
-        if new_note:
-            transaction["note"] = new_note
-        if new_date:
-            transaction["date"] = new_date
-
-        # self.user_manager.save_users()
-
-        self.user_manager.save()  # Save after editing transaction
-
-
+        changes = {"type": new_type, "amount": new_amount, "category": new_category, "note": new_note,
+                   "date": new_date}
+        before = dict(transaction)
+        updated = None
+        # each field on its own: an invalid one keeps its old value, the others still change
+        for field, value in changes.items():
+            if value:
+                try:
+                    updated = ledger_service.edit_transaction(self.user_manager, before["id"], {field: value})
+                except ServiceError as e:
+                    print(f" {e} Keeping old value.")
+
+        if updated is None or dict(updated) == before:
+            print(" No changes made.")
+            return
+        amount = format_amount(updated["amount"], currency)
         print("Transaction updated successfully!")
+        print(f"[{updated['type'].upper()}] {amount} | {updated['category']} | {updated['date']} | {updated['note']}")
 
     # Delete transaction with confirmation
     def delete_transaction(self):
@@ -130,17 +126,29 @@ class TransactionManager:
         index = int(choice) - 1
         t = transactions[index]
 
-        confirm = input(f" Are you sure you want to delete '{t['category']}' ({t['amount']})? (y/n): ").strip().lower()
+        amount = format_amount(t["amount"], self.user_manager.currency())
+        confirm = input(f" Are you sure you want to delete '{t['category']}' ({amount})? (y/n): ").strip().lower()
         if confirm == "y":
-            del transactions[index]
-            # self.user_manager.save_users()
-
-            self.user_manager.save()  # Save after deleting transaction
-
-
+            ledger_service.delete_transaction(self.user_manager, t["id"])
 
             print("Transaction deleted successfully.")
         else:
             print(" Deletion cancelled.")
 
 
+
+    # Bulk import from a CSV / OFX / QIF file (one save for the whole file)
+    def import_transactions(self):
+        if not self.user_manager.current_user:
+            print(" Please login first.")
+            return
+
+        path = input("Enter file to import (.csv, .ofx, .qfx, .qif): ").strip()
+        if not path:
+            print(" No file given.")
+            return
+
+        try:
+            ImportManager(self.user_manager, batch_size=config.IMPORT_BATCH_SIZE).import_file(path)
+        except (OSError, ValueError) as e:
+            print(f" Import failed: {e}")
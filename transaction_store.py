@@ -0,0 +1,350 @@
+import calendar
+import uuid
+from array import array
+from collections.abc import MutableMapping
+from datetime import date
+
+from index_manager import normalize_category
+
+try:
+    import numpy
+except ImportError:  # optional: plain loops over the arrays are used instead
+    numpy = None
+
+
+TYPE_FLAGS = {"income": 0, "expense": 1}
+TYPE_NAMES = {flag: name for name, flag in TYPE_FLAGS.items()}
+OTHER_TYPE = 2
+FIELDS = ("id", "type", "amount", "category", "note", "date")
+MISSING = "__missing__"  # key in `extra` listing fields a transaction does not have
+
+
+class TransactionStore:
+    """
+    Columnar, list-compatible container for one user's transactions.
+
+    Each field lives in its own column:
+        amounts      array('q')  integer minor units (see money.Money)
+        dates        array('l')  date ordinals (0 = not a plain YYYY-MM-DD date)
+        types        array('b')  0 income, 1 expense, 2 other
+        category_ids array('l')  index into the interned category table
+        uuids        bytearray   16 bytes per row (ids that are not UUIDs go to odd_ids)
+        notes        list        interned strings
+    Anything else that does not fit a column (odd dates, amounts or extra keys)
+    is kept per transaction id in `extra`.
+
+    Indexing or iterating yields TransactionView objects that behave like the
+    old dicts, so existing code keeps working unchanged.
+    """
+
+    def __init__(self, transactions=()):
+        self.amounts = array("q")
+        self.dates = array("l")
+        self.types = array("b")
+        self.category_ids = array("l")
+        self.uuids = bytearray()
+        self.notes = []
+        self.odd_ids = {}  # row -> id that is not a UUID
+        self.extra = {}  # transaction id -> {field: raw value}
+        self.category_names = []
+        self._category_lookup = {}
+        self._note_lookup = {}
+        self.extend(transactions)
+
+    # -------------------------------
+    # List interface
+    # -------------------------------
+    def __len__(self):
+        return len(self.amounts)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield TransactionView(self, row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TransactionView(self, row) for row in range(len(self))[index]]
+        return TransactionView(self, self._row(index))
+
+    def __setitem__(self, index, transaction):
+        row = self._row(index)
+        self.extra.pop(self.get_field(row, "id"), None)
+        self._write_row(row, dict(transaction))
+
+    def __delitem__(self, index):
+        row = self._row(index)
+        self.extra.pop(self.get_field(row, "id"), None)
+        del self.amounts[row]
+        del self.dates[row]
+        del self.types[row]
+        del self.category_ids[row]
+        del self.uuids[row * 16:row * 16 + 16]
+        del self.notes[row]
+        if self.odd_ids:
+            self.odd_ids = {(r - 1 if r > row else r): tid for r, tid in self.odd_ids.items() if r != row}
+
+    def append(self, transaction):
+        self.amounts.append(0)
+        self.dates.append(0)
+        self.types.append(0)
+        self.category_ids.append(0)
+        self.uuids.extend(bytes(16))
+        self.notes.append("")
+        self._write_row(len(self) - 1, dict(transaction))
+
+    def extend(self, transactions):
+        for t in transactions:
+            self.append(t)
+
+    def pop(self, index=-1):
+        transaction = dict(self[index])
+        del self[index]
+        return transaction
+
+    def to_list(self):
+        return [dict(view) for view in self]
+
+    def _row(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("transaction index out of range")
+        return index
+
+    # -------------------------------
+    # Field encoding
+    # -------------------------------
+    def _write_row(self, row, t):
+        tid = t.get("id")
+        self._set_column(row, "id", tid)
+        odd = {k: v for k, v in t.items() if k not in FIELDS}
+        for field in FIELDS[1:]:
+            if field not in t:
+                odd.setdefault(MISSING, []).append(field)
+            elif not self._set_column(row, field, t[field]):
+                odd[field] = t[field]
+        if odd:
+            self.extra[tid] = odd
+
+    def _set_column(self, row, field, value):
+        """Store value in its column; False if it has to go to `extra` instead."""
+        if field == "id":
+            self.odd_ids.pop(row, None)
+            try:
+                u = uuid.UUID(value)
+            except (TypeError, ValueError, AttributeError):
+                u = None
+            if u is None or str(u) != value:
+                self.uuids[row * 16:row * 16 + 16] = bytes(16)
+                self.odd_ids[row] = value
+            else:
+                self.uuids[row * 16:row * 16 + 16] = u.bytes
+        elif field == "amount":
+            if type(value) is not int or not -2 ** 63 <= value < 2 ** 63:
+                self.amounts[row] = 0
+                return False
+            self.amounts[row] = value
+        elif field == "date":
+            try:
+                d = date.fromisoformat(value)
+            except (TypeError, ValueError):
+                return False
+            if d.isoformat() != value:
+                return False
+            self.dates[row] = d.toordinal()
+        elif field == "type":
+            if value not in TYPE_FLAGS:
+                self.types[row] = OTHER_TYPE
+                return False
+            self.types[row] = TYPE_FLAGS[value]
+        elif field == "category":
+            if not isinstance(value, str):
+                return False
+            self.category_ids[row] = self.category_id(value)
+        elif field == "note":
+            if not isinstance(value, str):
+                return False
+            self.notes[row] = self._note_lookup.setdefault(value, value)
+        return True
+
+    def category_id(self, name):
+        cid = self._category_lookup.get(name)
+        if cid is None:
+            cid = len(self.category_names)
+            self.category_names.append(name)
+            self._category_lookup[name] = cid
+        return cid
+
+    def get_field(self, row, field):
+        if field == "id":
+            if row in self.odd_ids:
+                return self.odd_ids[row]
+            return str(uuid.UUID(bytes=bytes(self.uuids[row * 16:row * 16 + 16])))
+        odd = self.extra.get(self.get_field(row, "id")) if self.extra else None
+        if odd is not None:
+            if field in odd:
+                return odd[field]
+            if field in odd.get(MISSING, ()):
+                raise KeyError(field)
+        if field == "amount":
+            return self.amounts[row]
+        if field == "date":
+            return date.fromordinal(self.dates[row]).isoformat()
+        if field == "type":
+            return TYPE_NAMES[self.types[row]]
+        if field == "category":
+            return self.category_names[self.category_ids[row]]
+        if field == "note":
+            return self.notes[row]
+        raise KeyError(field)
+
+    # -------------------------------
+    # Column scans
+    # -------------------------------
+    def rows_matching(self, start=None, end=None, categories=None,
+                      min_amount=None, max_amount=None, t_type=None, note=None):
+        """Row numbers matching every filter (dates as ISO strings, amounts in minor units)."""
+        n = len(self)
+        lo = _ordinal(start) if start else None
+        hi = _ordinal(end) if end else None
+        wanted_type = TYPE_FLAGS.get(t_type, OTHER_TYPE) if t_type is not None else None
+        wanted_cats = None
+        if categories is not None:
+            wanted = {normalize_category(c) for c in categories}
+            wanted_cats = {i for i, name in enumerate(self.category_names) if normalize_category(name) in wanted}
+        wanted_notes = None
+        if note is not None:
+            # notes are interned: test each distinct note once
+            needle = note.lower()
+            wanted_notes = {text for text in set(self.notes) if needle in text.lower()}
+
+        if numpy is not None and n:
+            mask = numpy.ones(n, dtype=bool)
+            if lo is not None:
+                mask &= _column(self.dates) >= lo
+            if hi is not None:
+                mask &= _column(self.dates) <= hi
+            if min_amount is not None:
+                mask &= _column(self.amounts) >= min_amount
+            if max_amount is not None:
+                mask &= _column(self.amounts) <= max_amount
+            if wanted_type is not None:
+                mask &= _column(self.types) == wanted_type
+            if wanted_cats is not None:
+                mask &= numpy.isin(_column(self.category_ids), list(wanted_cats))
+            if wanted_notes is not None:
+                mask &= numpy.fromiter((text in wanted_notes for text in self.notes), dtype=bool, count=n)
+            return numpy.nonzero(mask)[0].tolist()
+
+        dates, amounts, types, cats, notes = self.dates, self.amounts, self.types, self.category_ids, self.notes
+        return [
+            r for r in range(n)
+            if (lo is None or dates[r] >= lo)
+            and (hi is None or dates[r] <= hi)
+            and (min_amount is None or amounts[r] >= min_amount)
+            and (max_amount is None or amounts[r] <= max_amount)
+            and (wanted_type is None or types[r] == wanted_type)
+            and (wanted_cats is None or cats[r] in wanted_cats)
+            and (wanted_notes is None or notes[r] in wanted_notes)
+        ]
+
+    def query(self, **filters):
+        return [TransactionView(self, r) for r in self.rows_matching(**filters)]
+
+    def sort_rows(self, rows, field, descending=False):
+        """rows ordered by the amount or date column (stable); None when the columns cannot order them."""
+        column = {"amount": self.amounts, "date": self.dates}.get(field)
+        if column is None or self.extra:
+            return None  # other fields, or odd rows whose real value is not in the column
+        return sorted(rows, key=column.__getitem__, reverse=descending)
+
+    def total_cents(self, rows=None, t_type=None):
+        """Exact sum of amounts (in minor units) over rows (default: all), optionally for one type."""
+        amounts, types = self.amounts, self.types
+        flag = TYPE_FLAGS.get(t_type) if t_type is not None else None
+        if rows is None:
+            if numpy is not None and len(self):
+                values = _column(amounts)
+                if flag is not None:
+                    values = values[_column(types) == flag]
+                return int(values.sum())
+            rows = range(len(self))
+        return sum(amounts[r] for r in rows if flag is None or types[r] == flag)
+
+
+class TransactionView(MutableMapping):
+    """Dict-like view of one row of a TransactionStore (valid until rows are deleted)."""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def _keys(self):
+        if not self.store.extra:
+            return FIELDS
+        odd = self.store.extra.get(self.store.get_field(self.row, "id"), {})
+        missing = odd.get(MISSING, ())
+        return tuple(f for f in FIELDS if f not in missing) + tuple(
+            k for k in odd if k not in FIELDS and k != MISSING
+        )
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+        return self.store.get_field(self.row, key)
+
+    def __setitem__(self, key, value):
+        store = self.store
+        tid = store.get_field(self.row, "id")
+        odd = store.extra.get(tid)
+        if key == "id":
+            # re-key the whole row
+            t = dict(self)
+            t["id"] = value
+            store[self.row] = t
+            return
+        if odd is not None and key in odd.get(MISSING, ()):
+            odd[MISSING].remove(key)
+        if key in FIELDS and store._set_column(self.row, key, value):
+            if odd is not None:
+                odd.pop(key, None)
+            return
+        store.extra.setdefault(tid, {})[key] = value
+
+    def __delitem__(self, key):
+        raise TypeError("transaction fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def _column(values):
+    """Zero-copy NumPy view of an array column."""
+    return numpy.frombuffer(values, dtype=values.typecode)
+
+
+def _ordinal(value):
+    """Date ordinal of a YYYY-MM-DD bound; days past the month end are clamped (2025-02-31 -> 28th)."""
+    year, month, day = (int(part) for part in value.split("-")[:3])
+    day = min(day, calendar.monthrange(year, month)[1])
+    return date(year, month, day).toordinal()
+
+
+def to_json(value):
+    """json.dump default= hook for columnar transactions and other objects kept on a user."""
+    if isinstance(value, TransactionStore):
+        return value.to_list()
+    if isinstance(value, TransactionView):
+        return dict(value)
+    if hasattr(value, "to_json"):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
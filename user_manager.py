@@ -1,50 +1,300 @@
 
 
 
+import copy
+from datetime import datetime
 from getpass import getpass
+import config
+from aggregate_manager import AggregateManager
 from data_manager import DataManager
+from deferred_save_manager import DeferredSaveManager
+from index_manager import IndexManager
+from query_engine import Query, QueryEngine
 
 class UserManager:
     def __init__(self):
         self.data_manager = DataManager()
+        self.aggregates = AggregateManager()
+        self.indexes = IndexManager()
+        # Kept in step with every transaction change of the current user
+        self.listeners = [self.aggregates, self.indexes]
         self.users = self.data_manager.load_data()
+        self.users_by_name = {}  # username -> user dict, same objects as self.users
+        self._rebuild_user_index()
         self.current_user = None
+        # Changes are saved in coalesced batches (see DeferredSaveManager);
+        # hold self.lock while changing users so a background flush sees whole changes
+        self.saves = DeferredSaveManager(
+            self._flush_records,
+            delay=config.SAVE_DELAY_MS / 1000,
+            max_changes=config.SAVE_MAX_CHANGES,
+        )
+        self.lock = self.saves.lock
+        self.queries = QueryEngine(self.indexes, self.data_manager, flush=self.flush)
+        self._save_migrated()
+
+    # Username index: rebuild whenever self.users is replaced, update on register
+    def _rebuild_user_index(self):
+        self.users_by_name = {u["username"]: u for u in self.users}
+
+    def find_user(self, username):
+        return self.users_by_name.get(username)
+
+    # -------------------------------
+    # Changes made by other sessions (see DataManager._merge_users)
+    # -------------------------------
+    # Add users registered by other sessions since startup
+    def refresh_users(self):
+        self.flush()
+        with self.lock:
+            for user in self.data_manager.new_users(self.users_by_name):
+                self.users.append(user)
+                self.users_by_name[user["username"]] = user
+            self._save_migrated()
+
+    def reload_user(self, user):
+        self.flush()  # our pending changes are merged into the stored copy first
+        with self.lock:
+            self.data_manager.reload_user(user)
+            self._save_migrated()
+            if user is self.current_user:
+                for listener in self.listeners:
+                    listener.attach(user)
+
+    # Reload loaded users another session saved meanwhile (call between menu actions)
+    def refresh_stale(self):
+        for username in self.data_manager.take_stale():
+            user = self.find_user(username)
+            if user is None or "transactions" not in user:
+                continue  # not loaded: gets the stored copy on login
+            self.reload_user(user)
+            if user is self.current_user:
+                print(f" {username}'s data was changed in another session and has been reloaded.")
+
+    def reload(self):
+        """Pick up everything other sessions saved: new users and changed data."""
+        self.refresh_users()
+        for user in list(self.users):
+            if "transactions" in user:
+                self.reload_user(user)
+        self.data_manager.take_stale()
+        print(f" Reloaded {len(self.users)} user(s) from disk.")
 
     def save(self):
-        self.data_manager.save_data(self.users)
+        with self.lock:
+            self.flush()
+            self.data_manager.save_data(self.users)
+
+    # Write every pending change now (before exports, restores and exit)
+    def flush(self):
+        self.saves.flush()
+
+    # -------------------------------
+    # Single-change saves (journal records in journal mode)
+    # -------------------------------
+    def _save_change(self, op, **fields):
+        record = {"op": op, "user": self.current_user["username"]}
+        record.update(fields)
+        self.saves.mark(record)
+        self.data_manager.report_errors()  # from earlier background saves
+
+    def _flush_records(self, records):
+        self.data_manager.save_changes(self.users, records)
+
+    # Save users whose amounts were just converted to minor units (see money.migrate_user)
+    def _save_migrated(self):
+        with self.lock:
+            for username in self.data_manager.take_migrated():
+                user = self.find_user(username)
+                if user is not None:
+                    self.saves.mark({"op": "migrate", "user": username, "data": user["currency"]})
+
+    def add_transaction(self, transaction):
+        with self.lock:
+            self.current_user.setdefault("transactions", []).append(transaction)
+            for listener in self.listeners:
+                listener.on_add(self.current_user, transaction)
+            self._save_change("add", id=transaction["id"], data=transaction)
+
+    # Bulk add (imports): listeners updated per row, one save for the whole batch
+    def add_transactions(self, transactions):
+        if not transactions:
+            return
+        with self.lock:
+            self.current_user.setdefault("transactions", []).extend(transactions)
+            for transaction in transactions:
+                for listener in self.listeners:
+                    listener.on_add(self.current_user, transaction)
+            self._save_change("add_many", data=transactions)
+
+    def update_transaction(self, index, changes):
+        with self.lock:
+            transaction = self.current_user["transactions"][index]
+            old = dict(transaction)
+            transaction.update(changes)
+            for listener in self.listeners:
+                listener.on_edit(self.current_user, old, transaction)
+            self._save_change("edit", id=transaction.get("id"), data=changes)
+
+    def delete_transaction(self, index):
+        with self.lock:
+            transaction = self.current_user["transactions"].pop(index)
+            for listener in self.listeners:
+                listener.on_remove(self.current_user, transaction)
+            self._save_change("delete", id=transaction.get("id"))
+        return transaction
+
+    # Load the user's data (lazy backends), running totals and indexes, then make it current
+    def set_current_user(self, user):
+        with self.lock:
+            self.current_user = self.data_manager.load_user(user)
+            self._save_migrated()
+            for listener in self.listeners:
+                listener.attach(self.current_user)
+        return self.current_user
+
+    def session(self, user):
+        """
+        A UserManager with `user` as its current user that shares everything
+        else (users, saves, indexes) with this one, so several users can be
+        worked on at once (one session per user in the API server). Changes
+        to one user must still come from one thread at a time.
+        """
+        session = copy.copy(self)
+        session.current_user = None
+        session.set_current_user(user)
+        return session
+
+    # Currency of the current user's amounts (see money.Money)
+    def currency(self):
+        return self.current_user.get("currency", config.CURRENCY)
+
+    # Running totals of the current user (see AggregateManager)
+    def get_summary(self):
+        return self.aggregates.get(self.current_user)
+
+    def save_field(self, key):
+        """Save one top-level field of the current user (e.g. monthly_budgets)."""
+        with self.lock:
+            self._save_change("set", key=key, data=self.current_user.get(key))
+
+    def save_item(self, key, item):
+        """Save one element of a list field (monthly_budgets, savings_goals; see JournalManager.ITEM_KEYS)."""
+        with self.lock:
+            self._save_change("set_item", key=key, data=item)
+
+    def delete_item(self, key, item_id):
+        """Save the removal of the element of a list field whose key is item_id."""
+        with self.lock:
+            self._save_change("delete_item", key=key, id=item_id)
+
+    # Current user's transactions matching a Query, produced lazily (see QueryEngine)
+    def query(self, query):
+        return self.queries.run(self.current_user, query)
+
+    # Same as a list, from Query keyword arguments (start, end, categories, min_amount, ...)
+    def query_transactions(self, **filters):
+        return list(self.query(Query(**filters)))
 
     def register_user(self):
         username = input("Enter new username: ").strip()
         pin = getpass("Set 4-digit PIN: ").strip()
-
-        if any(u["username"] == username for u in self.users):
-            print("Username already exists.")
+        try:
+            self.create_user(username, pin)
+        except ValueError as e:
+            print(e)
             return
+        print(" User registered successfully!")
 
-        if len(pin) != 4 or not pin.isdigit():
-            print("PIN must be 4 digits.")
-            return
+    def create_user(self, username, pin):
+        """Add and save a new user; ValueError when the name is taken or the PIN is not 4 digits."""
+        # check and add under one lock, so two threads cannot both add the name
+        with self.lock:
+            if username not in self.users_by_name:
+                self.refresh_users()  # registered in another session?
+            if username in self.users_by_name:
+                raise ValueError("Username already exists.")
 
-        new_user = {
-            "username": username,
-            "pin": pin,
-            "transactions": []
-        }
-        self.users.append(new_user)
-        self.save()
-        print(" User registered successfully!")
+            if len(pin) != 4 or not pin.isdigit():
+                raise ValueError("PIN must be 4 digits.")
+
+            new_user = {
+                "username": username,
+                "pin": pin,
+                "currency": config.CURRENCY,
+                "transactions": []
+            }
+            self.users.append(new_user)
+            self.users_by_name[username] = new_user
+            self.saves.mark({"op": "user", "user": username, "data": new_user})
+        return new_user
 
     def login(self):
         username = input("Enter username: ").strip()
         pin = getpass("Enter PIN: ").strip()
 
-        for u in self.users:
-            if u["username"] == username and u["pin"] == pin:
-                self.current_user = u
-                print(f"Welcome back, {username}!")
-                return
+        if self.authenticate(username, pin) is not None:
+            print(f"Welcome back, {username}!")
+            return
         print(" Invalid credentials.")
 
+    def authenticate(self, username, pin):
+        """Make the user current when the PIN matches; returns the user, or None."""
+        u = self.find_user(username)
+        if u is None:
+            self.refresh_users()  # registered in another session?
+            u = self.find_user(username)
+        if u is not None and u["pin"] == pin:
+            return self.set_current_user(u)
+        return None
+
+    # Every user fully loaded (sharded mode only loads users on login)
+    def all_users(self):
+        with self.lock:
+            for u in self.users:
+                self.data_manager.load_user(u)
+            self._save_migrated()
+        return self.users
+
+    def restore_backup(self):
+        self.flush()  # pending changes belong to the state being replaced
+        backups = self.data_manager.list_backups()
+        if not backups:
+            print("No backups found.")
+            return
+
+        print("\nRecent backups:")
+        recent = backups[-10:]
+        for i, b in enumerate(recent, 1):
+            print(f"{i}. {b}")
+        choice = input("Choose backup number, or a date/time (YYYY-MM-DD HH:MM) to restore: ").strip()
+
+        if choice.isdigit() and 1 <= int(choice) <= len(recent):
+            at = recent[int(choice) - 1]
+        else:
+            try:
+                at = datetime.strptime(choice, "%Y-%m-%d %H:%M")
+            except ValueError:
+                print("Invalid choice.")
+                return
+
+        users = self.data_manager.restore_backup(at)
+        if users is None:
+            print("No backup found for that time.")
+            return
+
+        with self.lock:
+            self.users = users
+            self._rebuild_user_index()
+            self.current_user = None
+            self.save()
+        print(f" Restored {len(users)} user(s). Please login again.")
+
+    # Finish background storage work before exit
+    def close(self):
+        self.saves.close()
+        self.data_manager.close()
+
     def show_current_user(self):
         if self.current_user:
             print(f"Current user: {self.current_user['username']}")
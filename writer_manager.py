@@ -0,0 +1,69 @@
+import atexit
+import queue
+import threading
+
+
+class WriterManager:
+    """
+    Runs saves and backups on one background thread, in submission order.
+
+    Jobs wait in a bounded queue: submit() only blocks when `max_pending`
+    jobs are already waiting, so the menu returns right after a change
+    whatever the size of the files. Jobs must work on snapshots (see
+    DataManager._snapshot_users), never on data the menu keeps changing.
+
+    A failing job does not stop the ones after it; its message is kept
+    for the UI to show (take_errors). drain() waits for every queued job,
+    close() drains and stops the thread. The thread is a daemon, so
+    close() is also registered to run at interpreter exit: queued jobs
+    are written even when the program ends without calling it.
+    """
+
+    def __init__(self, max_pending=16):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.errors = []
+        self._errors_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="fin-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, label, func, *args):
+        """Queue func(*args); label names the job in error messages ("saving data")."""
+        if self._closed:
+            raise RuntimeError("writer is closed")
+        self.queue.put((label, func, args))
+
+    def pending(self):
+        return self.queue.unfinished_tasks
+
+    def drain(self):
+        self.queue.join()
+
+    def take_errors(self):
+        with self._errors_lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                label, func, args = job
+                try:
+                    func(*args)
+                except Exception as e:
+                    with self._errors_lock:
+                        self.errors.append(f" Error {label}: {e}")
+            finally:
+                self.queue.task_done()